@@ -0,0 +1,146 @@
+import math
+from collections import deque, namedtuple
+
+import numpy as np
+
+HH = "HH"
+H = "H"
+L = "L"
+LL = "LL"
+RODZAJE = (HH, H, L, LL)
+
+# aktywny=True: wejście w alarm, False: powrót; wartosc to poziom w %
+Zdarzenie = namedtuple("Zdarzenie", "krok czas punkt nazwa rodzaj aktywny wartosc")
+
+
+class Alarmy:
+    # Punkty alarmowe poziomu zbiorników: HH/H wchodzą powyżej progu, L/LL
+    # poniżej, a wracają dopiero po przejściu progu o histereza (strefa
+    # martwa). Warunek musi trwać opoznienie sekund czasu symulacji, zanim
+    # alarm wejdzie. Wszystkie punkty oceniane są co okres jednym przebiegiem
+    # po tablicach NumPy, więc koszt rośnie z liczbą zbiorników, nie punktów.
+    # Blokada zamyka rurę (Rura.blokada), dopóki aktywny jest którykolwiek
+    # z jej punktów. Zmiany stanu trafiają do ograniczonego dziennika zdarzeń.
+    def __init__(self, instalacja, okres=0.1, pojemnosc_dziennika=10000):
+        self.instalacja = instalacja
+        self.okres = okres
+        self.zdarzenia = deque(maxlen=pojemnosc_dziennika)
+        self.liczba_zdarzen = 0
+        self._punkty = []
+        self._blokady = []
+        self._termin = None
+        self._zmienione = False
+        self.aktywne = None
+
+    def dodaj(self, zbiornik, rodzaj, prog, histereza=1.0, opoznienie=0.0, nazwa=None):
+        # prog i histereza w % pojemności; zwraca numer punktu
+        if rodzaj not in RODZAJE:
+            raise ValueError(f"Nieznany rodzaj alarmu: {rodzaj}")
+        if nazwa is None:
+            nazwa = f"{zbiornik.nazwa.split(' ')[0]} {rodzaj}"
+        self._punkty.append((zbiornik, rodzaj, float(prog), float(histereza), float(opoznienie), nazwa))
+        self.aktywne = None
+        return len(self._punkty) - 1
+
+    def dodaj_progi(self, zbiornik, hh=95.0, h=85.0, l=10.0, ll=2.0, histereza=1.0, opoznienie=0.0):
+        # komplet HH/H/L/LL; None pomija próg
+        return {rodzaj: self.dodaj(zbiornik, rodzaj, prog, histereza, opoznienie)
+                for rodzaj, prog in ((HH, hh), (H, h), (L, l), (LL, ll)) if prog is not None}
+
+    def dodaj_blokade(self, rura, *punkty):
+        for punkt in punkty:
+            self._blokady.append((rura, punkt))
+        self.aktywne = None
+
+    def podlacz(self):
+        self.instalacja.po_kroku.append(self.ocen)
+        self.instalacja.ograniczenia_skoku.append(self.kroki_do_oceny)
+        self.instalacja.terminy_po_kroku[self.ocen] = self.kroki_do_terminu
+
+    def kompiluj(self):
+        indeks = {id(z): i for i, z in enumerate(self.instalacja.zbiorniki)}
+        n = len(self._punkty)
+        self._indeksy = np.array([indeks[id(p[0])] for p in self._punkty], dtype=np.intp)
+        # znak +1 dla HH/H, -1 dla L/LL: przekroczenie to znak * (pv - prog) > 0
+        self._znak = np.array([1.0 if p[1] in (HH, H) else -1.0 for p in self._punkty])
+        self._prog = np.array([p[2] for p in self._punkty])
+        self._histereza = np.array([p[3] for p in self._punkty])
+        self._opoznienie = np.array([p[4] for p in self._punkty])
+        self.aktywne = np.zeros(n, dtype=bool)
+        self._od = np.full(n, np.nan)
+
+        rury = list({id(r): r for r, _ in self._blokady}.values())
+        indeks_rur = {id(r): i for i, r in enumerate(rury)}
+        self._rury_blokad = rury
+        self._blokady_rur = np.array([indeks_rur[id(r)] for r, _ in self._blokady], dtype=np.intp)
+        self._blokady_punktow = np.array([p for _, p in self._blokady], dtype=np.intp)
+        self._zablokowane = np.zeros(len(rury), dtype=bool)
+        for r in rury:
+            r.blokada = False
+        if self._termin is None:
+            self._termin = self.instalacja.czas
+
+    def ocen(self):
+        if self.aktywne is None:
+            self.kompiluj()
+        s = self.instalacja
+        czas = s.czas
+        if czas < self._termin - 1e-9:
+            return
+        while self._termin <= czas + 1e-9:
+            self._termin += self.okres
+
+        zbiorniki = s.zbiorniki
+        poziomy = np.fromiter((z.aktualna_ilosc / z.pojemnosc for z in zbiorniki), np.float64,
+                              len(zbiorniki)) * 100.0
+        pv = poziomy[self._indeksy]
+        przekroczenie = self._znak * (pv - self._prog)
+        warunek = przekroczenie > 0.0
+        # początek trwania warunku dla opóźnienia załączenia
+        self._od = np.where(warunek, np.fmin(self._od, czas), np.nan)
+        wejscie = warunek & ~self.aktywne & (czas - self._od >= self._opoznienie - 1e-9)
+        powrot = self.aktywne & (przekroczenie < -self._histereza)
+        zmiany = np.flatnonzero(wejscie | powrot)
+        if not len(zmiany):
+            return
+
+        self.aktywne[zmiany] = ~self.aktywne[zmiany]
+        krok = s.licznik_krokow
+        for i, aktywny, wartosc in zip(zmiany.tolist(), self.aktywne[zmiany].tolist(), pv[zmiany].tolist()):
+            punkt = self._punkty[i]
+            self.zdarzenia.append(Zdarzenie(krok, czas, i, punkt[5], punkt[1], aktywny, wartosc))
+        self.liczba_zdarzen += len(zmiany)
+
+        if len(self._rury_blokad):
+            zablokowane = np.bincount(self._blokady_rur, self.aktywne[self._blokady_punktow],
+                                      len(self._rury_blokad)) > 0
+            for i in np.flatnonzero(zablokowane != self._zablokowane).tolist():
+                self._rury_blokad[i].blokada = bool(zablokowane[i])
+                self._zmienione = True
+            self._zablokowane = zablokowane
+
+    def kroki_do_oceny(self, dt):
+        # run_zdarzeniowo nie przeskakuje oceny alarmów; krok po zmianie
+        # blokady liczony wprost, jak po zmianie otwarć w sterowanie.py
+        if self._zmienione:
+            self._zmienione = False
+            return 0
+        if self._termin is None:
+            return 0
+        return max(0, math.floor((self._termin - self.instalacja.czas) / dt) - 2)
+
+    def kroki_do_terminu(self, dt):
+        # kroki, po których ocen() na pewno nic nie zrobi; granica jak
+        # w Sterowanie.kroki_do_terminu
+        if self.aktywne is None or self._termin is None:
+            return 0
+        return max(0, math.ceil((self._termin - 1e-9 - self.instalacja.czas) / dt - 0.01) - 1)
+
+    def aktywne_punkty(self):
+        if self.aktywne is None:
+            return []
+        return [self._punkty[i][5] for i in np.flatnonzero(self.aktywne).tolist()]
+
+    def ostatnie(self, n=None):
+        zdarzenia = list(self.zdarzenia)
+        return zdarzenia if n is None else zdarzenia[-n:]
@@ -0,0 +1,208 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+from silnik import SilnikKaskady, instalacja_testowa
+
+# Pomiary wydajności modelu i rysowania; wyniki w JSON, opcjonalnie
+# porównane z wcześniejszym plikiem (--porownaj), żeby regresje wychodziły
+# przed wdrożeniem. Rysowanie wymaga PyQt5; bez ekranu uruchamiać z
+# QT_QPA_PLATFORM=offscreen.
+
+ROZMIARY = (4, 16, 64, 256, 1024)
+
+
+def zmierz(funkcja, czas_pomiaru=0.2, powtorzenia=5):
+    # najlepszy z powtorzenia pomiarów średniego czasu jednego wywołania;
+    # liczba wywołań dobrana tak, żeby całość trwała około czas_pomiaru
+    funkcja()
+    n = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(n):
+            funkcja()
+        czas = time.perf_counter() - start
+        if czas >= czas_pomiaru / powtorzenia / 10:
+            break
+        n *= 2
+    n = max(1, int(n * czas_pomiaru / powtorzenia / czas))
+
+    najlepszy = float("inf")
+    for _ in range(powtorzenia):
+        start = time.perf_counter()
+        for _ in range(n):
+            funkcja()
+        najlepszy = min(najlepszy, (time.perf_counter() - start) / n)
+    return najlepszy
+
+
+def pomiary_modelu(czas_pomiaru):
+    wyniki = []
+
+    s = SilnikKaskady()
+    czas = zmierz(s.step, czas_pomiaru)
+    wyniki.append(("krok_kaskady", {}, 1.0 / czas, "kroki/s"))
+
+    # godzina pracy od stanu początkowego, zdarzeniowo
+    czas = zmierz(lambda: SilnikKaskady().run_zdarzeniowo(until=3600), czas_pomiaru)
+    wyniki.append(("godzina_zdarzeniowo", {}, czas * 1000.0, "ms"))
+
+    for n in ROZMIARY:
+        s = instalacja_testowa(n)
+        czas = zmierz(s.step, czas_pomiaru)
+        wyniki.append(("krok_instalacji", {"zbiorniki": n, "rury": len(s.rury)}, 1.0 / czas, "kroki/s"))
+
+    try:
+        from silnik_wsadowy import SilnikWsadowy
+    except ImportError:
+        return wyniki
+    for n in (1, 100, 10000):
+        wsad = SilnikWsadowy(n)
+        czas = zmierz(wsad.step, czas_pomiaru)
+        wyniki.append(("krok_wsadowy", {"instancje": n}, n / czas, "instancjokroki/s"))
+    return wyniki
+
+
+def pomiary_rysowania(czas_pomiaru):
+    from PyQt5.QtWidgets import QApplication, QWidget
+    from PyQt5.QtCore import QPoint
+    from PyQt5.QtGui import QImage, QPainter, QRegion, QColor
+
+    app = QApplication.instance()
+    if app is None:
+        app = QApplication(sys.argv[:1])
+
+    from okno import SymulacjaKaskady
+    from rysowanie import rysowniki
+    from widok_sceny import ScenaInstalacji
+
+    wyniki = []
+    okno = SymulacjaKaskady()
+    obraz = QImage(okno.size(), QImage.Format_ARGB32_Premultiplied)
+
+    def rysuj_okno():
+        # sam paintEvent okna, bez widżetów potomnych (przyciski, wykres)
+        okno.render(obraz, QPoint(), QRegion(), QWidget.DrawWindowBackground)
+
+    czas = zmierz(rysuj_okno, czas_pomiaru)
+    wyniki.append(("paint_okna", {}, czas * 1000.0, "ms"))
+
+    def rysuj_okno_od_zera():
+        okno.uniewaznij_warstwy()
+        rysuj_okno()
+
+    # z budową obu warstw; paint_okna to klatka z gotowymi warstwami
+    czas = zmierz(rysuj_okno_od_zera, czas_pomiaru)
+    wyniki.append(("paint_okna_od_zera", {}, czas * 1000.0, "ms"))
+    okno.close()
+
+    for n in ROZMIARY:
+        s = instalacja_testowa(n)
+        s.run(max_steps=50)
+        szer = int(max(z.x + z.width for z in s.zbiorniki)) + 20
+        wys = int(max(z.y + z.height for z in s.zbiorniki)) + 20
+        obraz = QImage(szer, wys, QImage.Format_ARGB32_Premultiplied)
+        rury, zbiorniki = rysowniki(s)
+
+        def rysuj_instalacje():
+            obraz.fill(QColor("#2b2b2b"))
+            p = QPainter(obraz)
+            p.setRenderHint(QPainter.Antialiasing)
+            for r in rury:
+                r.draw(p)
+            for z in zbiorniki:
+                z.draw(p)
+            p.end()
+
+        czas = zmierz(rysuj_instalacje, czas_pomiaru)
+        wyniki.append(("rysowanie_instalacji", {"zbiorniki": n, "rury": len(s.rury)}, czas * 1000.0, "ms"))
+
+        # widok sceny: cała instalacja dopasowana do okna przeglądu
+        scena = ScenaInstalacji(s)
+        przeglad = QImage(1400, 900, QImage.Format_ARGB32_Premultiplied)
+
+        def rysuj_scene():
+            p = QPainter(przeglad)
+            p.setRenderHint(QPainter.Antialiasing)
+            scena.render(p)
+            p.end()
+
+        czas = zmierz(rysuj_scene, czas_pomiaru)
+        wyniki.append(("rysowanie_sceny", {"zbiorniki": n, "rury": len(s.rury)}, czas * 1000.0, "ms"))
+    return wyniki
+
+
+def srodowisko():
+    opis = {"python": platform.python_version(), "system": platform.platform(),
+            "procesor": platform.processor() or platform.machine(), "rdzenie": os.cpu_count()}
+    try:
+        import numpy
+        opis["numpy"] = numpy.__version__
+    except ImportError:
+        pass
+    try:
+        from PyQt5.QtCore import QT_VERSION_STR
+        opis["qt"] = QT_VERSION_STR
+    except ImportError:
+        pass
+    return opis
+
+
+def klucz(wynik):
+    return wynik["nazwa"] + "".join(f" {k}={v}" for k, v in sorted(wynik["parametry"].items()))
+
+
+def porownaj(wyniki, poprzednie, tolerancja):
+    # lista (klucz, stary, nowy, zmiana) dla wyników gorszych o więcej niż tolerancja
+    stare = {klucz(w): w for w in poprzednie}
+    regresje = []
+    for w in wyniki:
+        stary = stare.get(klucz(w))
+        if stary is None or stary["jednostka"] != w["jednostka"]:
+            continue
+        if w["jednostka"] == "ms":
+            zmiana = w["wartosc"] / stary["wartosc"] - 1.0
+        else:
+            zmiana = stary["wartosc"] / w["wartosc"] - 1.0
+        if zmiana > tolerancja:
+            regresje.append((klucz(w), stary["wartosc"], w["wartosc"], zmiana))
+    return regresje
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pomiary wydajności modelu i rysowania kaskady.")
+    parser.add_argument("--wyjscie", default="benchmark.json", help="plik wyników JSON")
+    parser.add_argument("--czas", type=float, default=0.2, help="czas jednego pomiaru [s]")
+    parser.add_argument("--bez-rysowania", action="store_true", help="tylko model, bez PyQt5")
+    parser.add_argument("--porownaj", help="wcześniejszy plik wyników do porównania")
+    parser.add_argument("--tolerancja", type=float, default=0.15,
+                        help="dopuszczalne pogorszenie względem --porownaj (domyślnie 0.15)")
+    args = parser.parse_args(argv)
+
+    wyniki = pomiary_modelu(args.czas)
+    if not args.bez_rysowania:
+        wyniki += pomiary_rysowania(args.czas)
+    wyniki = [{"nazwa": nazwa, "parametry": parametry, "wartosc": wartosc, "jednostka": jednostka}
+              for nazwa, parametry, wartosc, jednostka in wyniki]
+
+    for w in wyniki:
+        print(f"{klucz(w):45s} {w['wartosc']:14.3f} {w['jednostka']}")
+    with open(args.wyjscie, "w") as f:
+        json.dump({"srodowisko": srodowisko(), "czas": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                   "wyniki": wyniki}, f, indent=1, ensure_ascii=False)
+
+    if args.porownaj:
+        with open(args.porownaj) as f:
+            poprzednie = json.load(f)["wyniki"]
+        regresje = porownaj(wyniki, poprzednie, args.tolerancja)
+        for nazwa, stary, nowy, zmiana in regresje:
+            print(f"REGRESJA {nazwa}: {stary:.3f} -> {nowy:.3f} ({zmiana:+.0%})")
+        if regresje:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+import numpy as np
+
+
+class _Tablica:
+    # tablica dopisywana na końcu z amortyzowanym podwajaniem pojemności
+    def __init__(self, kolumny, dtype):
+        self.dane = np.empty((1024, kolumny) if kolumny else 1024, dtype=dtype)
+        self.n = 0
+        self.przesuniecie = 0
+
+    def dopisz(self, wartosci):
+        k = len(wartosci)
+        if self.n + k > len(self.dane):
+            nowy_rozmiar = max(2 * len(self.dane), self.n + k)
+            nowe = np.empty((nowy_rozmiar,) + self.dane.shape[1:], dtype=self.dane.dtype)
+            nowe[:self.n] = self.dane[:self.n]
+            self.dane = nowe
+        self.dane[self.n:self.n + k] = wartosci
+        self.n += k
+
+    def widok(self):
+        return self.dane[:self.n]
+
+    def usun_poczatek(self, k):
+        # przesuniecie: ile elementów usunięto z początku od utworzenia
+        self.dane[:self.n - k] = self.dane[k:self.n]
+        self.n -= k
+        self.przesuniecie += k
+
+
+class PiramidaMinMax:
+    # Poziom 0 to próbki, poziom l trzyma min/max bloków po podstawa**l
+    # próbek i czas pierwszej próbki bloku. Każdy poziom trzyma najwyżej
+    # pojemnosc_poziomu pozycji: po przekroczeniu usuwa najstarsze, już
+    # zebrane w bloki poziomu wyżej, więc pełna rozdzielczość zostaje dla
+    # ostatnich próbek, a starsze są coraz grubsze. Pamięć rośnie
+    # logarytmicznie z czasem pracy.
+    def __init__(self, liczba_serii, podstawa=8, pojemnosc_poziomu=1 << 16):
+        self.liczba_serii = liczba_serii
+        self.podstawa = podstawa
+        self.pojemnosc_poziomu = max(pojemnosc_poziomu, 2 * podstawa)
+        self._czas = _Tablica(0, np.float64)
+        self._wartosci = _Tablica(liczba_serii, np.float32)
+        # poziomy od 1: (czas, min, max)
+        self._poziomy = []
+
+    def __len__(self):
+        # liczba wszystkich dodanych próbek
+        return self._czas.przesuniecie + self._czas.n
+
+    def _poziom(self, l):
+        if l == 0:
+            return self._czas, self._wartosci, self._wartosci
+        return self._poziomy[l - 1]
+
+    def zakres_czasu(self):
+        if self._czas.n == 0:
+            return None
+        # najstarsze zachowane dane są w najgrubszym poziomie
+        najstarszy = self._poziom(len(self._poziomy))[0].widok()
+        return float(najstarszy[0]), float(self._czas.widok()[-1])
+
+    def dodaj(self, czas, wartosci):
+        if len(czas) == 0:
+            return
+        self._czas.dopisz(czas)
+        self._wartosci.dopisz(wartosci)
+
+        B = self.podstawa
+        l = 0
+        while True:
+            n_czas, n_min, n_max = self._poziom(l)
+            wszystkie = n_czas.przesuniecie + n_czas.n
+            if wszystkie < B:
+                break
+            if l == len(self._poziomy):
+                self._poziomy.append((_Tablica(0, np.float64), _Tablica(self.liczba_serii, np.float32),
+                                      _Tablica(self.liczba_serii, np.float32)))
+            p_czas, p_min, p_max = self._poziomy[l]
+            gotowe = wszystkie // B
+            zebrane = p_czas.przesuniecie + p_czas.n
+            if gotowe > zebrane:
+                # indeksy w tablicach poziomu niżej, po usuniętym początku
+                a = zebrane * B - n_czas.przesuniecie
+                b = gotowe * B - n_czas.przesuniecie
+                blok_min = n_min.widok()[a:b].reshape(-1, B, self.liczba_serii).min(axis=1)
+                blok_max = n_max.widok()[a:b].reshape(-1, B, self.liczba_serii).max(axis=1)
+                p_czas.dopisz(n_czas.widok()[a:b:B])
+                p_min.dopisz(blok_min)
+                p_max.dopisz(blok_max)
+            # nadmiar poziomu niżej usuwany połową pojemności naraz, więc
+            # kopiowanie kosztuje stały czas na próbkę
+            if n_czas.n > self.pojemnosc_poziomu:
+                k = min(n_czas.n - self.pojemnosc_poziomu // 2, gotowe * B - n_czas.przesuniecie)
+                for tablica in {id(t): t for t in (n_czas, n_min, n_max)}.values():
+                    tablica.usun_poczatek(k)
+            l += 1
+
+    def zapytanie(self, t0, t1, kolumny):
+        # min i max każdej serii w każdej z kolumny równych części [t0, t1);
+        # puste kolumny mają NaN
+        wynik_min = np.full((kolumny, self.liczba_serii), np.nan, dtype=np.float32)
+        wynik_max = np.full((kolumny, self.liczba_serii), np.nan, dtype=np.float32)
+        if self._czas.n == 0 or kolumny <= 0 or t1 <= t0:
+            return wynik_min, wynik_max
+
+        # najdrobniejszy poziom, który nie usunął danych sprzed t0
+        najgrubszy = len(self._poziomy)
+        l = 0
+        while l < najgrubszy and self._poziom(l)[0].przesuniecie and self._poziom(l)[0].widok()[0] > t0:
+            l += 1
+        czas = self._poziom(l)[0].widok()
+        widocznych = (int(np.searchsorted(czas, t1, side="left"))
+                      - int(np.searchsorted(czas, t0, side="left"))) * self.podstawa ** l
+        if widocznych == 0 and l == 0:
+            return wynik_min, wynik_max
+
+        # najgrubszy poziom, w którym blok nie przekracza 1/podstawa kolumny,
+        # żeby przypisanie bloku do kolumny przesuwało go o mniej niż piksel
+        while l < najgrubszy and self.podstawa ** (l + 2) * kolumny <= widocznych:
+            l += 1
+
+        # bloki poziomu l, a po nich ogony poziomów niższych, jeszcze
+        # niezebrane w pełne bloki poziomu wyżej
+        czesci = []
+        for j in range(l, -1, -1):
+            j_czas, j_min, j_max = (t.widok() for t in self._poziom(j))
+            pa = int(np.searchsorted(j_czas, t0, side="left"))
+            pb = int(np.searchsorted(j_czas, t1, side="left"))
+            if j < l:
+                wyzej = self._poziom(j + 1)[0]
+                pa = max(pa, (wyzej.przesuniecie + wyzej.n) * self.podstawa - self._poziom(j)[0].przesuniecie)
+            if pb > pa:
+                czesci.append((j_czas[pa:pb], j_min[pa:pb], j_max[pa:pb]))
+        if not czesci:
+            return wynik_min, wynik_max
+        k_czas = np.concatenate([c[0] for c in czesci])
+        k_min = np.concatenate([c[1] for c in czesci])
+        k_max = np.concatenate([c[2] for c in czesci])
+
+        kolumna = ((k_czas - t0) * (kolumny / (t1 - t0))).astype(np.int64)
+        np.clip(kolumna, 0, kolumny - 1, out=kolumna)
+        # kolumna jest niemalejąca, więc granice grup wyznacza jej zmiana
+        poczatki = np.flatnonzero(np.diff(kolumna, prepend=-1))
+        zajete = kolumna[poczatki]
+        wynik_min[zajete] = np.minimum.reduceat(k_min, poczatki, axis=0)
+        wynik_max[zajete] = np.maximum.reduceat(k_max, poczatki, axis=0)
+        return wynik_min, wynik_max
@@ -0,0 +1,195 @@
+import argparse
+import math
+import struct
+
+from silnik import SilnikKaskady
+from stan import FLAGA_STEROWANIE, czytaj_naglowek, wczytaj_stan, zapisz_stan
+
+# dziennik akcji operatora: nagłówek (znacznik, wersja, krok symulacji),
+# potem rekordy (numer kroku, kod, długość danych) z danymi polecenia;
+# rekordy STAN i KLATKA niosą migawkę ze stan.py
+ZNACZNIK = b"DZIENNIK"
+WERSJA = 1
+FORMAT_NAGLOWKA = "<8sId"
+FORMAT_REKORDU = "<qBH"
+
+NAPELNIJ = 1
+OPROZNIJ = 2
+NASTAWA = 3
+PREDKOSC = 4
+WZNOW = 5
+WSTRZYMAJ = 6
+# wczytanie stanu przez operatora i okresowa klatka kluczowa do przewijania
+STAN = 7
+KLATKA = 8
+
+KODY = {"napelnij": NAPELNIJ, "oproznij": OPROZNIJ, "nastawa": NASTAWA, "predkosc": PREDKOSC,
+        "wznow": WZNOW, "wstrzymaj": WSTRZYMAJ, "wczytaj_stan": STAN}
+# kod -> format danych polecenia; brak nastawy (None) zapisany jako NaN
+DANE = {NAPELNIJ: "<I", OPROZNIJ: "<I", NASTAWA: "<Id", PREDKOSC: "<d", WZNOW: "", WSTRZYMAJ: ""}
+
+_rekord = struct.Struct(FORMAT_REKORDU)
+
+
+class DziennikOperatora:
+    def __init__(self, instalacja, dt, plik=None, co_ile_krokow=60000):
+        self.instalacja = instalacja
+        self.dt = dt
+        self.co_ile_krokow = co_ile_krokow
+        self.dane = bytearray(struct.pack(FORMAT_NAGLOWKA, ZNACZNIK, WERSJA, dt))
+        self._zrzucone = 0
+        self._plik = open(plik, "wb") if plik is not None else None
+        # stan początkowy jest pierwszą klatką kluczową
+        self._dopisz(KLATKA, zapisz_stan(instalacja))
+
+    def podlacz(self):
+        self.instalacja.po_kroku.append(self._po_kroku)
+        self.instalacja.terminy_po_kroku[self._po_kroku] = self.kroki_do_klatki
+
+    def kroki_do_klatki(self, dt):
+        return self.co_ile_krokow - 1 - self.instalacja.licznik_krokow % self.co_ile_krokow
+
+    def _po_kroku(self):
+        # plik jest dopisywany przy każdej klatce i akcji operatora, więc po
+        # awarii programu dziennik kończy się najwyżej na ostatniej z nich
+        if self.instalacja.licznik_krokow % self.co_ile_krokow == 0:
+            self._dopisz(KLATKA, zapisz_stan(self.instalacja))
+            self.zrzuc()
+
+    def zapisz(self, polecenie, argumenty):
+        # wywoływane przed wykonaniem polecenia na granicy kroków; polecenia
+        # spoza KODY (np. zapisz_stan, zakoncz) nie zmieniają przebiegu
+        kod = KODY.get(polecenie)
+        if kod is None:
+            return
+        if kod == STAN:
+            self._dopisz(kod, bytes(argumenty[0]))
+        elif kod == NASTAWA:
+            indeks, wartosc = argumenty
+            self._dopisz(kod, struct.pack(DANE[kod], indeks, math.nan if wartosc is None else wartosc))
+        else:
+            self._dopisz(kod, struct.pack(DANE[kod], *argumenty))
+        self.zrzuc()
+
+    def _dopisz(self, kod, dane):
+        self.dane += _rekord.pack(self.instalacja.licznik_krokow, kod, len(dane))
+        self.dane += dane
+
+    def zrzuc(self):
+        if self._plik is None:
+            return
+        self._plik.write(self.dane[self._zrzucone:])
+        self._plik.flush()
+        self._zrzucone = len(self.dane)
+
+    def zamknij(self):
+        # końcowa klatka zapamiętuje, dokąd doszła symulacja po ostatniej akcji
+        self._dopisz(KLATKA, zapisz_stan(self.instalacja))
+        if self._plik is not None:
+            self.zrzuc()
+            self._plik.close()
+            self._plik = None
+
+
+def czytaj_dziennik(dane):
+    # (dt, lista rekordów (krok, kod, dane)); urwany rekord na końcu jest pomijany
+    znacznik, wersja, dt = struct.unpack_from(FORMAT_NAGLOWKA, dane)
+    if znacznik != ZNACZNIK or wersja != WERSJA:
+        raise ValueError(f"To nie jest dziennik operatora w wersji {WERSJA}")
+    rekordy = []
+    i = struct.calcsize(FORMAT_NAGLOWKA)
+    while i + _rekord.size <= len(dane):
+        krok, kod, dlugosc = _rekord.unpack_from(dane, i)
+        i += _rekord.size
+        if i + dlugosc > len(dane):
+            break
+        rekordy.append((krok, kod, bytes(dane[i:i + dlugosc])))
+        i += dlugosc
+    return dt, rekordy
+
+
+class OdtwarzanieDziennika:
+    def __init__(self, dane):
+        if isinstance(dane, str):
+            with open(dane, "rb") as f:
+                dane = f.read()
+        self.dt, self.rekordy = czytaj_dziennik(dane)
+
+        # odcinki między wczytaniami stanu: (pierwszy krok, ostatni krok,
+        # klatki (krok, indeks rekordu)); licznik kroków po wczytaniu stanu
+        # może się cofnąć, więc każdy odcinek ma własną oś kroków
+        self.odcinki = []
+        for i, (krok, kod, dane_rekordu) in enumerate(self.rekordy):
+            if kod == STAN or i == 0:
+                if self.odcinki:
+                    self.odcinki[-1][1] = krok
+                self.odcinki.append([czytaj_naglowek(dane_rekordu)[3], None, [(krok, i)]])
+            elif kod == KLATKA:
+                self.odcinki[-1][2].append((krok, i))
+        # klatka STAN ma numer kroku sprzed wczytania; w odcinku liczy się stan po nim
+        for odcinek in self.odcinki:
+            odcinek[2][0] = (odcinek[0], odcinek[2][0][1])
+
+    def ze_sterowaniem(self):
+        # czy migawki zawierają stan pętli regulacji (np. SilnikKaskady(regulator_pid=True))
+        return bool(self.rekordy and czytaj_naglowek(self.rekordy[0][2])[2] & FLAGA_STEROWANIE)
+
+    def koniec(self):
+        return self.odcinki[-1][2][-1][0] if self.odcinki else 0
+
+    def odtworz(self, instalacja, do_kroku=None):
+        # Stan po kroku do_kroku, sprzed poleceń wydanych na tej granicy; bez
+        # do_kroku cały dziennik. Start od najbliższej wcześniejszej klatki,
+        # dalej skoki zdarzeniowe między poleceniami, bit w bit jak na żywo.
+        odcinek = None
+        for poczatek, koniec, klatki in reversed(self.odcinki):
+            if do_kroku is None or (poczatek <= do_kroku and (koniec is None or do_kroku <= koniec)):
+                odcinek = (koniec, klatki)
+                break
+        if odcinek is None:
+            raise ValueError(f"Dziennik nie obejmuje kroku {do_kroku}")
+        koniec, klatki = odcinek
+
+        start = klatki[0][1]
+        for krok, i in klatki:
+            if do_kroku is None or krok <= do_kroku:
+                start = i
+        wczytaj_stan(instalacja, self.rekordy[start][2])
+
+        for krok, kod, dane in self.rekordy[start + 1:]:
+            if kod == STAN or (do_kroku is not None and krok >= do_kroku):
+                break
+            self._dojdz(instalacja, krok)
+            if kod == NAPELNIJ:
+                instalacja.napelnij(instalacja.zbiorniki[struct.unpack(DANE[kod], dane)[0]])
+            elif kod == OPROZNIJ:
+                instalacja.oproznij(instalacja.zbiorniki[struct.unpack(DANE[kod], dane)[0]])
+            elif kod == NASTAWA:
+                indeks, wartosc = struct.unpack(DANE[kod], dane)
+                instalacja.ustaw_nastawe(instalacja.zbiorniki[indeks], None if math.isnan(wartosc) else wartosc)
+        if do_kroku is not None:
+            self._dojdz(instalacja, do_kroku)
+        return instalacja
+
+    def _dojdz(self, instalacja, krok):
+        if krok > instalacja.licznik_krokow:
+            instalacja.run_zdarzeniowo(max_steps=krok - instalacja.licznik_krokow, dt=self.dt)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Odtworzenie dziennika operatora kaskady bez okna.")
+    parser.add_argument("plik", help="plik dziennika zapisany przez okno")
+    parser.add_argument("--krok", type=int, default=None, help="numer kroku (domyślnie koniec dziennika)")
+    args = parser.parse_args(argv)
+
+    odtwarzanie = OdtwarzanieDziennika(args.plik)
+    s = odtwarzanie.odtworz(SilnikKaskady(regulator_pid=odtwarzanie.ze_sterowaniem()), args.krok)
+    print(f"krok {s.licznik_krokow}, czas {s.czas:.3f} s")
+    for z in s.zbiorniki:
+        print(f"{z.nazwa}: {z.aktualna_ilosc!r} nastawa {z.nastawa_poziomu}")
+    for k, r in enumerate(s.rury, 1):
+        print(f"rura{k}: {'płynie' if r.czy_plynie else 'stoi'}")
+
+
+if __name__ == '__main__':
+    main()
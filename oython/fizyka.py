@@ -0,0 +1,126 @@
+import math
+
+import numpy as np
+
+from silnik import KROK_CZASU
+
+# współczynniki Dormanda-Prince'a 5(4)
+_A = (
+    (),
+    (1 / 5,),
+    (3 / 40, 9 / 40),
+    (44 / 45, -56 / 15, 32 / 9),
+    (19372 / 6561, -25360 / 2187, 64448 / 6561, -212 / 729),
+    (9017 / 3168, -355 / 33, 46732 / 5247, 49 / 176, -5103 / 18656),
+)
+_B = (35 / 384, 0.0, 500 / 1113, 125 / 192, -2187 / 6784, 11 / 84)
+# różnica rozwiązań rzędu 5 i 4 (ostatni etap rzędu 4 liczony w punkcie końcowym)
+_E = (71 / 57600, 0.0, -71 / 16695, 71 / 1920, -17253 / 339200, 22 / 525, -1 / 40)
+
+
+class ModelFizyczny:
+    # Przepływ rury zależny od poziomu źródła (Torricelli): q = q_max * sqrt(poziom),
+    # gdzie q_max = (wydatek albo flow_speed) / KROK_CZASU, czyli przy pełnym
+    # zbiorniku tyle, ile w modelu stałego wydatku. Rura z krzywa_pompy
+    # (q0, h0) tłoczy q0 * (1 - (dh/h0)^2), dh = poziom celu - poziom źródła.
+    # Progi z Instalacja.polacz() działają jak zawory pływakowe: na odcinku
+    # szerokosc_zaworu przed progiem przepływ maleje liniowo do zera. Ostre
+    # przełączanie dawałoby przy dopływie równym odpływowi nieskończenie
+    # wiele zdarzeń (ten sam stukot zaworu co w modelu krokowym).
+    def __init__(self, rtol=1e-6, atol=1e-6, krok_maks=60.0, szerokosc_zaworu=0.5):
+        self.rtol = rtol
+        self.atol = atol
+        self.krok_maks = krok_maks
+        self.szerokosc_zaworu = szerokosc_zaworu
+        self.kroki = 0
+        self.odrzucone = 0
+        self._h = None
+        self._uklad = None
+
+    def _przygotuj(self, instalacja):
+        polaczenia = instalacja.polaczenia
+        if self._uklad is not None and self._uklad[0] is polaczenia:
+            return self._uklad
+        zbiorniki = instalacja.zbiorniki
+        zrodla = np.array(instalacja.indeksy_zrodel, dtype=np.intp)
+        cele = np.array(instalacja.indeksy_celow, dtype=np.intp)
+        progi = np.array([p[3] for p in polaczenia], dtype=np.float64)
+        z_nastawa = np.array([p[4] for p in polaczenia], dtype=bool)
+        q_max = np.array([(instalacja.flow_speed if p[5] is None else p[5]) / KROK_CZASU
+                          for p in polaczenia], dtype=np.float64)
+        pompy = [(k, p[0].krzywa_pompy) for k, p in enumerate(polaczenia) if p[0].krzywa_pompy is not None]
+        pojemnosc = np.array([z.pojemnosc for z in zbiorniki], dtype=np.float64)
+        self._uklad = (polaczenia, zrodla, cele, progi, z_nastawa, q_max, pompy, pojemnosc)
+        return self._uklad
+
+    def calkuj(self, instalacja, czas):
+        # przesuwa stan instalacji o czas sekund krokami dobieranymi do błędu;
+        # zwraca liczbę przyjętych kroków
+        polaczenia, zrodla, cele, progi, z_nastawa, q_max, pompy, pojemnosc = self._przygotuj(instalacja)
+        zbiorniki = instalacja.zbiorniki
+        n = len(zbiorniki)
+        nastawy = np.array([np.nan if z.nastawa_poziomu is None else z.nastawa_poziomu for z in zbiorniki])
+        # brak nastawy zamyka rurę, jak w modelu krokowym
+        limity = np.where(z_nastawa, np.nan_to_num(pojemnosc[cele] * (nastawy[cele] / 100.0), nan=-np.inf),
+                          pojemnosc[cele] - 0.1)
+        szerokosc = self.szerokosc_zaworu
+        # otwarcia rur ustawione przez regulatory i blokady stoją przez cały przedział
+        otwarcia = np.array([0.0 if p[0].blokada else p[0].otwarcie for p in polaczenia], dtype=np.float64)
+
+        def wydatki(v):
+            poziom = np.maximum(v, 0.0) / pojemnosc
+            q = q_max * np.sqrt(poziom[zrodla])
+            for k, (q0, h0) in pompy:
+                dh = max(poziom[cele[k]] - poziom[zrodla[k]], 0.0)
+                q[k] = q0 * max(1.0 - (dh / h0) ** 2, 0.0) if poziom[zrodla[k]] > 0 else 0.0
+            otwarcie = np.minimum(v[zrodla] - progi, limity - v[cele]) / szerokosc
+            return q * otwarcia * np.clip(otwarcie, 0.0, 1.0)
+
+        def bilans(przeniesione):
+            return np.bincount(cele, przeniesione, n) - np.bincount(zrodla, przeniesione, n)
+
+        v = np.array([z.aktualna_ilosc for z in zbiorniki], dtype=np.float64)
+        t = 0.0
+        h = min(self._h or czas, self.krok_maks)
+        przyjete = 0
+        k1 = wydatki(v)
+        while t < czas and k1.any():
+            ostatni = h >= czas - t
+            krok = czas - t if ostatni else h
+
+            etapy = [k1]
+            for a in _A[1:]:
+                etapy.append(wydatki(v + bilans(krok * sum(aij * kj for aij, kj in zip(a, etapy)))))
+            przeniesione = krok * sum(b * k for b, k in zip(_B, etapy))
+            v_nowe = v + bilans(przeniesione)
+            k7 = wydatki(v_nowe)
+            etapy.append(k7)
+            blad_rur = krok * sum(e * k for e, k in zip(_E, etapy))
+            skala = self.atol + self.rtol * np.maximum(np.abs(v), np.abs(v_nowe))
+            blad = math.sqrt(np.mean((bilans(blad_rur) / skala) ** 2))
+
+            if blad > 1.0 or (v_nowe < 0.0).any() or (v_nowe > pojemnosc).any():
+                self.odrzucone += 1
+                h = krok * (max(0.2, 0.9 * blad ** -0.2) if blad > 1.0 else 0.5)
+                continue
+
+            # przeniesienie rura po rurze; czego cel nie przyjmie, wraca do źródła
+            for (rura, zrodlo, cel, *_), ilosc in zip(polaczenia, przeniesione):
+                if ilosc > 0.0:
+                    pobrano = zrodlo.usun_ciecz(ilosc)
+                    dodano = cel.dodaj_ciecz(pobrano)
+                    if dodano < pobrano:
+                        zrodlo.dodaj_ciecz(pobrano - dodano)
+            v = np.array([z.aktualna_ilosc for z in zbiorniki], dtype=np.float64)
+            t = czas if ostatni else t + krok
+            przyjete += 1
+            # wydatki w punkcie końcowym są pierwszym etapem następnego kroku
+            k1 = k7 if (v == v_nowe).all() else wydatki(v)
+            if not ostatni:
+                h = min(krok * min(5.0, 0.9 * max(blad, 1e-10) ** -0.2), self.krok_maks)
+        self._h = h
+
+        for (rura, *_), q in zip(polaczenia, k1):
+            rura.ustaw_przeplyw(bool(q > 0.0))
+        self.kroki += przyjete
+        return przyjete
@@ -0,0 +1,35 @@
+import time
+
+
+class Harmonogram:
+    def __init__(self, silnik, dt=0.001, predkosc=1.0, max_krokow=5000):
+        self.silnik = silnik
+        self.dt = dt
+        self.predkosc = predkosc
+        # górna granica kroków w jednym wywołaniu; nadwyżka przepada, żeby
+        # po dłuższym zatrzymaniu pętla nie goniła czasu bez końca
+        self.max_krokow = max_krokow
+        self.zaleglosc = 0.0
+        self.pominiete_kroki = 0
+        self._ostatnio = None
+
+    def restart(self):
+        self.zaleglosc = 0.0
+        self._ostatnio = time.perf_counter()
+
+    def postep(self, uplynelo=None):
+        if uplynelo is None:
+            teraz = time.perf_counter()
+            uplynelo = 0.0 if self._ostatnio is None else teraz - self._ostatnio
+            self._ostatnio = teraz
+
+        self.zaleglosc += uplynelo * self.predkosc
+        kroki = int(self.zaleglosc / self.dt)
+        if kroki > self.max_krokow:
+            self.pominiete_kroki += kroki - self.max_krokow
+            self.zaleglosc -= (kroki - self.max_krokow) * self.dt
+            kroki = self.max_krokow
+        if kroki > 0:
+            self.silnik.run(max_steps=kroki, dt=self.dt)
+            self.zaleglosc -= kroki * self.dt
+        return kroki
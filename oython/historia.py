@@ -0,0 +1,195 @@
+import math
+import os
+import queue
+import struct
+import threading
+
+import numpy as np
+
+# nagłówek pliku archiwum: znacznik, wersja, liczba zbiorników, liczba rur,
+# rozmiar rekordu; dopełniony do ROZMIAR_NAGLOWKA bajtów
+ZNACZNIK = b"HISTORIA"
+WERSJA = 1
+FORMAT_NAGLOWKA = "<8sIIII"
+ROZMIAR_NAGLOWKA = 64
+
+
+def typ_rekordu(liczba_zbiornikow, liczba_rur):
+    # stały, spakowany układ little-endian; brak nastawy zapisany jako NaN;
+    # czas to oś historii: czas symulacji przesunięty tak, żeby nie malał
+    # po wczytaniu stanu ani w kolejnych sesjach dopisywanych do pliku
+    return np.dtype([
+        ("licznik_krokow", "<u8"),
+        ("czas", "<f8"),
+        ("ilosci", "<f8", (liczba_zbiornikow,)),
+        ("nastawy", "<f8", (liczba_zbiornikow,)),
+        ("przeplywy", "u1", (liczba_rur,)),
+    ])
+
+
+class Historian:
+    # okres: odstęp próbek w sekundach czasu symulacji (domyślnie 50 Hz),
+    # niezależny od kroku modelu; None to próbka po każdym kroku
+    def __init__(self, instalacja, pojemnosc_bufora=65536, plik=None, okres=0.02):
+        self.instalacja = instalacja
+        self.typ = typ_rekordu(len(instalacja.zbiorniki), len(instalacja.rury))
+        self.pojemnosc_bufora = pojemnosc_bufora
+        self.okres = okres
+
+        self.bufor = np.zeros(pojemnosc_bufora, dtype=self.typ)
+
+        # liczba wszystkich zapisanych próbek i próbek przekazanych do zapisu
+        # w pliku
+        self.licznik = 0
+        self.zrzucone = 0
+        # czas osi historii = czas symulacji + przesuniecie_czasu
+        self.przesuniecie_czasu = 0.0
+        self._ostatni_czas = -np.inf
+        # czas symulacji ostatniej próbki, do okresu próbkowania
+        self._ostatnia_probka = None
+
+        self.plik = plik
+        self._plik = None
+        if plik is not None:
+            naglowek = struct.pack(FORMAT_NAGLOWKA, ZNACZNIK, WERSJA, len(instalacja.zbiorniki),
+                                   len(instalacja.rury), self.typ.itemsize).ljust(ROZMIAR_NAGLOWKA, b"\0")
+            self._plik = open(plik, "ab")
+            if self._plik.tell() == 0:
+                self._plik.write(naglowek)
+            else:
+                with open(plik, "rb") as f:
+                    if f.read(ROZMIAR_NAGLOWKA) != naglowek:
+                        self._plik.close()
+                        raise ValueError(f"{plik}: archiwum innej instalacji lub wersji")
+                    # urwany rekord po przerwanej sesji jest obcinany, a nowa
+                    # sesja zaczyna się od czasu ostatniego rekordu
+                    liczba = (self._plik.tell() - ROZMIAR_NAGLOWKA) // self.typ.itemsize
+                    self._plik.truncate(ROZMIAR_NAGLOWKA + liczba * self.typ.itemsize)
+                    if liczba > 0:
+                        f.seek(ROZMIAR_NAGLOWKA + (liczba - 1) * self.typ.itemsize)
+                        self._ostatni_czas = float(np.frombuffer(f.read(self.typ.itemsize), dtype=self.typ)["czas"][0])
+            # plik pisze osobny wątek, z kopii połowy pierścienia, więc wątek
+            # symulacji nie czeka na dysk
+            self._do_zapisu = queue.SimpleQueue()
+            self._pisarz = threading.Thread(target=self._pisz, daemon=True)
+            self._pisarz.start()
+
+    def podlacz(self):
+        self.instalacja.po_kroku.append(self.zapisz)
+        self.instalacja.terminy_po_kroku[self.zapisz] = self.kroki_do_probki
+
+    def kroki_do_probki(self, dt):
+        ostatnia = self._ostatnia_probka
+        if not self.okres or ostatnia is None or self.instalacja.czas < ostatnia:
+            return 0
+        # ta sama granica co w Sterowanie.kroki_do_terminu
+        return max(0, math.ceil((ostatnia + self.okres - 1e-9 - self.instalacja.czas) / dt - 0.01) - 1)
+
+    def zapisz(self):
+        s = self.instalacja
+        ostatnia = self._ostatnia_probka
+        if self.okres and ostatnia is not None and 0.0 <= s.czas - ostatnia < self.okres - 1e-9:
+            return
+        self._ostatnia_probka = s.czas
+
+        czas = s.czas + self.przesuniecie_czasu
+        if czas < self._ostatni_czas:
+            # czas symulacji się cofnął (wczytany stan, nowa sesja)
+            self.przesuniecie_czasu += self._ostatni_czas - czas
+            czas = self._ostatni_czas
+        self._ostatni_czas = czas
+        # cały rekord jednym przypisaniem
+        self.bufor[self.licznik % self.pojemnosc_bufora] = (
+            s.licznik_krokow, czas,
+            [z.aktualna_ilosc for z in s.zbiorniki],
+            [np.nan if z.nastawa_poziomu is None else z.nastawa_poziomu for z in s.zbiorniki],
+            [r.czy_plynie for r in s.rury])
+        self.licznik += 1
+        if self._plik is not None and self.licznik - self.zrzucone >= max(1, self.pojemnosc_bufora // 2):
+            self._zlec_zapis()
+
+    def _zlec_zapis(self):
+        # kopia próbek jeszcze nieprzekazanych, zanim pierścień je nadpisze
+        for a, b in self._odcinki(self.zrzucone, self.licznik):
+            self._do_zapisu.put(self.bufor[a:b].copy())
+        self.zrzucone = self.licznik
+
+    def _pisz(self):
+        while True:
+            rekordy = self._do_zapisu.get()
+            if rekordy is None:
+                return
+            if isinstance(rekordy, threading.Event):
+                rekordy.set()
+                continue
+            self._plik.write(memoryview(rekordy))
+            self._plik.flush()
+
+    def zrzuc(self):
+        # przekazuje resztę próbek i czeka, aż trafią do pliku
+        if self._plik is None:
+            return
+        self._zlec_zapis()
+        gotowe = threading.Event()
+        self._do_zapisu.put(gotowe)
+        gotowe.wait()
+
+    def zamknij(self):
+        if self._plik is not None:
+            self._zlec_zapis()
+            self._do_zapisu.put(None)
+            self._pisarz.join()
+            self._plik.close()
+            self._plik = None
+
+    def ostatnie(self, n=None):
+        dostepne = min(self.licznik, self.pojemnosc_bufora)
+        n = dostepne if n is None else min(n, dostepne)
+        return self.probki(self.licznik - n, self.licznik)
+
+    def probki(self, od, do):
+        # kopia próbek o numerach [od, do), o ile są jeszcze w pierścieniu;
+        # starsze niż ostatni obieg zostały już nadpisane
+        do = min(do, self.licznik)
+        od = max(od, self.licznik - self.pojemnosc_bufora, 0)
+        czesci = [self.bufor[a:b] for a, b in self._odcinki(od, do)]
+        return np.concatenate(czesci) if czesci else self.bufor[:0].copy()
+
+    def _odcinki(self, od, do):
+        # indeksy próbek [od, do) jako co najwyżej dwa ciągłe fragmenty pierścienia
+        if do <= od:
+            return []
+        a = od % self.pojemnosc_bufora
+        b = a + (do - od)
+        if b <= self.pojemnosc_bufora:
+            return [(a, b)]
+        return [(a, self.pojemnosc_bufora), (0, b - self.pojemnosc_bufora)]
+
+
+class ArchiwumHistorii:
+    def __init__(self, plik):
+        with open(plik, "rb") as f:
+            naglowek = f.read(ROZMIAR_NAGLOWKA)
+        znacznik, wersja, liczba_zbiornikow, liczba_rur, rozmiar = struct.unpack_from(FORMAT_NAGLOWKA, naglowek)
+        if znacznik != ZNACZNIK or wersja != WERSJA:
+            raise ValueError(f"{plik} nie jest archiwum historii w wersji {WERSJA}")
+
+        self.typ = typ_rekordu(liczba_zbiornikow, liczba_rur)
+        if self.typ.itemsize != rozmiar:
+            raise ValueError(f"{plik}: niezgodny rozmiar rekordu")
+        # niepełny rekord na końcu (przerwany zapis) jest pomijany
+        liczba = (os.path.getsize(plik) - ROZMIAR_NAGLOWKA) // rozmiar
+        if liczba > 0:
+            self.rekordy = np.memmap(plik, dtype=self.typ, mode="r", offset=ROZMIAR_NAGLOWKA, shape=(liczba,))
+        else:
+            self.rekordy = np.zeros(0, dtype=self.typ)
+
+    def __len__(self):
+        return len(self.rekordy)
+
+    def zakres(self, od=None, do=None):
+        # rekordy z czasem w [od, do); czas rośnie, więc wystarczy wyszukiwanie binarne
+        czas = self.rekordy["czas"]
+        a = 0 if od is None else int(np.searchsorted(czas, od, side="left"))
+        b = len(czas) if do is None else int(np.searchsorted(czas, do, side="left"))
+        return self.rekordy[a:b]
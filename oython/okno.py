@@ -1,73 +1,114 @@
-from PyQt5.QtWidgets import QWidget, QPushButton, QLabel, QSlider
-from PyQt5.QtCore import Qt, QTimer
-from PyQt5.QtGui import QPainter
+import time
 
-from rura import Rura
-from zbiornik import Zbiornik
+from PyQt5.QtWidgets import QWidget, QPushButton, QLabel, QSlider, QComboBox
+from PyQt5.QtCore import Qt, QTimer, QRect
+from PyQt5.QtGui import QPainter, QPixmap
+
+from alarmy import Alarmy
+from dziennik import DziennikOperatora
+from harmonogram import Harmonogram
+from historia import Historian
+from panel import PanelZbiornikow
+from profil import Profiler
+from rysowanie import rysowniki
+from serwer_modbus import SerwerModbus
+from silnik import SilnikKaskady
+from telemetria import Telemetria
+from watek_symulacji import WatekSymulacji
+from wykres import WykresTrendu
 
 class SymulacjaKaskady(QWidget):
-    def __init__(self):
+    PREDKOSCI = (1, 10, 100)
+
+    def __init__(self, krok_symulacji=0.001, klatki_na_sekunde=50, plik_dziennika=None,
+                 port_modbus=None, nazwa_telemetrii=None, plik_historii=None):
         super().__init__()
         self.setWindowTitle("SCADA v2.0 - Modułowa")
-        self.setFixedSize(1000, 750) 
+        self.setFixedSize(1400, 750) 
         self.setStyleSheet("background-color: #2b2b2b;")
 
-        self.z1 = Zbiornik(300, 30, 400, 80, nazwa="Z1 Główny")
-        self.z2 = Zbiornik(150, 200, 100, 200, nazwa="Z2 Silos A")
-        self.z3 = Zbiornik(750, 200, 100, 200, nazwa="Z3 Silos B")
-        self.z4 = Zbiornik(300, 480, 400, 80, nazwa="Z4 Mieszalnik")
-
-        self.z1.aktualna_ilosc = 100.0
-        self.z1.aktualizuj_poziom()
-        self.z4.nastawa_poziomu = 60 
+        self.silnik = SilnikKaskady(regulator_pid=True)
+        self.z1 = self.silnik.z1
+        self.z2 = self.silnik.z2
+        self.z3 = self.silnik.z3
+        self.z4 = self.silnik.z4
+        self.zbiorniki = self.silnik.zbiorniki
+        self.rura1 = self.silnik.rura1
+        self.rura2 = self.silnik.rura2
+        self.rura3 = self.silnik.rura3
+        self.rury = self.silnik.rury
+        self.rysowniki_rur, self.rysowniki_zbiornikow = rysowniki(self.silnik)
 
-        self.zbiorniki = [self.z1, self.z2, self.z3, self.z4]
+        # model liczony stałymi krokami krok_symulacji w osobnym wątku;
+        # okno czyta tylko migawki stanu, a akcje operatora wysyła poleceniami
+        self.harmonogram = Harmonogram(self.silnik, dt=krok_symulacji)
+        # plik_historii: archiwum próbek do czytania przez ArchiwumHistorii;
+        # kolejne uruchomienia dopisują się na końcu
+        self.historian = Historian(self.silnik, plik=plik_historii)
+        self.historian.podlacz()
+        # progi HH/H/L/LL każdego zbiornika; tylko alarmy, bez blokad, więc
+        # odtwarzanie dziennika bez nich daje ten sam przebieg
+        self.alarmy = Alarmy(self.silnik)
+        for z in self.zbiorniki:
+            self.alarmy.dodaj_progi(z, opoznienie=1.0)
+        self.alarmy.podlacz()
+        self._liczba_zdarzen = 0
+        self._blad = None
+        # każda akcja operatora trafia z numerem kroku do dziennika, z którego
+        # dziennik.py odtwarza przebieg bez okna
+        self.dziennik = DziennikOperatora(self.silnik, krok_symulacji, plik_dziennika)
+        self.dziennik.podlacz()
+        # stan po każdym kroku w pamięci współdzielonej dla innych procesów
+        self.telemetria = None
+        if nazwa_telemetrii is not None:
+            self.telemetria = Telemetria(self.silnik, nazwa_telemetrii)
+            self.telemetria.podlacz()
+        self.watek = WatekSymulacji(self.silnik, self.harmonogram, dziennik=self.dziennik)
+        self.watek.start()
+        self.migawka = self.watek.migawka
+        # serwer Modbus/TCP z własną pętlą asyncio czyta te same migawki
+        self.serwer_modbus = None
+        if port_modbus is not None:
+            self.serwer_modbus = SerwerModbus(self.watek, port=port_modbus)
+            self.serwer_modbus.start_w_tle()
 
-        self.rury = []
-        
-        p1_out = self.z1.punkt_wyjscia()
-        p2_in = self.z2.punkt_wejscia()
-        self.rura1 = Rura([
-            p1_out,
-            (p1_out[0], p1_out[1] + 40),
-            (p2_in[0], p1_out[1] + 40),
-            p2_in
-        ])
-
-        p2_out = self.z2.punkt_wyjscia()
-        p3_in = self.z3.punkt_wejscia()
-        self.rura2 = Rura([
-            p2_out,
-            (p2_out[0], p2_out[1] + 10),
-            (p2_out[0] + 60, p2_out[1] + 10),
-            (p2_out[0] + 60, p3_in[1] - 20),
-            (p3_in[0], p3_in[1] - 20),
-            p3_in
-        ])
-
-        p3_out = self.z3.punkt_wyjscia()
-        p4_in = self.z4.punkt_wejscia()
-        self.rura3 = Rura([
-            p3_out,
-            (p3_out[0], p3_out[1] + 20),
-            (p4_in[0], p3_out[1] + 20),
-            p4_in
-        ])
-
-        self.rury = [self.rura1, self.rura2, self.rura3]
-
-        self.timer = QTimer()
-        self.timer.timeout.connect(self.logika_przeplywu)
+        # klatki_na_sekunde=0: odświeżanie po każdej migawce wątku symulacji
+        # (co jego okres), a nie w stałym tempie
+        self.klatki_na_sekunde = klatki_na_sekunde
+        self.okres_obrazu = 1.0 / klatki_na_sekunde if klatki_na_sekunde > 0 else self.watek.okres
+        self.timer_obrazu = QTimer()
+        self.timer_obrazu.timeout.connect(self._odswiez_zmienione)
+        self.timer_obrazu.start(max(1, round(1000 * self.okres_obrazu)))
         self.running = False
-        self.flow_speed = 0.8
+
+        # statyczne warstwy sceny: pod cieczą (obudowy rur, tła zbiorników)
+        # i nad nią (obrysy, nastawa, podpisy)
+        self._warstwa_tlo = None
+        self._warstwa_wierzch = None
+
+        # obszary do odświeżania i stan z ostatniego odświeżenia, żeby
+        # przerysowywać tylko zbiorniki i rury, które się zmieniły
+        self._obszary_zbiornikow = None
+        self._obszary_rur = None
+        self._poziomy = []
+        self._przeplywy = []
+
+        # pomiary czasu kroku, klatki i rysowania; F12 włącza je razem
+        # z nakładką, F11 zapisuje histogramy do pliku
+        self.profil = None
+        self._klatki_nakladki = 0
 
         self.setup_ui()
 
     def setup_ui(self):
         self.panel_tlo = QLabel(self)
-        self.panel_tlo.setGeometry(0, 580, 1000, 170)
+        self.panel_tlo.setGeometry(0, 580, 1400, 170)
         self.panel_tlo.setStyleSheet("background-color: #1e1e1e; border-top: 3px solid #0078d7;")
 
+        self.wykres = WykresTrendu(self.historian, self)
+        self.wykres.setGeometry(1000, 10, 390, 560)
+        self.timer_obrazu.timeout.connect(self.wykres.odswiez)
+
         self.btn_start = QPushButton("START\nPROCESU", self)
         self.btn_start.setGeometry(20, 600, 120, 120)
         self.btn_start.setStyleSheet("""
@@ -76,13 +117,20 @@ class SymulacjaKaskady(QWidget):
         """)
         self.btn_start.clicked.connect(self.przelacz_symulacje)
 
-        offset_start = 180  
-        step_x = 170        
-        for i, z in enumerate(self.zbiorniki):
-            x_pos = offset_start + (i * step_x)
-            self.stworz_panel_dla_zbiornika(z, x_pos, 600)
+        self.cmb_predkosc = QComboBox(self)
+        self.cmb_predkosc.setGeometry(20, 724, 120, 22)
+        for predkosc in self.PREDKOSCI:
+            self.cmb_predkosc.addItem(f"×{predkosc}", predkosc)
+        self.cmb_predkosc.setStyleSheet("color: #fff; font-weight: bold; background-color: #333; border: 1px solid #0078d7; border-radius: 5px; padding-left: 8px;")
+        self.cmb_predkosc.currentIndexChanged.connect(self.zmiana_predkosci)
+
+        # panel operatora: jedna tabela model/widok zamiast trzech widżetów
+        # na zbiornik; przyciski i edycja SP idą przez delegata do wątku
+        self.panel = PanelZbiornikow([z.nazwa for z in self.zbiorniki], self.migawka, self.watek.wyslij, self)
+        self.panel.setGeometry(170, 592, 600, 146)
 
-        pos_z4_panel = offset_start + (3 * step_x) + 90
+        # suwak SP regulatora Z4 obok panelu
+        pos_z4_panel = 780
         self.lbl_nastawa = QLabel("SP", self)
         self.lbl_nastawa.setGeometry(pos_z4_panel, 600, 30, 20)
         self.lbl_nastawa.setStyleSheet("color: white; font-weight: bold;")
@@ -97,54 +145,53 @@ class SymulacjaKaskady(QWidget):
         self.lbl_val.setGeometry(pos_z4_panel, 720, 50, 20)
         self.lbl_val.setStyleSheet("color: red; font-weight: bold;")
 
-    def stworz_panel_dla_zbiornika(self, zbiornik, x, y):
-        lbl = QLabel(zbiornik.nazwa.split(" ")[0], self) 
-        lbl.setGeometry(x, y, 80, 20)
-        lbl.setAlignment(Qt.AlignCenter)
-        lbl.setStyleSheet("color: #fff; font-weight: bold; font-size: 14px; background-color: #333; border-radius: 5px;")
+        self.lbl_profil = QLabel(self)
+        self.lbl_profil.setGeometry(275, 240, 460, 90)
+        self.lbl_profil.setStyleSheet(
+            "color: #0f0; background-color: rgba(0, 0, 0, 170); font-family: monospace; font-size: 11px; padding: 4px;")
+        self.lbl_profil.setAttribute(Qt.WA_TransparentForMouseEvents)
+        self.lbl_profil.hide()
 
-        style_fill = "QPushButton { background-color: #333; color: #4CAF50; border: 1px solid #4CAF50; border-radius: 5px; font-weight: bold; }" \
-                     "QPushButton:pressed { background-color: #4CAF50; color: white; }"
-        
-        style_empty = "QPushButton { background-color: #333; color: #F44336; border: 1px solid #F44336; border-radius: 5px; font-weight: bold; }" \
-                      "QPushButton:pressed { background-color: #F44336; color: white; }"
-
-        btn_fill = QPushButton("WLEW (+)", self)
-        btn_fill.setGeometry(x, y + 30, 80, 35)
-        btn_fill.setStyleSheet(style_fill)
-        btn_fill.clicked.connect(lambda: self.napelnij_zbiornik(zbiornik))
-
-        btn_empty = QPushButton("SPUST (-)", self)
-        btn_empty.setGeometry(x, y + 75, 80, 35)
-        btn_empty.setStyleSheet(style_empty)
-        btn_empty.clicked.connect(lambda: self.oproznij_zbiornik(zbiornik))
+        self.lbl_alarmy = QLabel(self)
+        self.lbl_alarmy.setGeometry(850, 592, 540, 146)
+        self.lbl_alarmy.setAlignment(Qt.AlignLeft | Qt.AlignTop)
+        self.lbl_alarmy.setStyleSheet(
+            "color: #ddd; background-color: #1e1e1e; font-family: monospace; font-size: 12px; padding: 4px;")
+        self._odswiez_alarmy()
 
     def zmiana_nastawy(self):
         val = self.slider.value()
-        self.z4.nastawa_poziomu = val
+        self.watek.wyslij("nastawa", self.zbiorniki.index(self.z4), val)
         self.lbl_val.setText(f"{val}%")
-        self.update()
+
+    def _pokaz_nastawe_z4(self, nastawa):
+        # suwak i etykieta za migawką, także po edycji SP w panelu; bez
+        # sygnału valueChanged, żeby nie odesłać nastawy do wątku
+        if nastawa is not None and not self.slider.isSliderDown():
+            self.slider.blockSignals(True)
+            self.slider.setValue(int(round(nastawa)))
+            self.slider.blockSignals(False)
+        self.lbl_val.setText("brak" if nastawa is None else f"{nastawa:.0f}%")
+
+    def zmiana_predkosci(self):
+        self.watek.wyslij("predkosc", self.cmb_predkosc.currentData())
 
     def napelnij_zbiornik(self, zbiornik):
-        zbiornik.aktualna_ilosc = zbiornik.pojemnosc
-        zbiornik.aktualizuj_poziom()
-        self.update()
+        self.watek.wyslij("napelnij", self.zbiorniki.index(zbiornik))
 
     def oproznij_zbiornik(self, zbiornik):
-        zbiornik.aktualna_ilosc = 0.0
-        zbiornik.aktualizuj_poziom()
-        self.update()
+        self.watek.wyslij("oproznij", self.zbiorniki.index(zbiornik))
 
     def przelacz_symulacje(self):
         if self.running:
-            self.timer.stop()
+            self.watek.wstrzymaj()
             self.btn_start.setStyleSheet("""
             QPushButton { background-color: #222; color: #00ff00; border: 2px solid #00ff00; border-radius: 60px; font-weight: bold; font-size: 14px; }
             QPushButton:hover { background-color: #113311; }
             """)
             self.btn_start.setText("START\nPROCESU")
         else:
-            self.timer.start(20)
+            self.watek.wznow()
             self.btn_start.setStyleSheet("""
             QPushButton { background-color: #222; color: #ff0000; border: 2px solid #ff0000; border-radius: 60px; font-weight: bold; font-size: 14px; }
             QPushButton:hover { background-color: #331111; }
@@ -152,35 +199,163 @@ class SymulacjaKaskady(QWidget):
             self.btn_start.setText("STOP")
         self.running = not self.running
 
-    def logika_przeplywu(self):
-        plynie_1 = False
-        if not self.z1.czy_pusty() and not self.z2.czy_pelny():
-            ilosc = self.z1.usun_ciecz(self.flow_speed)
-            self.z2.dodaj_ciecz(ilosc)
-            plynie_1 = True
-        self.rura1.ustaw_przeplyw(plynie_1)
-
-        plynie_2 = False
-        if self.z2.aktualna_ilosc > 5.0 and not self.z3.czy_pelny():
-            ilosc = self.z2.usun_ciecz(self.flow_speed)
-            self.z3.dodaj_ciecz(ilosc)
-            plynie_2 = True
-        self.rura2.ustaw_przeplyw(plynie_2)
-
-        plynie_3 = False
-        limit_z4 = self.z4.pojemnosc * (self.z4.nastawa_poziomu / 100.0)
-        if self.z3.aktualna_ilosc > 5.0 and self.z4.aktualna_ilosc < limit_z4:
-            ilosc = self.z3.usun_ciecz(self.flow_speed)
-            self.z4.dodaj_ciecz(ilosc)
-            plynie_3 = True
-        self.rura3.ustaw_przeplyw(plynie_3)
+    def przelacz_profil(self):
+        if self.profil is None:
+            self.profil = Profiler(self.okres_obrazu)
+            self.watek.profil = self.profil
+            self._odswiez_nakladke()
+            self.lbl_profil.show()
+        else:
+            self.profil = None
+            self.watek.profil = None
+            self.lbl_profil.hide()
+
+    def eksportuj_profil(self, plik=None):
+        if self.profil is None:
+            return None
+        if plik is None:
+            plik = time.strftime("profil_%Y%m%d_%H%M%S.json")
+        self.profil.eksportuj(plik, self.harmonogram.pominiete_kroki)
+        return plik
+
+    def _odswiez_alarmy(self):
+        wiersze = ["<b>Aktywne:</b> <span style='color: #F44336'>"
+                   + (", ".join(self.alarmy.aktywne_punkty()) or "brak") + "</span>"]
+        for e in reversed(self.alarmy.ostatnie(7)):
+            kolor = "#F44336" if e.aktywny else "#4CAF50"
+            stan = "wejście" if e.aktywny else "powrót "
+            wiersze.append(f"<span style='color: {kolor}'>{e.czas:9.1f} s  {e.nazwa:6s} {stan} "
+                           f"{e.wartosc:5.1f} %</span>")
+        if self.watek.blad is not None:
+            wiersze.insert(0, f"<b style='color: #F44336'>Symulacja zatrzymana: {self.watek.blad!r}</b>")
+        self.lbl_alarmy.setText("<pre>" + "\n".join(wiersze) + "</pre>")
+
+    def _odswiez_nakladke(self):
+        self.lbl_profil.setText(self.profil.opis(self.harmonogram.pominiete_kroki))
+
+    def keyPressEvent(self, event):
+        if event.key() == Qt.Key_F12:
+            self.przelacz_profil()
+        elif event.key() == Qt.Key_F11:
+            self.eksportuj_profil()
+        else:
+            super().keyPressEvent(event)
+
+    def closeEvent(self, event):
+        if self.serwer_modbus is not None:
+            self.serwer_modbus.zatrzymaj()
+        self.watek.zakoncz()
+        self.dziennik.zamknij()
+        self.historian.zamknij()
+        if self.telemetria is not None:
+            self.telemetria.zamknij()
+        super().closeEvent(event)
+
+    def _odswiez_zmienione(self):
+        if self.profil is not None:
+            self.profil.klatka(time.perf_counter())
+            # nakładka co pół sekundy, żeby sama nie obciążała klatek
+            self._klatki_nakladki += 1
+            if self._klatki_nakladki * self.okres_obrazu >= 0.5:
+                self._klatki_nakladki = 0
+                self._odswiez_nakladke()
+        migawka = self.watek.migawka
+        if migawka is self.migawka:
+            return
+        zmiana_nastaw = migawka.nastawy != self.migawka.nastawy
+        self.migawka = migawka
+        self.panel.ustaw_migawke(migawka)
+        if self.alarmy.liczba_zdarzen != self._liczba_zdarzen or self.watek.blad is not self._blad:
+            self._liczba_zdarzen = self.alarmy.liczba_zdarzen
+            self._blad = self.watek.blad
+            self._odswiez_alarmy()
+        if zmiana_nastaw:
+            # linie nastaw są w warstwie wierzchu, więc przerysowuje się całe okno
+            self._pokaz_nastawe_z4(migawka.nastawy[self.zbiorniki.index(self.z4)])
+            self.uniewaznij_warstwy()
+        if self._obszary_zbiornikow is None:
+            self._zbuduj_obszary()
+
+        for i, poziom in enumerate(migawka.poziomy):
+            if poziom != self._poziomy[i]:
+                self._poziomy[i] = poziom
+                self.update(self._obszary_zbiornikow[i])
+        for i, plynie in enumerate(migawka.przeplywy):
+            if plynie != self._przeplywy[i]:
+                self._przeplywy[i] = plynie
+                self.update(self._obszary_rur[i])
+
+    def _zbuduj_obszary(self):
+        # margines na antyaliasing i grubość obrysu
+        self._obszary_zbiornikow = [
+            QRect(int(z.x) - 3, int(z.y) - 3, int(z.width) + 6, int(z.height) + 6)
+            for z in self.zbiorniki
+        ]
+        self._obszary_rur = []
+        for r in self.rury:
+            x0, y0, x1, y1 = r.granice()
+            self._obszary_rur.append(QRect(int(x0) - 2, int(y0) - 2, int(x1 - x0) + 5, int(y1 - y0) + 5))
+        self._poziomy = list(self.migawka.poziomy)
+        self._przeplywy = list(self.migawka.przeplywy)
+
+    def uniewaznij_warstwy(self):
+        self._warstwa_tlo = None
+        self._warstwa_wierzch = None
+        self._obszary_zbiornikow = None
+        self._obszary_rur = None
         self.update()
 
+    def _nowa_warstwa(self):
+        skala = self.devicePixelRatioF()
+        warstwa = QPixmap(self.size() * skala)
+        warstwa.setDevicePixelRatio(skala)
+        warstwa.fill(Qt.transparent)
+        return warstwa
+
+    def _zbuduj_warstwy(self):
+        self._warstwa_tlo = self._nowa_warstwa()
+        p = QPainter(self._warstwa_tlo)
+        p.setRenderHint(QPainter.Antialiasing)
+        for r in self.rysowniki_rur:
+            r.draw_obudowa(p)
+        for z in self.rysowniki_zbiornikow:
+            z.draw_tlo(p)
+        p.end()
+
+        self._warstwa_wierzch = self._nowa_warstwa()
+        p = QPainter(self._warstwa_wierzch)
+        p.setRenderHint(QPainter.Antialiasing)
+        for z, nastawa in zip(self.rysowniki_zbiornikow, self.migawka.nastawy):
+            z.draw_obrys(p, nastawa)
+        p.end()
+
+    def resizeEvent(self, event):
+        self._warstwa_tlo = None
+        self._warstwa_wierzch = None
+        super().resizeEvent(event)
+
     def paintEvent(self, event):
+        if self.profil is not None:
+            poczatek = time.perf_counter()
+        if self._warstwa_tlo is None:
+            self._zbuduj_warstwy()
+        if self._obszary_zbiornikow is None:
+            self._zbuduj_obszary()
+        obszar = event.rect()
+        migawka = self.migawka
+
         p = QPainter(self)
+        p.drawPixmap(0, 0, self._warstwa_tlo)
         p.setRenderHint(QPainter.Antialiasing)
 
-        for r in self.rury:
-            r.draw(p)
-        for z in self.zbiorniki:
-            z.draw(p)
\ No newline at end of file
+        for r, rect, plynie in zip(self.rysowniki_rur, self._obszary_rur, migawka.przeplywy):
+            if rect.intersects(obszar):
+                r.draw_przeplyw(p, plynie)
+        for z, rect, poziom in zip(self.rysowniki_zbiornikow, self._obszary_zbiornikow, migawka.poziomy):
+            if rect.intersects(obszar):
+                z.draw_ciecz(p, poziom)
+
+        p.drawPixmap(0, 0, self._warstwa_wierzch)
+        p.end()
+        if self.profil is not None:
+            self.profil.rysowanie(poczatek, time.perf_counter())
@@ -0,0 +1,166 @@
+from PyQt5.QtWidgets import QAbstractItemView, QApplication, QHeaderView, QSpinBox, QStyledItemDelegate, QTableView
+from PyQt5.QtCore import Qt, QAbstractTableModel, QEvent, QModelIndex, QRectF
+from PyQt5.QtGui import QColor, QPainter, QPen
+
+# Panel operatora jako tabela model/widok: wiersz na zbiornik, kolumny nazwa,
+# poziom, nastawa i dwa przyciski. Widok rysuje tylko widoczne wiersze, więc
+# koszt startu i odświeżania nie rośnie z liczbą zbiorników tak jak przy
+# trzech widżetach na zbiornik. Przyciski i edycję nastawy obsługuje jeden
+# delegat, który wysyła polecenia do wątku symulacji.
+
+NAZWA, POZIOM, NASTAWA, WLEW, SPUST = range(5)
+NAGLOWKI = ("Zbiornik", "Poziom", "SP", "", "")
+PRZYCISKI = {WLEW: ("WLEW (+)", "napelnij", QColor("#4CAF50")),
+             SPUST: ("SPUST (-)", "oproznij", QColor("#F44336"))}
+
+# jeden arkusz dla całej aplikacji; selektory po nazwie klasy, więc nie
+# dotyczy innych widżetów
+STYL_PANELU = """
+PanelZbiornikow { background-color: #1e1e1e; color: #fff; gridline-color: #333; border: none;
+                  font-weight: bold; selection-background-color: #0078d7; }
+PanelZbiornikow QHeaderView::section { background-color: #333; color: #fff; border: none; padding: 2px;
+                                       font-weight: bold; }
+PanelZbiornikow QSpinBox { background-color: #333; color: #fff; border: 1px solid #0078d7; }
+"""
+
+
+def zastosuj_styl(app=None):
+    app = app or QApplication.instance()
+    if STYL_PANELU not in app.styleSheet():
+        app.setStyleSheet(app.styleSheet() + STYL_PANELU)
+
+
+class ModelPanelu(QAbstractTableModel):
+    def __init__(self, nazwy, migawka, parent=None):
+        super().__init__(parent)
+        self.nazwy = [n.split(" ")[0] for n in nazwy]
+        self.poziomy = list(migawka.poziomy)
+        self.nastawy = list(migawka.nastawy)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.nazwy)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(NAGLOWKI)
+
+    def headerData(self, sekcja, orientacja, rola=Qt.DisplayRole):
+        if rola == Qt.DisplayRole and orientacja == Qt.Horizontal:
+            return NAGLOWKI[sekcja]
+        return None
+
+    def flags(self, index):
+        flagi = Qt.ItemIsEnabled
+        if index.column() == NASTAWA:
+            flagi |= Qt.ItemIsSelectable | Qt.ItemIsEditable
+        return flagi
+
+    def data(self, index, rola=Qt.DisplayRole):
+        wiersz, kolumna = index.row(), index.column()
+        if rola == Qt.DisplayRole:
+            if kolumna == NAZWA:
+                return self.nazwy[wiersz]
+            if kolumna == POZIOM:
+                return f"{self.poziomy[wiersz] * 100:.1f} %"
+            if kolumna == NASTAWA:
+                nastawa = self.nastawy[wiersz]
+                return "—" if nastawa is None else f"{nastawa:.0f} %"
+            if kolumna in PRZYCISKI:
+                return PRZYCISKI[kolumna][0]
+        elif rola == Qt.EditRole and kolumna == NASTAWA:
+            nastawa = self.nastawy[wiersz]
+            return -1 if nastawa is None else int(round(nastawa))
+        elif rola == Qt.TextAlignmentRole:
+            return Qt.AlignCenter
+        elif rola == Qt.ForegroundRole and kolumna == NASTAWA:
+            return QColor("red")
+        return None
+
+    def ustaw_migawke(self, migawka):
+        # jeden sygnał dataChanged na zakres zmienionych wierszy
+        zmienione = [i for i, (p, n) in enumerate(zip(migawka.poziomy, migawka.nastawy))
+                     if p != self.poziomy[i] or n != self.nastawy[i]]
+        if zmienione:
+            self.poziomy = list(migawka.poziomy)
+            self.nastawy = list(migawka.nastawy)
+            self.dataChanged.emit(self.index(zmienione[0], POZIOM), self.index(zmienione[-1], NASTAWA))
+
+
+class DelegatPanelu(QStyledItemDelegate):
+    # wyslij: funkcja (polecenie, *argumenty), np. WatekSymulacji.wyslij
+    def __init__(self, wyslij, widok):
+        super().__init__(widok)
+        self.wyslij = wyslij
+        self.widok = widok
+        self._wcisniety = None
+
+    def paint(self, painter, option, index):
+        kolumna = index.column()
+        if kolumna not in PRZYCISKI:
+            super().paint(painter, option, index)
+            return
+        tekst, _, kolor = PRZYCISKI[kolumna]
+        wcisniety = self._wcisniety == (index.row(), kolumna)
+        prostokat = QRectF(option.rect).adjusted(3, 2, -3, -2)
+        painter.save()
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setPen(QPen(kolor, 1))
+        painter.setBrush(kolor if wcisniety else QColor("#333"))
+        painter.drawRoundedRect(prostokat, 5, 5)
+        painter.setPen(QColor("white") if wcisniety else kolor)
+        painter.drawText(prostokat, Qt.AlignCenter, tekst)
+        painter.restore()
+
+    def editorEvent(self, event, model, option, index):
+        kolumna = index.column()
+        if kolumna not in PRZYCISKI:
+            return super().editorEvent(event, model, option, index)
+        if event.type() == QEvent.MouseButtonPress and event.button() == Qt.LeftButton:
+            self._wcisniety = (index.row(), kolumna)
+        elif event.type() == QEvent.MouseButtonRelease and self._wcisniety is not None:
+            if self._wcisniety == (index.row(), kolumna) and option.rect.contains(event.pos()):
+                self.wyslij(PRZYCISKI[kolumna][1], index.row())
+            self._wcisniety = None
+        else:
+            return False
+        self.widok.viewport().update(option.rect)
+        return True
+
+    def createEditor(self, parent, option, index):
+        editor = QSpinBox(parent)
+        editor.setRange(-1, 100)
+        editor.setSpecialValueText("brak")
+        editor.setSuffix(" %")
+        editor.setAlignment(Qt.AlignCenter)
+        return editor
+
+    def setEditorData(self, editor, index):
+        editor.setValue(index.data(Qt.EditRole))
+
+    def setModelData(self, editor, model, index):
+        # nastawa wraca do modelu dopiero z następną migawką
+        wartosc = editor.value()
+        self.wyslij("nastawa", index.row(), None if wartosc < 0 else wartosc)
+
+
+class PanelZbiornikow(QTableView):
+    WYSOKOSC_WIERSZA = 28
+
+    def __init__(self, nazwy, migawka, wyslij, parent=None):
+        super().__init__(parent)
+        zastosuj_styl()
+        self.model_panelu = ModelPanelu(nazwy, migawka, self)
+        self.setModel(self.model_panelu)
+        self.setItemDelegate(DelegatPanelu(wyslij, self))
+        self.setEditTriggers(QAbstractItemView.DoubleClicked | QAbstractItemView.SelectedClicked
+                             | QAbstractItemView.EditKeyPressed)
+        self.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.setVerticalScrollMode(QAbstractItemView.ScrollPerPixel)
+        self.verticalHeader().hide()
+        # stała wysokość wierszy: widok nie pyta o rozmiar każdego wiersza
+        self.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.verticalHeader().setDefaultSectionSize(self.WYSOKOSC_WIERSZA)
+        self.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.horizontalHeader().setHighlightSections(False)
+
+    def ustaw_migawke(self, migawka):
+        self.model_panelu.ustaw_migawke(migawka)
@@ -0,0 +1,116 @@
+import json
+import math
+import time
+
+
+class Histogram:
+    # stała liczba przedziałów logarytmicznych od minimum do maksimum;
+    # wartości spoza zakresu trafiają do skrajnych przedziałów
+    def __init__(self, minimum=1e-6, maksimum=16.0, na_oktawe=8):
+        self.minimum = minimum
+        self.na_oktawe = na_oktawe
+        self._log_min = math.log2(minimum)
+        self.liczba_przedzialow = int(math.ceil((math.log2(maksimum) - self._log_min) * na_oktawe))
+        self.wyzeruj()
+
+    def wyzeruj(self):
+        self.zliczenia = [0] * self.liczba_przedzialow
+        self.liczba = 0
+        self.suma = 0.0
+        self.maks = 0.0
+
+    def dodaj(self, wartosc):
+        if wartosc > self.minimum:
+            i = int((math.log2(wartosc) - self._log_min) * self.na_oktawe)
+            if i >= self.liczba_przedzialow:
+                i = self.liczba_przedzialow - 1
+        else:
+            i = 0
+        self.zliczenia[i] += 1
+        self.liczba += 1
+        self.suma += wartosc
+        if wartosc > self.maks:
+            self.maks = wartosc
+
+    def granica(self, i):
+        # górna granica przedziału i
+        return self.minimum * 2.0 ** ((i + 1) / self.na_oktawe)
+
+    def percentyl(self, p):
+        # górna granica przedziału, w którym wypada percentyl p (0-100);
+        # błąd najwyżej szerokość przedziału, ok. 9% przy 8 na oktawę
+        if self.liczba == 0:
+            return math.nan
+        prog = p / 100.0 * self.liczba
+        narastajaco = 0
+        for i, n in enumerate(self.zliczenia):
+            narastajaco += n
+            if narastajaco >= prog and n:
+                return min(self.granica(i), self.maks)
+        return self.maks
+
+    def eksport(self):
+        return {
+            "liczba": self.liczba,
+            "srednia": self.suma / self.liczba if self.liczba else None,
+            "maks": self.maks,
+            "p50": self.percentyl(50) if self.liczba else None,
+            "p99": self.percentyl(99) if self.liczba else None,
+            "granice_gorne": [self.granica(i) for i in range(self.liczba_przedzialow)],
+            "zliczenia": list(self.zliczenia),
+        }
+
+
+class Profiler:
+    # Czasy w sekundach. Wątek symulacji pisze tylko do histogramów kroku,
+    # wątek okna tylko do histogramów klatki i rysowania, więc bez blokad.
+    # Wyłączony profiler to brak obiektu (None) u wywołujących.
+    def __init__(self, okres_klatki):
+        self.okres_klatki = okres_klatki
+        self.odstep_krokow = Histogram()
+        self.czas_kroku = Histogram()
+        self.odstep_klatek = Histogram()
+        self.czas_rysowania = Histogram()
+        self.spoznione_klatki = 0
+        self._ostatni_krok = None
+        self._ostatnia_klatka = None
+
+    def krok(self, poczatek, koniec):
+        if self._ostatni_krok is not None:
+            self.odstep_krokow.dodaj(poczatek - self._ostatni_krok)
+        self._ostatni_krok = poczatek
+        self.czas_kroku.dodaj(koniec - poczatek)
+
+    def przerwa(self):
+        # po wstrzymaniu symulacji odstęp do następnego kroku nic nie mówi
+        self._ostatni_krok = None
+
+    def klatka(self, teraz):
+        if self._ostatnia_klatka is not None:
+            odstep = teraz - self._ostatnia_klatka
+            self.odstep_klatek.dodaj(odstep)
+            # klatki, które timer powinien był wywołać w tym odstępie
+            self.spoznione_klatki += max(0, int(odstep / self.okres_klatki + 0.5) - 1)
+        self._ostatnia_klatka = teraz
+
+    def rysowanie(self, poczatek, koniec):
+        self.czas_rysowania.dodaj(koniec - poczatek)
+
+    def histogramy(self):
+        return {"odstep_krokow": self.odstep_krokow, "czas_kroku": self.czas_kroku,
+                "odstep_klatek": self.odstep_klatek, "czas_rysowania": self.czas_rysowania}
+
+    def opis(self, pominiete_kroki=0):
+        wiersze = []
+        for nazwa, h in self.histogramy().items():
+            wiersze.append(f"{nazwa:15s} p50 {h.percentyl(50) * 1000:7.3f} ms  "
+                           f"p99 {h.percentyl(99) * 1000:7.3f} ms  maks {h.maks * 1000:7.2f} ms")
+        wiersze.append(f"spóźnione klatki {self.spoznione_klatki}  pominięte kroki {pominiete_kroki}")
+        return "\n".join(wiersze)
+
+    def eksportuj(self, plik, pominiete_kroki=0):
+        with open(plik, "w") as f:
+            json.dump({"czas": time.strftime("%Y-%m-%dT%H:%M:%S"), "okres_klatki": self.okres_klatki,
+                       "spoznione_klatki": self.spoznione_klatki, "pominiete_kroki": pominiete_kroki,
+                       "histogramy": {nazwa: h.eksport() for nazwa, h in self.histogramy().items()}},
+                      f, indent=1, ensure_ascii=False)
@@ -0,0 +1,155 @@
+import argparse
+import itertools
+import json
+import math
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from silnik import KROK_CZASU, SilnikKaskady
+
+NAZWY_ZBIORNIKOW = ("Z1", "Z2", "Z3", "Z4")
+
+KOLUMNY = (
+    [("nr", "<i8"), ("flow_speed", "<f8"), ("nastawa_z4", "<f8"), ("prog", "<f8")]
+    + [(f"start_{n.lower()}", "<f8") for n in NAZWY_ZBIORNIKOW]
+    + [("czas_napelnienia_z4", "<f8")]
+    + [(f"koniec_{n.lower()}", "<f8") for n in NAZWY_ZBIORNIKOW]
+    + [(f"praca_rura{i}", "<f8") for i in (1, 2, 3)]
+)
+
+
+class ZapisKolumnowy:
+    # katalog z plikiem kolumny.json i jednym surowym plikiem .bin na kolumnę;
+    # wiersze dopisywane paczkami, odczyt przez wczytaj_kolumny()
+    def __init__(self, katalog, kolumny=KOLUMNY):
+        self.katalog = katalog
+        self.kolumny = kolumny
+        os.makedirs(katalog, exist_ok=True)
+        with open(os.path.join(katalog, "kolumny.json"), "w") as f:
+            json.dump([[nazwa, typ] for nazwa, typ in kolumny], f)
+        self._pliki = [open(os.path.join(katalog, f"{nazwa}.bin"), "wb") for nazwa, _ in kolumny]
+        self.wiersze = 0
+
+    def dopisz(self, wiersze):
+        if not wiersze:
+            return
+        for j, ((_, typ), plik) in enumerate(zip(self.kolumny, self._pliki)):
+            np.fromiter((w[j] for w in wiersze), dtype=typ, count=len(wiersze)).tofile(plik)
+            plik.flush()
+        self.wiersze += len(wiersze)
+
+    def zamknij(self):
+        for plik in self._pliki:
+            plik.close()
+
+
+def wczytaj_kolumny(katalog):
+    with open(os.path.join(katalog, "kolumny.json")) as f:
+        kolumny = json.load(f)
+    wynik = {}
+    for nazwa, typ in kolumny:
+        sciezka = os.path.join(katalog, f"{nazwa}.bin")
+        if os.path.getsize(sciezka) == 0:
+            wynik[nazwa] = np.zeros(0, dtype=typ)
+        else:
+            wynik[nazwa] = np.memmap(sciezka, dtype=typ, mode="r")
+    return wynik
+
+
+def licz_scenariusz(nr, flow_speed, nastawa_z4, prog, start, until, dt=KROK_CZASU):
+    s = SilnikKaskady(flow_speed)
+    for z, ilosc in zip(s.zbiorniki, start):
+        z.aktualna_ilosc = ilosc
+        z.aktualizuj_poziom()
+    s.z4.nastawa_poziomu = nastawa_z4
+    # progi 5.0 z rur Z2->Z3 i Z3->Z4
+    s.rura2.prog_zrodla = prog
+    s.rura3.prog_zrodla = prog
+    s.kompiluj()
+
+    limit_z4 = s.z4.pojemnosc * (nastawa_z4 / 100.0)
+    indeks_z4 = s.zbiorniki.index(s.z4)
+    # Z4 nalana do nastawy już na starcie nie daje żadnego zdarzenia
+    czas_napelnienia = 0.0 if s.z4.aktualna_ilosc >= limit_z4 else math.nan
+
+    zdarzenia = s.run_zdarzeniowo(until=until, dt=dt)
+
+    # stany rur obowiązują od kroku zdarzenia do kroku przed następnym
+    praca = [0] * len(s.rury)
+    poprzedni_krok = 0
+    przeplywy = tuple(False for _ in s.rury)
+    for krok, _, ilosci, nowe_przeplywy in zdarzenia:
+        for k, plynie in enumerate(przeplywy):
+            if plynie:
+                praca[k] += krok - 1 - poprzedni_krok
+        for k, plynie in enumerate(nowe_przeplywy):
+            if plynie:
+                praca[k] += 1
+        if math.isnan(czas_napelnienia) and ilosci[indeks_z4] >= limit_z4:
+            # rura Z3->Z4 zamyka się krok po osiągnięciu nastawy
+            czas_napelnienia = (krok - 1) * dt
+        poprzedni_krok = krok
+        przeplywy = nowe_przeplywy
+    for k, plynie in enumerate(przeplywy):
+        if plynie:
+            praca[k] += s.licznik_krokow - poprzedni_krok
+
+    return ((nr, flow_speed, nastawa_z4, prog) + tuple(start) + (czas_napelnienia,)
+            + tuple(z.aktualna_ilosc for z in s.zbiorniki) + tuple(p * dt for p in praca))
+
+
+def _licz_paczke(paczka, until, dt):
+    return [licz_scenariusz(*scenariusz, until=until, dt=dt) for scenariusz in paczka]
+
+
+def siatka(flow_speed, nastawy, progi, starty):
+    for nr, (fs, sp, prog, *start) in enumerate(itertools.product(flow_speed, nastawy, progi, *starty)):
+        yield nr, fs, sp, prog, tuple(start)
+
+
+def _lista_liczb(tekst):
+    return [float(v) for v in tekst.split(",") if v]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Równoległy przegląd scenariuszy kaskady Z1->Z2->Z3->Z4 bez okna.")
+    parser.add_argument("--flow-speed", type=_lista_liczb, default=[0.8],
+                        help="wartości flow_speed oddzielone przecinkami (domyślnie 0.8)")
+    parser.add_argument("--nastawa", type=_lista_liczb, default=[60.0],
+                        help="nastawy poziomu Z4 w %% (domyślnie 60)")
+    parser.add_argument("--prog", type=_lista_liczb, default=[5.0],
+                        help="progi przelewu z Z2 i Z3 (domyślnie 5.0)")
+    for nazwa, domyslna in zip(NAZWY_ZBIORNIKOW, ("100", "0", "0", "0")):
+        parser.add_argument(f"--start-{nazwa.lower()}", type=_lista_liczb, default=_lista_liczb(domyslna),
+                            help=f"początkowe aktualna_ilosc {nazwa} (domyślnie {domyslna})")
+    parser.add_argument("--czas", type=float, default=600.0, help="symulowany czas scenariusza [s]")
+    parser.add_argument("--dt", type=float, default=KROK_CZASU, help="krok symulacji [s]")
+    parser.add_argument("--procesy", type=int, default=os.cpu_count(), help="liczba procesów roboczych")
+    parser.add_argument("--paczka", type=int, default=64, help="scenariuszy na jedno zadanie procesu")
+    parser.add_argument("--wyjscie", default="wyniki_przegladu", help="katalog wyników kolumnowych")
+    args = parser.parse_args(argv)
+
+    starty = [getattr(args, f"start_{n.lower()}") for n in NAZWY_ZBIORNIKOW]
+    scenariusze = list(siatka(args.flow_speed, args.nastawa, args.prog, starty))
+    paczki = [scenariusze[i:i + args.paczka] for i in range(0, len(scenariusze), args.paczka)]
+
+    zapis = ZapisKolumnowy(args.wyjscie)
+    start = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(max_workers=args.procesy) as pula:
+            zadania = [pula.submit(_licz_paczke, paczka, args.czas, args.dt) for paczka in paczki]
+            for zadanie in as_completed(zadania):
+                zapis.dopisz(zadanie.result())
+                print(f"\r{zapis.wiersze}/{len(scenariusze)} scenariuszy", end="", file=sys.stderr)
+    finally:
+        zapis.zamknij()
+    print(f"\nGotowe w {time.perf_counter() - start:.1f} s, wyniki w {args.wyjscie}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,32 +1,34 @@
-from PyQt5.QtCore import Qt, QPointF
-from PyQt5.QtGui import QColor, QPen, QPainterPath
-
 class Rura:
-    def __init__(self, punkty, grubosc=14, kolor=Qt.darkGray):
-        self.punkty = [QPointF(float(p[0]), float(p[1])) for p in punkty]
+    # czysty model, bez Qt: punkty to krotki (x, y), kolory dowolne wartości
+    # przyjmowane przez QColor albo None; rysuje ją rysowanie.RysownikRury
+    def __init__(self, punkty, grubosc=14, kolor=None):
+        self.punkty = [(float(p[0]), float(p[1])) for p in punkty]
         self.grubosc = grubosc
         self.kolor_rury = kolor
-        self.kolor_cieczy = QColor(0, 180, 255)
+        self.kolor_cieczy = None
         self.czy_plynie = False
 
+        # reguły przelewu ustawiane przez Instalacja.polacz()
+        self.zrodlo = None
+        self.cel = None
+        self.prog_zrodla = 5.0
+        self.z_nastawa = False
+        self.wydatek = None
+        # (q0, h0) dla ModelFizyczny; None to wypływ grawitacyjny
+        self.krzywa_pompy = None
+        # stopień otwarcia 0..1 ustawiany przez regulatory (sterowanie.py)
+        self.otwarcie = 1.0
+        # blokada (alarmy.py) zamyka rurę niezależnie od otwarcia
+        self.blokada = False
+
     def ustaw_przeplyw(self, plynie):
         self.czy_plynie = plynie
 
-    def draw(self, painter):
-        if len(self.punkty) < 2:
-            return
-
-        path = QPainterPath()
-        path.moveTo(self.punkty[0])
-        for p in self.punkty[1:]:
-            path.lineTo(p)
-
-        pen_rura = QPen(self.kolor_rury, self.grubosc, Qt.SolidLine, Qt.RoundCap, Qt.RoundJoin)
-        painter.setPen(pen_rura)
-        painter.setBrush(Qt.NoBrush)
-        painter.drawPath(path)
+    def ustaw_punkty(self, punkty):
+        self.punkty = [(float(p[0]), float(p[1])) for p in punkty]
 
-        if self.czy_plynie:
-            pen_ciecz = QPen(self.kolor_cieczy, self.grubosc - 6, Qt.SolidLine, Qt.RoundCap, Qt.RoundJoin)
-            painter.setPen(pen_ciecz)
-            painter.drawPath(path)
\ No newline at end of file
+    def granice(self):
+        xs = [p[0] for p in self.punkty]
+        ys = [p[1] for p in self.punkty]
+        pol = self.grubosc / 2
+        return (min(xs) - pol, min(ys) - pol, max(xs) + pol, max(ys) + pol)
@@ -0,0 +1,133 @@
+from PyQt5.QtCore import Qt, QPointF, QRectF
+from PyQt5.QtGui import QColor, QPen, QPainterPath
+
+# Rysowanie elementów modelu. Model (zbiornik.py, rura.py) nie zna Qt;
+# ten moduł ładuje dopiero okno albo benchmark rysowania.
+
+PROMIEN = 20.0
+# domyślna wartość argumentów draw_*: odczyt z modelu; None w nastawie
+# znaczy brak nastawy, więc nie może oznaczać "weź z modelu"
+Z_MODELU = object()
+
+
+class RysownikZbiornika:
+    _kolor_cieczy = None
+
+    def __init__(self, zbiornik):
+        self.zbiornik = zbiornik
+
+    def draw(self, painter):
+        self.draw_tlo(painter)
+        self.draw_ciecz(painter)
+        self.draw_obrys(painter)
+
+    def _prostokat(self):
+        z = self.zbiornik
+        return QRectF(float(z.x), float(z.y), float(z.width), float(z.height))
+
+    def draw_tlo(self, painter):
+        painter.setPen(QPen(Qt.white, 3))
+        painter.setBrush(QColor(60, 60, 60))
+        painter.drawRoundedRect(self._prostokat(), PROMIEN, PROMIEN)
+
+    def draw_ciecz(self, painter, poziom=Z_MODELU):
+        z = self.zbiornik
+        if poziom is Z_MODELU:
+            poziom = z.poziom
+        if poziom <= 0:
+            return
+
+        if RysownikZbiornika._kolor_cieczy is None:
+            RysownikZbiornika._kolor_cieczy = QColor(0, 140, 255, 200)
+
+        h_cieczy = z.height * poziom
+        y_start = z.y + z.height - h_cieczy
+
+        rect_ciecz = QRectF(float(z.x + 4), float(y_start), float(z.width - 8), float(h_cieczy - 4))
+
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(RysownikZbiornika._kolor_cieczy)
+        painter.drawRoundedRect(rect_ciecz, PROMIEN / 2, PROMIEN / 2)
+
+    def draw_obrys(self, painter, nastawa=Z_MODELU):
+        z = self.zbiornik
+        if nastawa is Z_MODELU:
+            nastawa = z.nastawa_poziomu
+
+        painter.setPen(QPen(QColor(220, 220, 220), 4))
+        painter.setBrush(Qt.NoBrush)
+        painter.drawRoundedRect(self._prostokat(), PROMIEN, PROMIEN)
+
+        if nastawa is not None:
+            h_linii = z.height * (nastawa / 100.0)
+            y_linii = z.y + z.height - h_linii
+
+            pen_nastawa = QPen(QColor("red"), 2, Qt.DashLine)
+            painter.setPen(pen_nastawa)
+            painter.drawLine(int(z.x), int(y_linii), int(z.x + z.width), int(y_linii))
+
+            painter.setPen(Qt.red)
+            painter.drawText(int(z.x + z.width + 5), int(y_linii + 5), "SP")
+
+        painter.setPen(Qt.white)
+        font = painter.font()
+        font.setBold(True)
+        painter.setFont(font)
+        painter.drawText(int(z.x), int(z.y - 10), z.nazwa)
+
+
+class RysownikRury:
+    def __init__(self, rura):
+        self.rura = rura
+        # ścieżka i pióra budowane przy pierwszym rysowaniu i po zmianie
+        # punktów (Rura.ustaw_punkty podstawia nową listę)
+        self._punkty = None
+        self._sciezka = None
+        self._pen_rura = None
+        self._pen_ciecz = None
+
+    def _przygotuj(self):
+        rura = self.rura
+        kolor_rury = Qt.darkGray if rura.kolor_rury is None else QColor(rura.kolor_rury)
+        kolor_cieczy = QColor(0, 180, 255) if rura.kolor_cieczy is None else QColor(rura.kolor_cieczy)
+
+        path = QPainterPath()
+        path.moveTo(QPointF(*rura.punkty[0]))
+        for p in rura.punkty[1:]:
+            path.lineTo(QPointF(*p))
+
+        self._pen_rura = QPen(kolor_rury, rura.grubosc, Qt.SolidLine, Qt.RoundCap, Qt.RoundJoin)
+        # płaskie końce: ciecz kończy się na krawędzi zbiornika, nie wchodzi do środka
+        self._pen_ciecz = QPen(kolor_cieczy, rura.grubosc - 6, Qt.SolidLine, Qt.FlatCap, Qt.RoundJoin)
+        self._sciezka = path
+        self._punkty = rura.punkty
+
+    def draw(self, painter):
+        self.draw_obudowa(painter)
+        self.draw_przeplyw(painter)
+
+    def draw_obudowa(self, painter):
+        if len(self.rura.punkty) < 2:
+            return
+        if self._punkty is not self.rura.punkty:
+            self._przygotuj()
+
+        painter.setPen(self._pen_rura)
+        painter.setBrush(Qt.NoBrush)
+        painter.drawPath(self._sciezka)
+
+    def draw_przeplyw(self, painter, plynie=Z_MODELU):
+        if plynie is Z_MODELU:
+            plynie = self.rura.czy_plynie
+        if not plynie or len(self.rura.punkty) < 2:
+            return
+        if self._punkty is not self.rura.punkty:
+            self._przygotuj()
+
+        painter.setPen(self._pen_ciecz)
+        painter.drawPath(self._sciezka)
+
+
+def rysowniki(instalacja):
+    # (rysowniki rur, rysowniki zbiorników) w kolejności instalacji
+    return [RysownikRury(r) for r in instalacja.rury], [RysownikZbiornika(z) for z in instalacja.zbiorniki]
@@ -0,0 +1,332 @@
+import argparse
+import asyncio
+import struct
+import threading
+
+# Serwer zgodny z podzbiorem Modbus/TCP. Mapa adresów (od zera):
+#   rejestry holding 2*i     poziom zbiornika i w 0.01 % (tylko odczyt)
+#   rejestry holding 2*i+1   nastawa zbiornika i w 0.01 %, 0xFFFF = brak (zapis: nastawa)
+#   cewki ADRES_PRZEPLYWOW+k  rura k płynie (tylko odczyt)
+#   cewki ADRES_NAPELNIJ+i    zapis 1: WLEW zbiornika i
+#   cewki ADRES_OPROZNIJ+i    zapis 1: SPUST zbiornika i
+# Odczyty obsługiwane są z migawki wątku symulacji, zakodowanej raz na migawkę.
+
+ADRES_PRZEPLYWOW = 0
+ADRES_NAPELNIJ = 100
+ADRES_OPROZNIJ = 200
+BRAK_NASTAWY = 0xFFFF
+
+CZYTAJ_CEWKI = 0x01
+CZYTAJ_REJESTRY = 0x03
+ZAPISZ_CEWKE = 0x05
+ZAPISZ_REJESTR = 0x06
+ZAPISZ_REJESTRY = 0x10
+
+BLAD_FUNKCJI = 0x01
+BLAD_ADRESU = 0x02
+BLAD_WARTOSCI = 0x03
+# model w wątku symulacji zgłosił wyjątek (WatekSymulacji.blad)
+BLAD_SERWERA = 0x04
+
+# pełna długość PDU zapytań o stałym rozmiarze; ZAPISZ_REJESTRY ma 6 + bajty
+DLUGOSCI_PDU = {CZYTAJ_CEWKI: 5, CZYTAJ_REJESTRY: 5, ZAPISZ_CEWKE: 5, ZAPISZ_REJESTR: 5}
+
+MAKS_REJESTROW = 125
+MAKS_CEWEK = 2000
+
+_mbap = struct.Struct(">HHHB")
+
+
+class ObrazMigawki:
+    # rejestry i cewki jednej migawki jako gotowe bajty; zakres czytany
+    # jednym wycinkiem niezależnie od liczby rejestrów
+    def __init__(self, migawka):
+        self.migawka = migawka
+        rejestry = []
+        for poziom, nastawa in zip(migawka.poziomy, migawka.nastawy):
+            rejestry.append(min(max(int(round(poziom * 10000)), 0), 10000))
+            rejestry.append(BRAK_NASTAWY if nastawa is None else min(max(int(round(nastawa * 100)), 0), 10000))
+        self.liczba_rejestrow = len(rejestry)
+        self.rejestry = struct.pack(f">{len(rejestry)}H", *rejestry)
+        self.cewki = [bool(p) for p in migawka.przeplywy]
+
+
+def _spakuj_bity(bity):
+    wynik = bytearray((len(bity) + 7) // 8)
+    for i, bit in enumerate(bity):
+        if bit:
+            wynik[i // 8] |= 1 << (i % 8)
+    return bytes(wynik)
+
+
+class SerwerModbus:
+    def __init__(self, watek, host="127.0.0.1", port=5020, jednostka=None):
+        # watek: WatekSymulacji (migawka do odczytu, wyslij() do poleceń);
+        # jednostka=None przyjmuje zapytania do dowolnego unit id
+        self.watek = watek
+        self.host = host
+        self.port = port
+        self.jednostka = jednostka
+        self.liczba_klientow = 0
+        self.liczba_zapytan = 0
+        self._obraz = None
+        self._serwer = None
+        self._petla = None
+        self._watek_petli = None
+
+    def obraz(self):
+        migawka = self.watek.migawka
+        if self._obraz is None or self._obraz.migawka is not migawka:
+            self._obraz = ObrazMigawki(migawka)
+        return self._obraz
+
+    async def uruchom(self):
+        self._serwer = await asyncio.start_server(self._obsluz_klienta, self.host, self.port)
+        if self.port == 0:
+            self.port = self._serwer.sockets[0].getsockname()[1]
+        return self._serwer
+
+    def start_w_tle(self):
+        # własna pętla asyncio w osobnym wątku; zwraca po otwarciu gniazda
+        gotowy = threading.Event()
+
+        def praca():
+            self._petla = asyncio.new_event_loop()
+            self._petla.run_until_complete(self.uruchom())
+            gotowy.set()
+            self._petla.run_forever()
+            self._serwer.close()
+            self._petla.run_until_complete(self._serwer.wait_closed())
+            self._petla.close()
+
+        self._watek_petli = threading.Thread(target=praca, daemon=True)
+        self._watek_petli.start()
+        gotowy.wait()
+
+    def zatrzymaj(self):
+        if self._petla is not None:
+            self._petla.call_soon_threadsafe(self._petla.stop)
+            self._watek_petli.join()
+            self._petla = None
+
+    async def _obsluz_klienta(self, czytnik, pisarz):
+        self.liczba_klientow += 1
+        try:
+            while True:
+                naglowek = await czytnik.readexactly(_mbap.size)
+                transakcja, protokol, dlugosc, jednostka = _mbap.unpack(naglowek)
+                pdu = await czytnik.readexactly(max(0, dlugosc - 1))
+                if protokol != 0 or (self.jednostka is not None and jednostka != self.jednostka):
+                    continue
+                odpowiedz = self.obsluz(pdu)
+                pisarz.write(_mbap.pack(transakcja, 0, len(odpowiedz) + 1, jednostka) + odpowiedz)
+                await pisarz.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self.liczba_klientow -= 1
+            pisarz.close()
+
+    def obsluz(self, pdu):
+        # PDU zapytania -> PDU odpowiedzi (albo wyjątku Modbus)
+        self.liczba_zapytan += 1
+        if not pdu:
+            return self._wyjatek(0, BLAD_WARTOSCI)
+        funkcja = pdu[0]
+        if len(pdu) != DLUGOSCI_PDU.get(funkcja, len(pdu)):
+            return self._wyjatek(funkcja, BLAD_WARTOSCI)
+        if funkcja in (CZYTAJ_REJESTRY, CZYTAJ_CEWKI) and self.watek.blad is not None:
+            # migawka zatrzymanego modelu nie jest już bieżąca
+            return self._wyjatek(funkcja, BLAD_SERWERA)
+        try:
+            if funkcja == CZYTAJ_REJESTRY:
+                adres, liczba = struct.unpack_from(">HH", pdu, 1)
+                if not 1 <= liczba <= MAKS_REJESTROW:
+                    return self._wyjatek(funkcja, BLAD_WARTOSCI)
+                obraz = self.obraz()
+                if adres + liczba > obraz.liczba_rejestrow:
+                    return self._wyjatek(funkcja, BLAD_ADRESU)
+                dane = obraz.rejestry[2 * adres:2 * (adres + liczba)]
+                return bytes((funkcja, len(dane))) + dane
+
+            if funkcja == CZYTAJ_CEWKI:
+                adres, liczba = struct.unpack_from(">HH", pdu, 1)
+                if not 1 <= liczba <= MAKS_CEWEK:
+                    return self._wyjatek(funkcja, BLAD_WARTOSCI)
+                bity = self._cewki(adres, liczba)
+                if bity is None:
+                    return self._wyjatek(funkcja, BLAD_ADRESU)
+                dane = _spakuj_bity(bity)
+                return bytes((funkcja, len(dane))) + dane
+
+            if funkcja == ZAPISZ_REJESTR:
+                adres, wartosc = struct.unpack_from(">HH", pdu, 1)
+                blad = self._zapisz_rejestry(adres, [wartosc])
+                return self._wyjatek(funkcja, blad) if blad else pdu[:5]
+
+            if funkcja == ZAPISZ_REJESTRY:
+                adres, liczba, bajty = struct.unpack_from(">HHB", pdu, 1)
+                if not 1 <= liczba <= 123 or bajty != 2 * liczba or len(pdu) != 6 + bajty:
+                    return self._wyjatek(funkcja, BLAD_WARTOSCI)
+                wartosci = struct.unpack_from(f">{liczba}H", pdu, 6)
+                blad = self._zapisz_rejestry(adres, wartosci)
+                return self._wyjatek(funkcja, blad) if blad else pdu[:5]
+
+            if funkcja == ZAPISZ_CEWKE:
+                adres, wartosc = struct.unpack_from(">HH", pdu, 1)
+                if wartosc not in (0x0000, 0xFF00):
+                    return self._wyjatek(funkcja, BLAD_WARTOSCI)
+                blad = self._zapisz_cewke(adres, wartosc == 0xFF00)
+                return self._wyjatek(funkcja, blad) if blad else pdu[:5]
+        except struct.error:
+            return self._wyjatek(funkcja, BLAD_WARTOSCI)
+        return self._wyjatek(funkcja, BLAD_FUNKCJI)
+
+    def _wyjatek(self, funkcja, kod):
+        return bytes((funkcja | 0x80, kod))
+
+    def _cewki(self, adres, liczba):
+        obraz = self.obraz()
+        nz = len(obraz.migawka.poziomy)
+        for poczatek, ile in ((ADRES_PRZEPLYWOW, len(obraz.cewki)), (ADRES_NAPELNIJ, nz), (ADRES_OPROZNIJ, nz)):
+            if poczatek <= adres and adres + liczba <= poczatek + ile:
+                if poczatek == ADRES_PRZEPLYWOW:
+                    return obraz.cewki[adres - poczatek:adres - poczatek + liczba]
+                # cewki poleceń czytają się jako 0
+                return [False] * liczba
+        return None
+
+    def _zapisz_rejestry(self, adres, wartosci):
+        nz = len(self.obraz().migawka.poziomy)
+        if adres + len(wartosci) > 2 * nz:
+            return BLAD_ADRESU
+        polecenia = []
+        for rejestr, wartosc in enumerate(wartosci, adres):
+            if rejestr % 2 == 0:
+                # poziom tylko do odczytu
+                return BLAD_ADRESU
+            if wartosc > 10000 and wartosc != BRAK_NASTAWY:
+                return BLAD_WARTOSCI
+            polecenia.append((rejestr // 2, None if wartosc == BRAK_NASTAWY else wartosc / 100.0))
+        for zbiornik, nastawa in polecenia:
+            self.watek.wyslij("nastawa", zbiornik, nastawa)
+        return None
+
+    def _zapisz_cewke(self, adres, wartosc):
+        nz = len(self.obraz().migawka.poziomy)
+        for poczatek, polecenie in ((ADRES_NAPELNIJ, "napelnij"), (ADRES_OPROZNIJ, "oproznij")):
+            if poczatek <= adres < poczatek + nz:
+                if wartosc:
+                    self.watek.wyslij(polecenie, adres - poczatek)
+                return None
+        return BLAD_ADRESU
+
+
+class KlientModbus:
+    # prosty klient do testów i skryptów na localhost
+    def __init__(self, host="127.0.0.1", port=5020, jednostka=1):
+        self.host = host
+        self.port = port
+        self.jednostka = jednostka
+        self._transakcja = 0
+        self._czytnik = None
+        self._pisarz = None
+
+    async def polacz(self):
+        self._czytnik, self._pisarz = await asyncio.open_connection(self.host, self.port)
+        return self
+
+    async def zamknij(self):
+        if self._pisarz is not None:
+            self._pisarz.close()
+            await self._pisarz.wait_closed()
+            self._pisarz = None
+
+    async def zapytanie(self, pdu):
+        self._transakcja = (self._transakcja + 1) & 0xFFFF
+        self._pisarz.write(_mbap.pack(self._transakcja, 0, len(pdu) + 1, self.jednostka) + pdu)
+        await self._pisarz.drain()
+        transakcja, _, dlugosc, _ = _mbap.unpack(await self._czytnik.readexactly(_mbap.size))
+        odpowiedz = await self._czytnik.readexactly(dlugosc - 1)
+        if transakcja != self._transakcja:
+            raise IOError(f"Odpowiedź na transakcję {transakcja}, oczekiwano {self._transakcja}")
+        if odpowiedz[0] & 0x80:
+            raise IOError(f"Wyjątek Modbus {odpowiedz[1]} dla funkcji {pdu[0]}")
+        return odpowiedz
+
+    async def czytaj_rejestry(self, adres, liczba):
+        wynik = []
+        while liczba > 0:
+            ile = min(liczba, MAKS_REJESTROW)
+            odpowiedz = await self.zapytanie(struct.pack(">BHH", CZYTAJ_REJESTRY, adres, ile))
+            wynik += struct.unpack_from(f">{ile}H", odpowiedz, 2)
+            adres += ile
+            liczba -= ile
+        return wynik
+
+    async def czytaj_wiele(self, adresy):
+        # rejestry o dowolnych adresach; sąsiednie czytane jednym zapytaniem
+        adresy = sorted(set(adresy))
+        wynik = {}
+        i = 0
+        while i < len(adresy):
+            j = i
+            while j + 1 < len(adresy) and adresy[j + 1] == adresy[j] + 1 and j + 1 - i < MAKS_REJESTROW:
+                j += 1
+            for adres, wartosc in zip(adresy[i:j + 1], await self.czytaj_rejestry(adresy[i], j + 1 - i)):
+                wynik[adres] = wartosc
+            i = j + 1
+        return wynik
+
+    async def czytaj_cewki(self, adres, liczba):
+        odpowiedz = await self.zapytanie(struct.pack(">BHH", CZYTAJ_CEWKI, adres, liczba))
+        return [bool(odpowiedz[2 + i // 8] >> (i % 8) & 1) for i in range(liczba)]
+
+    async def zapisz_rejestr(self, adres, wartosc):
+        await self.zapytanie(struct.pack(">BHH", ZAPISZ_REJESTR, adres, wartosc))
+
+    async def zapisz_rejestry(self, adres, wartosci):
+        await self.zapytanie(struct.pack(f">BHHB{len(wartosci)}H", ZAPISZ_REJESTRY, adres, len(wartosci),
+                                         2 * len(wartosci), *wartosci))
+
+    async def zapisz_cewke(self, adres, wartosc):
+        await self.zapytanie(struct.pack(">BHH", ZAPISZ_CEWKE, adres, 0xFF00 if wartosc else 0x0000))
+
+    async def poziomy(self, liczba_zbiornikow):
+        # (poziom %, nastawa % albo None) każdego zbiornika
+        rejestry = await self.czytaj_rejestry(0, 2 * liczba_zbiornikow)
+        return [(rejestry[2 * i] / 100.0, None if rejestry[2 * i + 1] == BRAK_NASTAWY else rejestry[2 * i + 1] / 100.0)
+                for i in range(liczba_zbiornikow)]
+
+
+def main(argv=None):
+    from silnik import SilnikKaskady
+    from watek_symulacji import WatekSymulacji
+
+    parser = argparse.ArgumentParser(description="Symulacja kaskady bez okna z serwerem Modbus/TCP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5020)
+    parser.add_argument("--predkosc", type=float, default=1.0, help="mnożnik czasu symulacji")
+    args = parser.parse_args(argv)
+
+    watek = WatekSymulacji(SilnikKaskady(regulator_pid=True))
+    watek.harmonogram.predkosc = args.predkosc
+    watek.start()
+    watek.wznow()
+    serwer = SerwerModbus(watek, args.host, args.port)
+    print(f"Modbus/TCP na {args.host}:{args.port}")
+    try:
+        asyncio.run(_sluchaj(serwer))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watek.zakoncz()
+
+
+async def _sluchaj(serwer):
+    async with await serwer.uruchom():
+        await asyncio.Event().wait()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,391 @@
+import heapq
+import math
+
+from rura import Rura
+from zbiornik import Zbiornik
+
+KROK_CZASU = 0.02
+
+
+class Instalacja:
+    def __init__(self, flow_speed=0.8):
+        self.zbiorniki = []
+        self.rury = []
+        # flow_speed to ilość przenoszona w jednym kroku KROK_CZASU (20 ms)
+        # przez rury bez własnego wydatku
+        self.flow_speed = flow_speed
+        self.czas = 0.0
+        self.licznik_krokow = 0
+        self._polaczenia = None
+        # funkcje bez argumentów wywoływane po każdym kroku step() i po każdym
+        # kroku liczonym wprost przez run_zdarzeniowo() (nie po przeskokach)
+        self.po_kroku = []
+        # ModelFizyczny z fizyka.py: przepływ zależny od poziomu, całkowany
+        # krokami adaptacyjnymi wewnątrz step(dt); None to stały wydatek
+        self.fizyka = None
+        # Sterowanie z sterowanie.py (jego stan trafia do migawek stan.py)
+        # i funkcje (dt) -> ile kroków run_zdarzeniowo może przeskoczyć
+        self.sterowanie = None
+        self.ograniczenia_skoku = []
+        # funkcje po_kroku, które same sprawdzają, czy mają coś do zrobienia:
+        # funkcja -> (dt) -> ile kolejnych kroków może minąć bez jej wywołania
+        self.terminy_po_kroku = {}
+        # SilnikRownolegly z silnik_rownolegly.py: przelew liczony w procesach
+        # roboczych, każdy na swojej części instalacji; None to ten proces
+        self.rownolegle = None
+
+    def dodaj_zbiornik(self, zbiornik):
+        self.zbiorniki.append(zbiornik)
+        self._polaczenia = None
+        return zbiornik
+
+    def polacz(self, zrodlo, cel, rura=None, prog_zrodla=5.0, z_nastawa=False, wydatek=None,
+               krzywa_pompy=None):
+        if rura is None:
+            rura = Rura([zrodlo.punkt_wyjscia(), cel.punkt_wejscia()])
+        rura.zrodlo = zrodlo
+        rura.cel = cel
+        rura.prog_zrodla = prog_zrodla
+        rura.z_nastawa = z_nastawa
+        rura.wydatek = wydatek
+        rura.krzywa_pompy = krzywa_pompy
+        self.rury.append(rura)
+        self._polaczenia = None
+        return rura
+
+    def napelnij(self, zbiornik):
+        zbiornik.aktualna_ilosc = zbiornik.pojemnosc
+        zbiornik.aktualizuj_poziom()
+
+    def oproznij(self, zbiornik):
+        zbiornik.aktualna_ilosc = 0.0
+        zbiornik.aktualizuj_poziom()
+
+    def ustaw_nastawe(self, zbiornik, wartosc):
+        zbiornik.nastawa_poziomu = wartosc
+
+    @property
+    def polaczenia(self):
+        if self._polaczenia is None:
+            self.kompiluj()
+        return self._polaczenia
+
+    def kompiluj(self):
+        # Rury w kolejności topologicznej źródeł (najpierw zasilanie z góry
+        # kaskady); zbiorniki w obiegach zamkniętych zachowują kolejność dodania.
+        # Po zmianie reguł istniejącej rury trzeba wywołać kompiluj() ponownie.
+        indeks = {id(z): i for i, z in enumerate(self.zbiorniki)}
+        n = len(self.zbiorniki)
+        wejscia = [0] * n
+        wyjscia = [[] for _ in range(n)]
+        for r in self.rury:
+            wejscia[indeks[id(r.cel)]] += 1
+            wyjscia[indeks[id(r.zrodlo)]].append(indeks[id(r.cel)])
+
+        gotowe = [i for i in range(n) if wejscia[i] == 0]
+        heapq.heapify(gotowe)
+        kolejnosc = []
+        while gotowe:
+            i = heapq.heappop(gotowe)
+            kolejnosc.append(i)
+            for j in wyjscia[i]:
+                wejscia[j] -= 1
+                if wejscia[j] == 0:
+                    heapq.heappush(gotowe, j)
+        odwiedzone = set(kolejnosc)
+        kolejnosc += [i for i in range(n) if i not in odwiedzone]
+        self.kolejnosc_zbiornikow = kolejnosc
+        pozycja = [0] * n
+        for p, i in enumerate(kolejnosc):
+            pozycja[i] = p
+
+        rury = sorted(self.rury, key=lambda r: pozycja[indeks[id(r.zrodlo)]])
+        self.indeksy_zrodel = [indeks[id(r.zrodlo)] for r in rury]
+        self.indeksy_celow = [indeks[id(r.cel)] for r in rury]
+        self._polaczenia = [(r, r.zrodlo, r.cel, r.prog_zrodla, r.z_nastawa, r.wydatek) for r in rury]
+        return self._polaczenia
+
+    def step(self, dt=KROK_CZASU):
+        if self.fizyka is not None:
+            self.fizyka.calkuj(self, dt)
+        elif self.rownolegle is not None:
+            self.rownolegle.przelej(dt, 1)
+        else:
+            self._przelej(dt / KROK_CZASU)
+        self.czas += dt
+        self.licznik_krokow += 1
+        for f in self.po_kroku:
+            f()
+
+    def _przelej(self, skala, zapis=None):
+        flow_speed = self.flow_speed
+        for rura, zrodlo, cel, prog_zrodla, z_nastawa, wydatek in self.polaczenia:
+            otwarcie = 0.0 if rura.blokada else rura.otwarcie
+            ilosc_kroku = (flow_speed if wydatek is None else wydatek) * skala * otwarcie
+            if z_nastawa:
+                # brak nastawy zamyka regułę, jak w fizyka.py
+                nastawa = cel.nastawa_poziomu
+                limit = -math.inf if nastawa is None else cel.pojemnosc * (nastawa / 100.0)
+            else:
+                # odpowiednik "not cel.czy_pelny()"
+                limit = cel.pojemnosc - 0.1
+            przed_zrodlo = zrodlo.aktualna_ilosc
+            przed_cel = cel.aktualna_ilosc
+
+            plynie = przed_zrodlo > prog_zrodla and przed_cel < limit and otwarcie > 0.0
+            pelny_przelew = True
+            if plynie:
+                ilosc = zrodlo.usun_ciecz(ilosc_kroku)
+                dodano = cel.dodaj_ciecz(ilosc)
+                pelny_przelew = ilosc == ilosc_kroku and dodano == ilosc
+            rura.ustaw_przeplyw(plynie)
+
+            if zapis is not None:
+                zapis.append((ilosc_kroku, przed_zrodlo, przed_cel, limit, plynie, pelny_przelew))
+
+    def run(self, until=None, max_steps=None, dt=KROK_CZASU):
+        if until is None and max_steps is None:
+            raise ValueError("Podaj until albo max_steps")
+
+        wykonane = 0
+        # pół kroku tolerancji, żeby błąd sumowania czasu nie dokładał kroku
+        granica = None if until is None else until - dt / 2
+        terminy = self.terminy_po_kroku
+        if (self.rownolegle is not None and self.fizyka is None
+                and all(f in terminy for f in self.po_kroku)):
+            # procesy robocze liczą paczkę kroków do najbliższego kroku, po
+            # którym któraś funkcja po_kroku ma coś do zrobienia (bez funkcji
+            # po kroku wszystkie kroki naraz); pominięte wywołania i tak nic
+            # by nie zrobiły, więc wynik jest ten sam co krok po kroku
+            while True:
+                limit = min([math.inf] + [terminy[f](dt) for f in self.po_kroku]) + 1
+                czas = self.czas
+                paczka = 0
+                while (paczka < limit and (max_steps is None or wykonane + paczka < max_steps)
+                       and (granica is None or czas < granica)):
+                    czas += dt
+                    paczka += 1
+                if not paczka:
+                    return wykonane
+                self.rownolegle.przelej(dt, paczka)
+                self.czas = czas
+                self.licznik_krokow += paczka
+                wykonane += paczka
+                for f in self.po_kroku:
+                    f()
+        while max_steps is None or wykonane < max_steps:
+            if granica is not None and self.czas >= granica:
+                break
+            self.step(dt)
+            wykonane += 1
+        return wykonane
+
+    def run_zdarzeniowo(self, until=None, max_steps=None, dt=KROK_CZASU):
+        if until is None and max_steps is None:
+            raise ValueError("Podaj until albo max_steps")
+        if self.fizyka is not None:
+            raise ValueError("run_zdarzeniowo wymaga stałego wydatku rur; w trybie fizycznym użyj step(dt) z długim dt")
+
+        pozostalo = math.inf if max_steps is None else max_steps
+        if until is not None:
+            granica = until - dt / 2
+            pozostalo = min(pozostalo, max(0, math.ceil((granica - self.czas) / dt)))
+
+        skala = dt / KROK_CZASU
+        zdarzenia = []
+        while pozostalo > 0:
+            przeplywy_przed = tuple(r.czy_plynie for r in self.rury)
+            zapis = []
+            self._przelej(skala, zapis)
+            self.czas += dt
+            self.licznik_krokow += 1
+            pozostalo -= 1
+            for f in self.po_kroku:
+                f()
+
+            przeplywy = tuple(r.czy_plynie for r in self.rury)
+            if przeplywy != przeplywy_przed:
+                zdarzenia.append((self.licznik_krokow, self.czas,
+                                  tuple(z.aktualna_ilosc for z in self.zbiorniki), przeplywy))
+
+            if pozostalo > 0:
+                # np. do najbliższego wykonania pętli regulacji
+                limit = min([pozostalo] + [f(dt) for f in self.ograniczenia_skoku])
+                skok = self._skok_do_zdarzenia(zapis, limit) if limit > 0 else 0
+                if skok > 0:
+                    self.czas = _przesun_dokladnie(self.czas, (dt,), skok)
+                    self.licznik_krokow += skok
+                    pozostalo -= skok
+        return zdarzenia
+
+    def _skok_do_zdarzenia(self, zapis, pozostalo):
+        # Przy stałym zestawie płynących rur ilości zmieniają się liniowo, więc
+        # liczba kroków do najbliższego przełączenia wynika z progów.
+        operacje = {id(z): [] for z in self.zbiorniki}
+        for (_, zrodlo, cel, *_), (ilosc_kroku, _, _, _, plynie, pelny_przelew) in zip(self.polaczenia, zapis):
+            if not pelny_przelew:
+                return 0
+            if plynie:
+                operacje[id(zrodlo)].append(-ilosc_kroku)
+                operacje[id(cel)].append(ilosc_kroku)
+        zmiana = {k: sum(v) for k, v in operacje.items()}
+
+        horyzont = math.inf
+        for (_, zrodlo, cel, prog_zrodla, *_), (ilosc_kroku, x_zr, x_ce, limit, plynie, _) in zip(self.polaczenia, zapis):
+            d_zr = zmiana[id(zrodlo)]
+            d_ce = zmiana[id(cel)]
+            if plynie:
+                h = min(_kroki_po_stronie(x_zr, d_zr, max(prog_zrodla, ilosc_kroku), True),
+                        _kroki_po_stronie(x_ce, d_ce, min(limit, cel.pojemnosc - ilosc_kroku), False))
+            else:
+                h_zr = _kroki_po_stronie(x_zr, d_zr, prog_zrodla, False) if x_zr <= prog_zrodla else 0
+                h_ce = _kroki_po_stronie(x_ce, d_ce, limit, True) if x_ce >= limit else 0
+                h = max(h_zr, h_ce)
+            horyzont = min(horyzont, h)
+
+        if horyzont == math.inf:
+            skok = pozostalo
+        else:
+            # zapas na zaokrąglenia; same przełączenia wykonują zwykłe kroki
+            skok = min(pozostalo, horyzont - 2 - horyzont // 10**6)
+        if skok <= 0:
+            return 0
+
+        for z in self.zbiorniki:
+            if operacje[id(z)]:
+                z.aktualna_ilosc = _przesun_dokladnie(z.aktualna_ilosc, operacje[id(z)], skok)
+                z.aktualizuj_poziom()
+        return skok
+
+
+class SilnikKaskady(Instalacja):
+    def __init__(self, flow_speed=0.8, regulator_pid=False):
+        super().__init__(flow_speed)
+        self.z1 = self.dodaj_zbiornik(Zbiornik(300, 30, 400, 80, nazwa="Z1 Główny"))
+        self.z2 = self.dodaj_zbiornik(Zbiornik(150, 200, 100, 200, nazwa="Z2 Silos A"))
+        self.z3 = self.dodaj_zbiornik(Zbiornik(750, 200, 100, 200, nazwa="Z3 Silos B"))
+        self.z4 = self.dodaj_zbiornik(Zbiornik(300, 480, 400, 80, nazwa="Z4 Mieszalnik"))
+
+        self.z1.aktualna_ilosc = 100.0
+        self.z1.aktualizuj_poziom()
+        self.z4.nastawa_poziomu = 60
+
+        p1_out = self.z1.punkt_wyjscia()
+        p2_in = self.z2.punkt_wejscia()
+        # próg 0.1 odpowiada warunkowi "not czy_pusty()"
+        self.rura1 = self.polacz(self.z1, self.z2, Rura([
+            p1_out,
+            (p1_out[0], p1_out[1] + 40),
+            (p2_in[0], p1_out[1] + 40),
+            p2_in
+        ]), prog_zrodla=0.1)
+
+        p2_out = self.z2.punkt_wyjscia()
+        p3_in = self.z3.punkt_wejscia()
+        self.rura2 = self.polacz(self.z2, self.z3, Rura([
+            p2_out,
+            (p2_out[0], p2_out[1] + 10),
+            (p2_out[0] + 60, p2_out[1] + 10),
+            (p2_out[0] + 60, p3_in[1] - 20),
+            (p3_in[0], p3_in[1] - 20),
+            p3_in
+        ]), prog_zrodla=5.0)
+
+        p3_out = self.z3.punkt_wyjscia()
+        p4_in = self.z4.punkt_wejscia()
+        self.rura3 = self.polacz(self.z3, self.z4, Rura([
+            p3_out,
+            (p3_out[0], p3_out[1] + 20),
+            (p4_in[0], p3_out[1] + 20),
+            p4_in
+        ]), prog_zrodla=5.0, z_nastawa=True)
+
+        if regulator_pid:
+            # poziom Z4 trzyma PID na otwarciu rury Z3->Z4 zamiast odcięcia na nastawie
+            from sterowanie import Sterowanie
+            self.regulator = Sterowanie(self)
+            self.regulator.dodaj_pid(self.z4, self.rura3, okres=0.1, kp=0.1, ki=0.05)
+            self.regulator.podlacz()
+
+
+def instalacja_testowa(liczba_zbiornikow, w_wierszu=16):
+    # siatka zbiorników połączonych w łańcuch i co drugi z przeskokiem o dwa,
+    # czyli około 1.5 rury na zbiornik; pierwszy zbiornik pełny
+    s = Instalacja()
+    for i in range(liczba_zbiornikow):
+        x = 20 + (i % w_wierszu) * 90
+        y = 20 + (i // w_wierszu) * 140
+        s.dodaj_zbiornik(Zbiornik(x, y, 60, 100, nazwa=f"Z{i + 1}"))
+    for i in range(liczba_zbiornikow - 1):
+        s.polacz(s.zbiorniki[i], s.zbiorniki[i + 1], prog_zrodla=0.1)
+        if i % 2 == 0 and i + 2 < liczba_zbiornikow:
+            s.polacz(s.zbiorniki[i], s.zbiorniki[i + 2])
+    s.napelnij(s.zbiorniki[0])
+    s.kompiluj()
+    return s
+
+def _kroki_po_stronie(x, d, prog, powyzej):
+    # ile kolejnych kroków x + j*d pozostaje po tej samej stronie progu;
+    # nieskończonego progu (reguła zamknięta brakiem nastawy) nie przekroczy
+    if math.isinf(prog):
+        return math.inf
+    if powyzej:
+        if d >= 0:
+            return math.inf
+        return math.ceil((x - prog) / -d) - 1
+    if d <= 0:
+        return math.inf
+    return math.ceil((prog - x) / d) - 1
+
+
+def _przesun_dokladnie(x, operacje, n):
+    # Wynik n-krotnego wykonania "for op in operacje: x += op" w arytmetyce
+    # float, bit w bit, bez n iteracji. Dopóki wszystkie wyniki pośrednie
+    # leżą w jednej binadzie [2^(e-1), 2^e), każde dodawanie przesuwa x o
+    # tę samą wielokrotność ulp, więc kroki można policzyć na liczbach całkowitych.
+    while n > 0:
+        if x < 2.2250738585072014e-308:
+            for op in operacje:
+                x += op
+            n -= 1
+            continue
+
+        _, e = math.frexp(x)
+        ulp = math.ldexp(1.0, e - 53)
+        dolna = 1 << 52
+        gorna = 1 << 53
+
+        y = x
+        czesciowe = [0]
+        w_binadzie = True
+        for op in operacje:
+            s = y + op
+            b = s - y
+            blad = (y - (s - b)) + (op - b)
+            if not (math.ldexp(1.0, e - 1) <= s < math.ldexp(1.0, e)) or 2 * abs(blad) == ulp:
+                w_binadzie = False
+                break
+            czesciowe.append(czesciowe[-1] + int((s - y) / ulp))
+            y = s
+
+        m = 0
+        if w_binadzie:
+            X = int(x / ulp)
+            D = czesciowe[-1]
+            m = n
+            for P in czesciowe[1:]:
+                v = X + P
+                if D > 0:
+                    m = min(m, (gorna - 1 - v) // D + 1)
+                elif D < 0:
+                    m = min(m, (v - dolna) // -D + 1)
+
+        if m <= 0:
+            for op in operacje:
+                x += op
+            n -= 1
+            continue
+
+        x = (int(x / ulp) + m * czesciowe[-1]) * ulp
+        n -= m
+    return x
@@ -0,0 +1,359 @@
+import argparse
+import math
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from multiprocessing import connection, shared_memory
+from threading import BrokenBarrierError
+
+from silnik import KROK_CZASU, instalacja_testowa
+
+# Przelew dużej instalacji w kilku procesach. Zbiorniki dzielone są na części
+# (podziel), a rurę liczy proces, do którego należy jej źródło. Każdy proces
+# przechodzi swoje rury w tej samej kolejności co Instalacja._przelej, więc
+# wynik jest bit w bit taki sam jak w jednym procesie. Gdy kolejną operację na
+# zbiorniku w kroku wykonuje inny proces, ilość zbiornika przechodzi przez
+# przekazanie: komórkę wartości w pamięci współdzielonej, zapisywaną raz na
+# krok, i semafor, który pisarz podnosi po zapisie, a czytelnik opuszcza
+# przed odczytem. Czekanie dotyczy tylko tych zbiorników, więc proces
+# z początku kaskady może liczyć następny krok, zanim dalsze skończą bieżący.
+# Paczki kroków zaczyna i kończy bariera; między nimi proces główny
+# przepisuje stan z i do obiektów Instalacja.
+
+# Układ segmentu (natywny porządek bajtów, wszystko wyrównane do 8 bajtów):
+#   sterowanie   int64 x 2: liczba kroków paczki (-1 = koniec), numer kroku
+#   ilosci       nz x float64, stan zbiorników na granicy paczek
+#   ilosci_kroku nr x float64 }
+#   limity       nr x float64 } reguły rur w kolejności Instalacja.polaczenia,
+#   otwarcia     nr x float64 } stałe w paczce
+#   wartosci     nh x float64, przekazania między procesami
+#   przeplywy    nr x uint8
+
+
+def podziel(instalacja, liczba_czesci):
+    # spójne odcinki kolejności topologicznej o podobnej liczbie rur, więc
+    # rury między częściami płyną głównie do następnej części
+    s = instalacja
+    # kompiluje instalację, jeśli trzeba
+    s.polaczenia
+    wagi = [1] * len(s.zbiorniki)
+    for i in s.indeksy_zrodel:
+        wagi[i] += 2
+    razem = sum(wagi)
+    czesci = [0] * len(s.zbiorniki)
+    suma = 0
+    for i in s.kolejnosc_zbiornikow:
+        czesci[i] = min(liczba_czesci - 1, suma * liczba_czesci // razem)
+        suma += wagi[i]
+    return czesci
+
+
+def _plan(instalacja, czesci, liczba_czesci):
+    # dla każdego procesu: operacje (rura, źródło, cel, próg, pojemność celu,
+    # przekazania przed, przekazania po), zbiorniki do wczytania i do oddania
+    s = instalacja
+    zrodla = s.indeksy_zrodel
+    cele = s.indeksy_celow
+    wykonawcy = [czesci[i] for i in zrodla]
+    operacje = [[] for _ in s.zbiorniki]
+    for k, (zr, ce) in enumerate(zip(zrodla, cele)):
+        operacje[zr].append(k)
+        if ce != zr:
+            operacje[ce].append(k)
+
+    wejscia = [[] for _ in zrodla]
+    wyjscia = [[] for _ in zrodla]
+    koncowe = [[] for _ in range(liczba_czesci)]
+    liczba_przekazan = 0
+    for t, ks in enumerate(operacje):
+        if not ks:
+            continue
+        koncowe[wykonawcy[ks[-1]]].append(t)
+        for j, k in enumerate(ks):
+            # poprzednia operacja na zbiorniku; dla pierwszej w kroku to
+            # ostatnia z poprzedniego kroku
+            poprzednia = ks[j - 1]
+            if wykonawcy[poprzednia] != wykonawcy[k]:
+                wyjscia[poprzednia].append((liczba_przekazan, t))
+                wejscia[k].append((liczba_przekazan, t, 1 if j == 0 else 0))
+                liczba_przekazan += 1
+
+    plany = []
+    for w in range(liczba_czesci):
+        moje = [k for k in range(len(zrodla)) if wykonawcy[k] == w]
+        dotkniete = sorted({zrodla[k] for k in moje} | {cele[k] for k in moje})
+        plany.append({
+            "operacje": [(k, zrodla[k], cele[k], s.polaczenia[k][3], s.zbiorniki[cele[k]].pojemnosc,
+                          wejscia[k], wyjscia[k]) for k in moje],
+            "wczytaj": dotkniete,
+            "koncowe": koncowe[w],
+        })
+    return plany, liczba_przekazan
+
+
+def _uklad(nz, nr, nh):
+    return (("sterowanie", "q", 2), ("ilosci", "d", nz), ("ilosci_kroku", "d", nr), ("limity", "d", nr),
+            ("otwarcia", "d", nr), ("wartosci", "d", nh), ("przeplywy", "B", nr))
+
+
+def _rozmiar(nz, nr, nh):
+    return sum(n * (1 if format_ == "B" else 8) for _, format_, n in _uklad(nz, nr, nh))
+
+
+def _widoki(bufor, nz, nr, nh):
+    widoki = {}
+    pozycja = 0
+    for nazwa, format_, n in _uklad(nz, nr, nh):
+        rozmiar = n * (1 if format_ == "B" else 8)
+        widoki[nazwa] = bufor[pozycja:pozycja + rozmiar].cast(format_)
+        pozycja += rozmiar
+    return widoki
+
+
+def _czekaj(sygnal, bariera):
+    # semafor porządkuje też pamięć: zapis wartości przed release() jest
+    # widoczny po acquire(); bariera zepsuta przez proces, który padł, kończy
+    # czekanie
+    while not sygnal.acquire(timeout=0.1):
+        if bariera.broken:
+            raise BrokenBarrierError
+
+
+def _pracownik(nazwa, nz, nr, nh, plan, sygnaly, bariera):
+    # procesy spawn dzielą resource_tracker z procesem głównym, który usuwa
+    # segment; zdjęcie tu rejestracji zepsułoby jego unlink()
+    pamiec = shared_memory.SharedMemory(name=nazwa)
+    widoki = _widoki(pamiec.buf, nz, nr, nh)
+    try:
+        _petla(widoki, plan, sygnaly, bariera)
+    except BrokenBarrierError:
+        pass
+    except BaseException:
+        bariera.abort()
+        raise
+    finally:
+        for widok in widoki.values():
+            widok.release()
+        pamiec.close()
+
+
+def _petla(widoki, plan, sygnaly, bariera):
+    sterowanie = widoki["sterowanie"]
+    ilosci = widoki["ilosci"]
+    wartosci = widoki["wartosci"]
+    przeplywy = widoki["przeplywy"]
+    a = [0.0] * len(ilosci)
+    plynie_lokalnie = {}
+    while True:
+        bariera.wait()
+        liczba_krokow, pierwszy = sterowanie[0], sterowanie[1]
+        if liczba_krokow < 0:
+            return
+        for t in plan["wczytaj"]:
+            a[t] = ilosci[t]
+        ilosci_kroku, limity, otwarcia = widoki["ilosci_kroku"], widoki["limity"], widoki["otwarcia"]
+        operacje = [(k, zr, ce, prog, pojemnosc, ilosci_kroku[k], limity[k], otwarcia[k] > 0.0,
+                     [(sygnaly[h], h, t, z_poprzedniego) for h, t, z_poprzedniego in wej],
+                     [(sygnaly[h], h, t) for h, t in wyj])
+                    for k, zr, ce, prog, pojemnosc, wej, wyj in plan["operacje"]]
+
+        for krok in range(pierwszy, pierwszy + liczba_krokow):
+            for k, zr, ce, prog, pojemnosc, ilosc_kroku, limit, otwarta, wej, wyj in operacje:
+                for sygnal, h, t, z_poprzedniego in wej:
+                    if z_poprzedniego and krok == pierwszy:
+                        # wartość z ostatniego kroku poprzedniej paczki jest
+                        # już w ilosci; jej semafor trzeba tylko opuścić
+                        if pierwszy:
+                            _czekaj(sygnal, bariera)
+                        continue
+                    _czekaj(sygnal, bariera)
+                    a[t] = wartosci[h]
+
+                # Instalacja._przelej z usun_ciecz i dodaj_ciecz
+                plynie = a[zr] > prog and a[ce] < limit and otwarta
+                if plynie:
+                    ilosc = min(ilosc_kroku, a[zr])
+                    a[zr] -= ilosc
+                    a[ce] += min(ilosc, pojemnosc - a[ce])
+                plynie_lokalnie[k] = plynie
+
+                for sygnal, h, t in wyj:
+                    wartosci[h] = a[t]
+                    sygnal.release()
+
+        for t in plan["koncowe"]:
+            ilosci[t] = a[t]
+        for k, plynie in plynie_lokalnie.items():
+            przeplywy[k] = plynie
+        bariera.wait()
+
+
+def _pilnuj(procesy, bariera):
+    # koniec któregokolwiek procesu psuje barierę, więc proces główny nie
+    # czeka bez końca na proces, który padł; po zamknij() bez znaczenia
+    connection.wait([p.sentinel for p in procesy])
+    bariera.abort()
+
+
+class SilnikRownolegly:
+    # Po podlacz() Instalacja.step i Instalacja.run liczą przelew w procesach
+    # roboczych. run() bez funkcji po_kroku wysyła wszystkie kroki jedną
+    # paczką; z nimi paczka kończy się na najbliższym kroku, po którym
+    # któraś z nich ma coś do zrobienia (Instalacja.terminy_po_kroku), a gdy
+    # któraś nie podaje terminu, każdy krok jest osobną paczką, bo funkcja
+    # może zmienić otwarcia, nastawy albo ilości. Zmiany między paczkami (napelnij,
+    # nastawy, otwarcia, blokady) trafiają do procesów na początku paczki.
+    # Zmiana rur wymaga kompiluj(), po której procesy startują od nowa.
+    def __init__(self, instalacja, liczba_procesow=None, czesci=None):
+        self.instalacja = instalacja
+        self.liczba_procesow = liczba_procesow or os.cpu_count()
+        # numer części dla każdego zbiornika; None to podziel()
+        self.czesci = czesci
+        self.pamiec = None
+        self._procesy = []
+        self._sygnaly = []
+        self._polaczenia = None
+        self._krok = 0
+        self.liczba_paczek = 0
+
+    def podlacz(self):
+        self.instalacja.rownolegle = self
+        return self
+
+    def _uruchom(self):
+        s = self.instalacja
+        polaczenia = s.polaczenia
+        if s.fizyka is not None:
+            raise ValueError("SilnikRownolegly wymaga stałego wydatku rur (fizyka = None)")
+        czesci = self.czesci if self.czesci is not None else podziel(s, self.liczba_procesow)
+        liczba_czesci = max(czesci) + 1 if czesci else 1
+        plany, nh = _plan(s, czesci, liczba_czesci)
+        nz, nr = len(s.zbiorniki), len(polaczenia)
+        self.pamiec = shared_memory.SharedMemory(create=True, size=_rozmiar(nz, nr, nh))
+        self._widoki = _widoki(self.pamiec.buf, nz, nr, nh)
+        # spawn, a nie fork: proces główny może mieć wątki (Qt, WatekSymulacji)
+        kontekst = multiprocessing.get_context("spawn")
+        self._bariera = kontekst.Barrier(liczba_czesci + 1)
+        # semafory przekazań; trzymane do zamknij(), bo procesy spawn
+        # otwierają je po nazwie
+        self._sygnaly = sygnaly = [kontekst.Semaphore(0) for _ in range(nh)]
+        # w _procesy tylko uruchomione; po błędzie startu zamknij() nie
+        # czeka na pozostałe
+        self._procesy = []
+        try:
+            for plan in plany:
+                p = kontekst.Process(target=_pracownik, daemon=True,
+                                     args=(self.pamiec.name, nz, nr, nh, plan, sygnaly, self._bariera))
+                p.start()
+                self._procesy.append(p)
+        except BaseException:
+            self._bariera.abort()
+            self.zamknij()
+            raise
+        threading.Thread(target=_pilnuj, args=(self._procesy, self._bariera), daemon=True).start()
+        self._polaczenia = polaczenia
+        self.liczba_przekazan = nh
+
+    def przelej(self, dt, liczba_krokow):
+        s = self.instalacja
+        if self._polaczenia is not s.polaczenia:
+            self.zamknij()
+            self._uruchom()
+        w = self._widoki
+        skala = dt / KROK_CZASU
+        flow_speed = s.flow_speed
+        ilosci = w["ilosci"]
+        for i, z in enumerate(s.zbiorniki):
+            ilosci[i] = z.aktualna_ilosc
+        ilosci_kroku, limity, otwarcia = w["ilosci_kroku"], w["limity"], w["otwarcia"]
+        for k, (rura, _, cel, _, z_nastawa, wydatek) in enumerate(self._polaczenia):
+            # te same działania co w Instalacja._przelej
+            otwarcie = 0.0 if rura.blokada else rura.otwarcie
+            ilosci_kroku[k] = (flow_speed if wydatek is None else wydatek) * skala * otwarcie
+            if z_nastawa:
+                nastawa = cel.nastawa_poziomu
+                limity[k] = -math.inf if nastawa is None else cel.pojemnosc * (nastawa / 100.0)
+            else:
+                limity[k] = cel.pojemnosc - 0.1
+            otwarcia[k] = otwarcie
+        w["sterowanie"][0] = liczba_krokow
+        w["sterowanie"][1] = self._krok
+
+        try:
+            self._bariera.wait()
+            self._bariera.wait()
+        except BrokenBarrierError:
+            self.zamknij()
+            raise RuntimeError("Proces roboczy SilnikRownolegly zakończył się błędem") from None
+        self._krok += liczba_krokow
+        self.liczba_paczek += 1
+
+        for i, z in enumerate(s.zbiorniki):
+            z.aktualna_ilosc = ilosci[i]
+            z.aktualizuj_poziom()
+        przeplywy = w["przeplywy"]
+        for k, (rura, *_) in enumerate(self._polaczenia):
+            rura.ustaw_przeplyw(bool(przeplywy[k]))
+
+    def zamknij(self):
+        if self.pamiec is None:
+            return
+        if not self._bariera.broken and self._procesy:
+            self._widoki["sterowanie"][0] = -1
+            try:
+                self._bariera.wait(timeout=5.0)
+            except BrokenBarrierError:
+                pass
+        for p in self._procesy:
+            p.join(timeout=5.0)
+            if p.is_alive():
+                p.terminate()
+        self._procesy = []
+        self._sygnaly = []
+        for widok in self._widoki.values():
+            widok.release()
+        self._widoki = None
+        self.pamiec.close()
+        self.pamiec.unlink()
+        self.pamiec = None
+        self._polaczenia = None
+        self._krok = 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Porównanie przelewu w jednym i w kilku procesach.")
+    parser.add_argument("--zbiorniki", type=int, default=2000)
+    parser.add_argument("--procesy", type=int, default=os.cpu_count())
+    parser.add_argument("--kroki", type=int, default=500)
+    args = parser.parse_args(argv)
+
+    jeden = instalacja_testowa(args.zbiorniki)
+    start = time.perf_counter()
+    jeden.run(max_steps=args.kroki)
+    czas_jeden = time.perf_counter() - start
+
+    wiele = instalacja_testowa(args.zbiorniki)
+    silnik = SilnikRownolegly(wiele, args.procesy).podlacz()
+    try:
+        # pierwsza paczka uruchamia procesy
+        wiele.run(max_steps=1)
+        start = time.perf_counter()
+        wiele.run(max_steps=args.kroki - 1)
+        czas_wiele = time.perf_counter() - start
+    finally:
+        silnik.zamknij()
+
+    zgodne = all(a.aktualna_ilosc == b.aktualna_ilosc for a, b in zip(jeden.zbiorniki, wiele.zbiorniki)) and \
+        all(a.czy_plynie == b.czy_plynie for a, b in zip(jeden.rury, wiele.rury))
+    print(f"{args.zbiorniki} zbiorników, {len(jeden.rury)} rur, {silnik.liczba_przekazan} przekazań na krok")
+    print(f"procesy: 1  {args.kroki / czas_jeden:10.1f} kroków/s")
+    print(f"procesy: {args.procesy:<2d} {(args.kroki - 1) / czas_wiele:10.1f} kroków/s")
+    print("wynik zgodny bit w bit" if zgodne else "WYNIK NIEZGODNY")
+    if not zgodne:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
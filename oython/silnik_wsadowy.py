@@ -0,0 +1,104 @@
+import numpy as np
+
+from silnik import KROK_CZASU, SilnikKaskady
+from sterowanie import SterowanieWsadowe
+
+class SilnikWsadowy:
+    def __init__(self, liczba_instancji, flow_speed=None, wzor=None):
+        if wzor is None:
+            wzor = SilnikKaskady() if flow_speed is None else SilnikKaskady(flow_speed)
+        n = int(liczba_instancji)
+        zbiorniki = wzor.zbiorniki
+        indeks_rury = {id(r): k for k, r in enumerate(wzor.rury)}
+
+        self.liczba_instancji = n
+        self.flow_speed = wzor.flow_speed if flow_speed is None else flow_speed
+        # reguły przelewu wzoru w kolejności topologicznej; czy_plynie ma
+        # kolumny w kolejności wzor.rury
+        self._reguly = [
+            (indeks_rury[id(rura)], zr, ce, prog_zrodla, z_nastawa, wydatek)
+            for (rura, _, _, prog_zrodla, z_nastawa, wydatek), zr, ce
+            in zip(wzor.polaczenia, wzor.indeksy_zrodel, wzor.indeksy_celow)
+        ]
+        self.aktualna_ilosc = np.tile(
+            np.array([z.aktualna_ilosc for z in zbiorniki], dtype=np.float64), (n, 1))
+        self.pojemnosc = np.tile(
+            np.array([z.pojemnosc for z in zbiorniki], dtype=np.float64), (n, 1))
+        # brak nastawy (None) zapisany jako NaN
+        self.nastawa_poziomu = np.tile(np.array(
+            [np.nan if z.nastawa_poziomu is None else z.nastawa_poziomu for z in zbiorniki],
+            dtype=np.float64), (n, 1))
+        self.czy_plynie = np.zeros((n, len(wzor.rury)), dtype=bool)
+        # otwarcia i blokady rur, kolumny w kolejności wzor.rury
+        self.otwarcie = np.tile(np.array([r.otwarcie for r in wzor.rury], dtype=np.float64), (n, 1))
+        self.blokada = np.tile(np.array([r.blokada for r in wzor.rury], dtype=bool), (n, 1))
+
+        self.czas = 0.0
+        self.licznik_krokow = 0
+        # pętle regulacji wzoru przestawiają otwarcia każdej instancji osobno
+        self.sterowanie = None if wzor.sterowanie is None else SterowanieWsadowe(self, wzor.sterowanie)
+
+        self._ilosc = np.empty(n, dtype=np.float64)
+        self._wolne = np.empty(n, dtype=np.float64)
+        self._limit = np.empty(n, dtype=np.float64)
+        self._warunek = np.empty(n, dtype=bool)
+        self._otwarcie = np.empty(n, dtype=np.float64)
+
+    @property
+    def poziom(self):
+        return self.aktualna_ilosc / self.pojemnosc
+
+    def step(self, dt=KROK_CZASU):
+        skala = dt / KROK_CZASU
+        a = self.aktualna_ilosc
+        ilosc = self._ilosc
+        wolne = self._wolne
+        limit = self._limit
+        warunek = self._warunek
+        otwarcie = self._otwarcie
+
+        for kolumna, zr, ce, prog_zrodla, z_nastawa, wydatek in self._reguly:
+            # zablokowana rura ma zerowe otwarcie
+            np.copyto(otwarcie, self.otwarcie[:, kolumna])
+            otwarcie[self.blokada[:, kolumna]] = 0.0
+            ilosc_kroku = (self.flow_speed if wydatek is None else wydatek) * skala
+            a_zr = a[:, zr]
+            a_ce = a[:, ce]
+
+            if z_nastawa:
+                np.divide(self.nastawa_poziomu[:, ce], 100.0, out=limit)
+                np.multiply(self.pojemnosc[:, ce], limit, out=limit)
+            else:
+                np.subtract(self.pojemnosc[:, ce], 0.1, out=limit)
+            np.less(a_ce, limit, out=warunek)
+            warunek &= a_zr > prog_zrodla
+            warunek &= otwarcie > 0.0
+            self.czy_plynie[:, kolumna] = warunek
+
+            # usun_ciecz: nie więcej niż jest w źródle
+            np.multiply(otwarcie, ilosc_kroku, out=ilosc)
+            np.minimum(a_zr, ilosc, out=ilosc)
+            ilosc *= warunek
+            a_zr -= ilosc
+            # dodaj_ciecz: nie więcej niż wolne miejsce w celu
+            np.subtract(self.pojemnosc[:, ce], a_ce, out=wolne)
+            np.minimum(ilosc, wolne, out=ilosc)
+            a_ce += ilosc
+
+        self.czas += dt
+        self.licznik_krokow += 1
+        if self.sterowanie is not None:
+            self.sterowanie.krok()
+
+    def run(self, until=None, max_steps=None, dt=KROK_CZASU):
+        if until is None and max_steps is None:
+            raise ValueError("Podaj until albo max_steps")
+
+        wykonane = 0
+        granica = None if until is None else until - dt / 2
+        while max_steps is None or wykonane < max_steps:
+            if granica is not None and self.czas >= granica:
+                break
+            self.step(dt)
+            wykonane += 1
+        return wykonane
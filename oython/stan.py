@@ -0,0 +1,142 @@
+import copy
+import functools
+import math
+import struct
+
+# migawka stanu instalacji: nagłówek (znacznik, wersja, liczba zbiorników,
+# liczba rur, flagi, licznik kroków, czas, flow_speed), potem ilości
+# i nastawy zbiorników (brak nastawy jako NaN), otwarcia i stany rur,
+# a przy FLAGA_STEROWANIE na końcu stan pętli regulacji; little-endian
+ZNACZNIK = b"STANINST"
+WERSJA = 2
+FORMAT_NAGLOWKA = "<8sIIIIqdd"
+FLAGA_PRACUJE = 1
+FLAGA_STEROWANIE = 2
+
+_naglowek = struct.Struct(FORMAT_NAGLOWKA)
+
+
+@functools.lru_cache(maxsize=None)
+def _format(liczba_zbiornikow, liczba_rur):
+    return struct.Struct(f"{FORMAT_NAGLOWKA}{liczba_zbiornikow}d{liczba_zbiornikow}d{liczba_rur}d{liczba_rur}B")
+
+
+def zapisz_stan(instalacja, pracuje=False):
+    zbiorniki = instalacja.zbiorniki
+    rury = instalacja.rury
+    flagi = FLAGA_PRACUJE if pracuje else 0
+    if instalacja.sterowanie is not None:
+        flagi |= FLAGA_STEROWANIE
+    dane = _format(len(zbiorniki), len(rury)).pack(
+        ZNACZNIK, WERSJA, len(zbiorniki), len(rury), flagi,
+        instalacja.licznik_krokow, instalacja.czas, instalacja.flow_speed,
+        *[z.aktualna_ilosc for z in zbiorniki],
+        *[math.nan if z.nastawa_poziomu is None else z.nastawa_poziomu for z in zbiorniki],
+        *[r.otwarcie for r in rury],
+        *[r.czy_plynie for r in rury])
+    if instalacja.sterowanie is not None:
+        dane += instalacja.sterowanie.zapisz_stan()
+    return dane
+
+
+def czytaj_naglowek(dane):
+    znacznik, wersja, liczba_zbiornikow, liczba_rur, flagi, licznik_krokow, czas, flow_speed = \
+        _naglowek.unpack_from(dane)
+    if znacznik != ZNACZNIK or wersja != WERSJA:
+        raise ValueError(f"To nie jest migawka stanu w wersji {WERSJA}")
+    rozmiar = _format(liczba_zbiornikow, liczba_rur).size
+    if len(dane) < rozmiar or (len(dane) > rozmiar and not flagi & FLAGA_STEROWANIE):
+        raise ValueError("Niepełna migawka stanu")
+    return liczba_zbiornikow, liczba_rur, flagi, licznik_krokow, czas, flow_speed
+
+
+def wczytaj_stan(instalacja, dane):
+    # przywraca stan zapisany przez zapisz_stan() w instalacji o tym samym
+    # układzie; zwraca flagę pracy symulacji z chwili zapisu
+    zbiorniki = instalacja.zbiorniki
+    rury = instalacja.rury
+    nz, nr, flagi, licznik_krokow, czas, flow_speed = czytaj_naglowek(dane)
+    if (nz, nr) != (len(zbiorniki), len(rury)):
+        raise ValueError(f"Migawka instalacji {nz} zbiorników i {nr} rur, oczekiwano "
+                         f"{len(zbiorniki)} i {len(rury)}")
+
+    if bool(flagi & FLAGA_STEROWANIE) != (instalacja.sterowanie is not None):
+        raise ValueError("Migawka i instalacja różnią się obecnością sterowania")
+
+    format_ = _format(nz, nr)
+    wartosci = format_.unpack_from(dane)[8:]
+    for z, ilosc, nastawa in zip(zbiorniki, wartosci[:nz], wartosci[nz:2 * nz]):
+        z.aktualna_ilosc = ilosc
+        z.nastawa_poziomu = None if math.isnan(nastawa) else nastawa
+        z.aktualizuj_poziom()
+    for r, otwarcie, plynie in zip(rury, wartosci[2 * nz:2 * nz + nr], wartosci[2 * nz + nr:]):
+        r.otwarcie = otwarcie
+        r.ustaw_przeplyw(bool(plynie))
+    if instalacja.sterowanie is not None:
+        instalacja.sterowanie.wczytaj_stan(dane[format_.size:])
+    instalacja.licznik_krokow = licznik_krokow
+    instalacja.czas = czas
+    instalacja.flow_speed = flow_speed
+    return bool(flagi & FLAGA_PRACUJE)
+
+
+def kopia(instalacja):
+    # niezależna kopia instalacji: nowe zbiorniki i rury (płytkie kopie, więc
+    # geometria i obiekty rysowania są współdzielone), przepięte reguły przelewu
+    # i atrybuty w rodzaju z1/rura1/regulator; pętle regulacji są kopiowane ze
+    # stanem, inne funkcje po_kroku zostają przy oryginale
+    mapa = {}
+    for obiekt in instalacja.zbiorniki + instalacja.rury:
+        mapa[id(obiekt)] = copy.copy(obiekt)
+    for r in instalacja.rury:
+        nowa = mapa[id(r)]
+        nowa.zrodlo = mapa[id(r.zrodlo)]
+        nowa.cel = mapa[id(r.cel)]
+
+    klon = copy.copy(instalacja)
+    klon.zbiorniki = [mapa[id(z)] for z in instalacja.zbiorniki]
+    klon.rury = [mapa[id(r)] for r in instalacja.rury]
+    klon.po_kroku = []
+    klon.ograniczenia_skoku = []
+    klon.terminy_po_kroku = {}
+    klon.sterowanie = None
+    if instalacja.sterowanie is not None:
+        instalacja.sterowanie.kopia(klon, mapa).podlacz()
+        mapa[id(instalacja.sterowanie)] = klon.sterowanie
+    for nazwa, wartosc in vars(instalacja).items():
+        if id(wartosc) in mapa:
+            setattr(klon, nazwa, mapa[id(wartosc)])
+    # kopia liczy w tym procesie; SilnikRownolegly przelewałby oryginał
+    klon.rownolegle = None
+    klon._polaczenia = None
+    return klon
+
+
+def rozgalez(instalacja, dane, liczba_instancji):
+    # SilnikWsadowy z liczba_instancji kopiami stanu z migawki, np. do
+    # sprawdzenia wielu wariantów "co jeśli" od jednego punktu kontrolnego;
+    # otwarcia rur i stan pętli regulacji pochodzą z migawki, blokady rur
+    # z instalacji (inne funkcje po kroku, np. alarmy, nie działają w kopiach)
+    import numpy as np
+    from silnik_wsadowy import SilnikWsadowy
+
+    if instalacja.fizyka is not None:
+        raise ValueError("SilnikWsadowy nie ma trybu fizycznego; rozgalez wymaga stałego wydatku rur")
+    nz, nr, flagi, licznik_krokow, czas, flow_speed = czytaj_naglowek(dane)
+    if (nz, nr) != (len(instalacja.zbiorniki), len(instalacja.rury)):
+        raise ValueError("Migawka innej instalacji")
+    if bool(flagi & FLAGA_STEROWANIE) != (instalacja.sterowanie is not None):
+        raise ValueError("Migawka i instalacja różnią się obecnością sterowania")
+    wartosci = np.frombuffer(dane, dtype="<f8", count=2 * nz + nr, offset=_naglowek.size)
+    przeplywy = np.frombuffer(dane, dtype=np.uint8, count=nr, offset=_naglowek.size + 16 * nz + 8 * nr)
+
+    wsad = SilnikWsadowy(liczba_instancji, flow_speed=flow_speed, wzor=instalacja)
+    wsad.aktualna_ilosc[:] = wartosci[:nz]
+    wsad.nastawa_poziomu[:] = wartosci[nz:2 * nz]
+    wsad.otwarcie[:] = wartosci[2 * nz:]
+    wsad.czy_plynie[:] = przeplywy.astype(bool)
+    wsad.czas = czas
+    wsad.licznik_krokow = licznik_krokow
+    if wsad.sterowanie is not None:
+        wsad.sterowanie.wczytaj_stan(dane[_format(nz, nr).size:])
+    return wsad
@@ -0,0 +1,281 @@
+import heapq
+import math
+
+import numpy as np
+
+PID = "pid"
+DWUSTAWNY = "dwustawny"
+MIN_OTWARCIE = 1e-3
+
+
+class _Grupa:
+    # pętle jednego rodzaju o wspólnym okresie i priorytecie, liczone razem
+    # na tablicach NumPy
+    def __init__(self, typ, okres, priorytet):
+        self.typ = typ
+        self.okres = okres
+        self.priorytet = priorytet
+        self.zbiorniki = []
+        self.rury = []
+        self.parametry = []
+
+    def kompiluj(self, indeks):
+        p = np.array(self.parametry, dtype=np.float64).reshape(len(self.rury), -1)
+        self.indeksy = np.array([indeks[id(z)] for z in self.zbiorniki], dtype=np.intp)
+        if self.typ == PID:
+            self.kp, self.ki, self.kd, self.u_min, self.u_max = p.T
+            self.calka = np.zeros(len(self.rury))
+            self.poprzedni = np.full(len(self.rury), np.nan)
+        else:
+            self.histereza, self.napelnianie = p.T
+            self.napelnianie = self.napelnianie.astype(bool)
+            self.wyjscie = np.array([r.otwarcie for r in self.rury], dtype=np.float64)
+
+    def licz(self, pv, sp):
+        # pv, sp w % pojemności; zwraca otwarcia rur
+        T = self.okres
+        if self.typ == PID:
+            # bez nastawy pętla stoi: zerowy uchyb nie rusza całki, która
+            # inaczej stałaby się NaN także po przywróceniu nastawy
+            brak = np.isnan(sp)
+            e = np.where(brak, 0.0, sp - pv)
+            # różniczkowanie pomiaru, żeby skok nastawy nie dawał impulsu
+            d = np.where(np.isnan(self.poprzedni), 0.0, -self.kd * (pv - self.poprzedni) / T)
+            self.poprzedni = pv
+            calka = self.calka + self.ki * e * T
+            u = self.kp * e + calka + d
+            # anti-windup: całka stoi, gdy wyjście jest nasycone, a uchyb
+            # pcha je dalej w nasycenie
+            nasycenie = ((u > self.u_max) & (e > 0)) | ((u < self.u_min) & (e < 0))
+            self.calka = np.where(nasycenie, self.calka, calka)
+            u = np.where(nasycenie, self.kp * e + self.calka + d, u)
+            u = np.clip(u, self.u_min, self.u_max)
+            # resztkowe otwarcie po zamrożeniu całki to zamknięta rura; brak
+            # nastawy też ją zamyka
+            return np.where(brak | (u < self.u_min + MIN_OTWARCIE), self.u_min, u)
+
+        pol = self.histereza / 2
+        ponizej = pv < sp - pol
+        powyzej = pv > sp + pol
+        otworz = np.where(self.napelnianie, ponizej, powyzej)
+        zamknij = np.where(self.napelnianie, powyzej, ponizej) | np.isnan(sp)
+        self.wyjscie = np.where(otworz, 1.0, np.where(zamknij, 0.0, self.wyjscie))
+        return self.wyjscie
+
+    def stan(self):
+        if self.typ == PID:
+            return [self.calka, self.poprzedni]
+        return [self.wyjscie]
+
+    def powiel(self, n):
+        # stan dla n instancji naraz, wiersz na instancję; licz() działa
+        # element po elemencie, więc wynik każdego wiersza jest taki sam
+        # jak dla pojedynczej instalacji
+        if self.typ == PID:
+            self.calka = np.tile(self.calka, (n, 1))
+            self.poprzedni = np.tile(self.poprzedni, (n, 1))
+        else:
+            self.wyjscie = np.tile(self.wyjscie, (n, 1))
+
+
+class Sterowanie:
+    # Pętle regulacji poziomu: wartość mierzona to poziom zbiornika w %,
+    # nastawa to jego nastawa_poziomu, wyjście to otwarcie rury 0..1.
+    # Każda grupa pętli ma własny okres w sekundach czasu symulacji,
+    # niezależny od kroku modelu; grupy czekają w kopcu (czas, priorytet),
+    # a pętla wykonuje się po pierwszym kroku, który osiągnie jej termin.
+    def __init__(self, instalacja):
+        self.instalacja = instalacja
+        self._grupy = {}
+        self._kolejka = None
+        self._zmienione = False
+
+    def _grupa(self, typ, okres, priorytet):
+        klucz = (typ, float(okres), priorytet)
+        if klucz not in self._grupy:
+            self._grupy[klucz] = _Grupa(typ, float(okres), priorytet)
+        self._kolejka = None
+        return self._grupy[klucz]
+
+    def dodaj_pid(self, zbiornik, rura, okres, kp, ki=0.0, kd=0.0, priorytet=0, u_min=0.0, u_max=1.0):
+        # regulator przejmuje rurę: odcięcie na nastawie (z_nastawa) zastępuje
+        # ciągłe otwarcie
+        grupa = self._grupa(PID, okres, priorytet)
+        grupa.zbiorniki.append(zbiornik)
+        grupa.rury.append(rura)
+        grupa.parametry += [kp, ki, kd, u_min, u_max]
+        self._przejmij(rura)
+
+    def dodaj_dwustawny(self, zbiornik, rura, okres, histereza=2.0, priorytet=0, napelnianie=True):
+        # napelnianie=True: rura otwiera się poniżej nastawy (dopływ do zbiornika),
+        # False: powyżej (odpływ)
+        grupa = self._grupa(DWUSTAWNY, okres, priorytet)
+        grupa.zbiorniki.append(zbiornik)
+        grupa.rury.append(rura)
+        grupa.parametry += [histereza, float(napelnianie)]
+        self._przejmij(rura)
+
+    def _przejmij(self, rura):
+        if rura.z_nastawa:
+            rura.z_nastawa = False
+            self.instalacja.kompiluj()
+
+    def kopia(self, instalacja, mapa):
+        # te same pętle dla kopii instalacji (mapa: id obiektu -> kopia), ze
+        # stanem całek i terminów; niekompilowany oryginał zostaje nietknięty
+        klon = Sterowanie(instalacja)
+        for klucz, grupa in self._grupy.items():
+            nowa = _Grupa(grupa.typ, grupa.okres, grupa.priorytet)
+            nowa.zbiorniki = [mapa[id(z)] for z in grupa.zbiorniki]
+            nowa.rury = [mapa[id(r)] for r in grupa.rury]
+            nowa.parametry = list(grupa.parametry)
+            klon._grupy[klucz] = nowa
+        if self._kolejka is not None:
+            klon.wczytaj_stan(self.zapisz_stan())
+            klon._zmienione = self._zmienione
+        return klon
+
+    def podlacz(self):
+        self.instalacja.sterowanie = self
+        self.instalacja.po_kroku.append(self.krok)
+        self.instalacja.ograniczenia_skoku.append(self.kroki_do_petli)
+        self.instalacja.terminy_po_kroku[self.krok] = self.kroki_do_terminu
+
+    def kompiluj(self):
+        indeks = {id(z): i for i, z in enumerate(self.instalacja.zbiorniki)}
+        kolejka = []
+        for nr, grupa in enumerate(self._grupy.values()):
+            grupa.kompiluj(indeks)
+            kolejka.append((self.instalacja.czas, grupa.priorytet, nr, grupa))
+        heapq.heapify(kolejka)
+        self._kolejka = kolejka
+
+    def krok(self):
+        if self._kolejka is None:
+            self.kompiluj()
+        kolejka = self._kolejka
+        czas = self.instalacja.czas
+        if not kolejka or kolejka[0][0] > czas + 1e-9:
+            return
+
+        while kolejka and kolejka[0][0] <= czas + 1e-9:
+            termin, priorytet, nr, grupa = kolejka[0]
+            # tylko zbiorniki tej grupy, nie cała instalacja: koszt rośnie
+            # z liczbą pętli, a nie zbiorników
+            zbiorniki = grupa.zbiorniki
+            n = len(zbiorniki)
+            poziomy = np.fromiter((z.aktualna_ilosc / z.pojemnosc for z in zbiorniki), np.float64, n) * 100.0
+            nastawy = np.fromiter((np.nan if z.nastawa_poziomu is None else z.nastawa_poziomu
+                                   for z in zbiorniki), np.float64, n)
+            wyjscie = grupa.licz(poziomy, nastawy)
+            for rura, u in zip(grupa.rury, wyjscie.tolist()):
+                rura.otwarcie = u
+            # terminy pominięte przez długi krok przepadają
+            while termin <= czas + 1e-9:
+                termin += grupa.okres
+            heapq.heapreplace(kolejka, (termin, priorytet, nr, grupa))
+        self._zmienione = True
+
+    def kroki_do_petli(self, dt):
+        if self._kolejka is None:
+            self.kompiluj()
+        # krok zaraz po zmianie otwarć trzeba policzyć wprost, bo przeskok
+        # ekstrapoluje przepływy z ostatniego liczonego kroku
+        if self._zmienione:
+            self._zmienione = False
+            return 0
+        if not self._kolejka:
+            return math.inf
+        return max(0, math.floor((self._kolejka[0][0] - self.instalacja.czas) / dt) - 2)
+
+    def kroki_do_terminu(self, dt):
+        # kroki, po których krok() na pewno nic nie zrobi: czas zostaje przed
+        # terminem o więcej niż tolerancja krok() i setna kroku na błąd
+        # sumowania czasu; terminy liczy dopiero kompiluj() w krok()
+        if self._kolejka is None:
+            return 0
+        if not self._kolejka:
+            return math.inf
+        return max(0, math.ceil((self._kolejka[0][0] - 1e-9 - self.instalacja.czas) / dt - 0.01) - 1)
+
+    def zapisz_stan(self):
+        # terminy i stan wewnętrzny grup w kolejności dodania, jako float64
+        if self._kolejka is None:
+            self.kompiluj()
+        terminy = {nr: termin for termin, _, nr, _ in self._kolejka}
+        czesci = [np.array([terminy[nr] for nr in range(len(self._grupy))])]
+        for grupa in self._grupy.values():
+            czesci += grupa.stan()
+        return np.concatenate(czesci).astype("<f8").tobytes()
+
+    def wczytaj_stan(self, dane):
+        self.kompiluj()
+        wartosci = np.frombuffer(dane, dtype="<f8")
+        grupy = list(self._grupy.values())
+        oczekiwane = len(grupy) + sum(len(a) for g in grupy for a in g.stan())
+        if len(wartosci) != oczekiwane:
+            raise ValueError("Stan sterowania innego układu pętli")
+        self._kolejka = [(float(wartosci[nr]), g.priorytet, nr, g) for nr, g in enumerate(grupy)]
+        heapq.heapify(self._kolejka)
+        i = len(grupy)
+        for g in grupy:
+            for tablica in g.stan():
+                tablica[:] = wartosci[i:i + len(tablica)]
+                i += len(tablica)
+        self._zmienione = True
+
+
+class SterowanieWsadowe:
+    # Pętle Sterowania liczone dla wszystkich instancji SilnikWsadowy naraz:
+    # te same grupy i terminy, stan grup o kształcie (instancje, pętle),
+    # wyjścia trafiają do kolumn wsad.otwarcie.
+    def __init__(self, wsad, sterowanie):
+        instalacja = sterowanie.instalacja
+        indeks = {id(z): i for i, z in enumerate(instalacja.zbiorniki)}
+        indeks_rury = {id(r): k for k, r in enumerate(instalacja.rury)}
+        self.wsad = wsad
+        self._grupy = []
+        for wzor in sterowanie._grupy.values():
+            grupa = _Grupa(wzor.typ, wzor.okres, wzor.priorytet)
+            grupa.zbiorniki = wzor.zbiorniki
+            grupa.rury = wzor.rury
+            grupa.parametry = wzor.parametry
+            grupa.kompiluj(indeks)
+            grupa.powiel(wsad.liczba_instancji)
+            grupa.kolumny = np.array([indeks_rury[id(r)] for r in wzor.rury], dtype=np.intp)
+            self._grupy.append(grupa)
+        self._kolejka = [(wsad.czas, g.priorytet, nr, g) for nr, g in enumerate(self._grupy)]
+        heapq.heapify(self._kolejka)
+
+    def krok(self):
+        kolejka = self._kolejka
+        czas = self.wsad.czas
+        if not kolejka or kolejka[0][0] > czas + 1e-9:
+            return
+
+        poziomy = self.wsad.aktualna_ilosc / self.wsad.pojemnosc * 100.0
+        nastawy = self.wsad.nastawa_poziomu
+        while kolejka and kolejka[0][0] <= czas + 1e-9:
+            termin, priorytet, nr, grupa = kolejka[0]
+            self.wsad.otwarcie[:, grupa.kolumny] = grupa.licz(poziomy[:, grupa.indeksy],
+                                                              nastawy[:, grupa.indeksy])
+            while termin <= czas + 1e-9:
+                termin += grupa.okres
+            heapq.heapreplace(kolejka, (termin, priorytet, nr, grupa))
+
+    def wczytaj_stan(self, dane):
+        # stan z Sterowanie.zapisz_stan() jednej instalacji, powielony na
+        # wszystkie instancje
+        wartosci = np.frombuffer(dane, dtype="<f8")
+        grupy = self._grupy
+        oczekiwane = len(grupy) + sum(a.shape[-1] for g in grupy for a in g.stan())
+        if len(wartosci) != oczekiwane:
+            raise ValueError("Stan sterowania innego układu pętli")
+        self._kolejka = [(float(wartosci[nr]), g.priorytet, nr, g) for nr, g in enumerate(grupy)]
+        heapq.heapify(self._kolejka)
+        i = len(grupy)
+        for g in grupy:
+            for tablica in g.stan():
+                k = tablica.shape[-1]
+                tablica[:] = wartosci[i:i + k]
+                i += k
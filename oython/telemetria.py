@@ -0,0 +1,160 @@
+import argparse
+import math
+import struct
+import sys
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+from watek_symulacji import Migawka
+
+# Układ segmentu pamięci współdzielonej (little-endian):
+#   nagłówek    ZNACZNIK, wersja, liczba zbiorników nz, liczba rur nr
+#   sekwencja   uint64, nieparzysta w trakcie zapisu
+#   czas        float64
+#   licznik     int64, numer kroku
+#   poziomy     nz x float64, 0..1
+#   nastawy     nz x float64 w %, NaN = brak
+#   przeplywy   nr x uint8
+ZNACZNIK = b"TELEMETR"
+WERSJA = 1
+FORMAT_NAGLOWKA = "<8sIII4x"
+_naglowek = struct.Struct(FORMAT_NAGLOWKA)
+_sekwencja = struct.Struct("<Q")
+POZYCJA_SEKWENCJI = _naglowek.size
+POZYCJA_DANYCH = POZYCJA_SEKWENCJI + _sekwencja.size
+
+
+def format_danych(nz, nr):
+    # czas, licznik, poziomy, nastawy, przeplywy
+    return struct.Struct(f"<dq{nz}d{nz}d{nr}B")
+
+
+def rozmiar(nz, nr):
+    return POZYCJA_DANYCH + format_danych(nz, nr).size
+
+
+# segmenty utworzone w tym procesie; ich rejestracji w resource_tracker
+# czytelnik nie może zdjąć
+_wlasne = set()
+
+
+class Telemetria:
+    # Publikuje stan instalacji po kroku do segmentu pamięci współdzielonej.
+    # Jeden pisarz (wątek symulacji), dowolnie wielu czytelników w innych
+    # procesach: sekwencja jest nieparzysta w trakcie zapisu, a czytelnik
+    # powtarza odczyt, jeśli przed i po kopii nie była ta sama i parzysta.
+    def __init__(self, instalacja, nazwa=None, co_ile_krokow=1):
+        self.instalacja = instalacja
+        self.co_ile_krokow = co_ile_krokow
+        nz, nr = len(instalacja.zbiorniki), len(instalacja.rury)
+        self.pamiec = shared_memory.SharedMemory(name=nazwa, create=True, size=rozmiar(nz, nr))
+        self.nazwa = self.pamiec.name
+        _wlasne.add(self.nazwa)
+        _naglowek.pack_into(self.pamiec.buf, 0, ZNACZNIK, WERSJA, nz, nr)
+        self._dane = format_danych(nz, nr)
+        self.sekwencja = 0
+        self.publikuj()
+
+    def podlacz(self):
+        self.instalacja.po_kroku.append(self._po_kroku)
+        self.instalacja.terminy_po_kroku[self._po_kroku] = self.kroki_do_publikacji
+
+    def kroki_do_publikacji(self, dt):
+        return self.co_ile_krokow - 1 - self.instalacja.licznik_krokow % self.co_ile_krokow
+
+    def _po_kroku(self):
+        if self.instalacja.licznik_krokow % self.co_ile_krokow == 0:
+            self.publikuj()
+
+    def publikuj(self):
+        s = self.instalacja
+        # wartości liczone przed otwarciem zapisu, żeby okno nieparzystej
+        # sekwencji było jak najkrótsze
+        wartosci = [z.poziom for z in s.zbiorniki]
+        wartosci += [math.nan if z.nastawa_poziomu is None else z.nastawa_poziomu for z in s.zbiorniki]
+        wartosci += [r.czy_plynie for r in s.rury]
+        bufor = self.pamiec.buf
+        self.sekwencja += 1
+        _sekwencja.pack_into(bufor, POZYCJA_SEKWENCJI, self.sekwencja)
+        self._dane.pack_into(bufor, POZYCJA_DANYCH, s.czas, s.licznik_krokow, *wartosci)
+        self.sekwencja += 1
+        _sekwencja.pack_into(bufor, POZYCJA_SEKWENCJI, self.sekwencja)
+
+    def zamknij(self):
+        if self.instalacja is not None:
+            if self._po_kroku in self.instalacja.po_kroku:
+                self.instalacja.po_kroku.remove(self._po_kroku)
+            self.instalacja.terminy_po_kroku.pop(self._po_kroku, None)
+            self.instalacja = None
+            self.pamiec.close()
+            self.pamiec.unlink()
+            _wlasne.discard(self.nazwa)
+
+
+class CzytnikTelemetrii:
+    # Czytelnik segmentu Telemetria w dowolnym procesie. Nie usuwa segmentu
+    # przy zamknięciu, to należy do pisarza.
+    def __init__(self, nazwa):
+        self.pamiec = shared_memory.SharedMemory(name=nazwa)
+        # resource_tracker czytelnika usunąłby segment przy wyjściu procesu
+        if self.pamiec.name not in _wlasne:
+            resource_tracker.unregister(self.pamiec._name, "shared_memory")
+        znacznik, wersja, nz, nr = _naglowek.unpack_from(self.pamiec.buf, 0)
+        if znacznik != ZNACZNIK or wersja != WERSJA:
+            self.pamiec.close()
+            raise ValueError(f"Segment {nazwa} nie jest telemetrią w wersji {WERSJA}")
+        self.liczba_zbiornikow = nz
+        self.liczba_rur = nr
+        self.sekwencja = None
+        self._dane = format_danych(nz, nr)
+
+    def czytaj(self, limit_czasu=1.0):
+        # spójna migawka; self.sekwencja pozwala pominąć niezmienione dane
+        bufor = self.pamiec.buf
+        koniec = None
+        while True:
+            przed, = _sekwencja.unpack_from(bufor, POZYCJA_SEKWENCJI)
+            if przed % 2 == 0:
+                wartosci = self._dane.unpack_from(bufor, POZYCJA_DANYCH)
+                if _sekwencja.unpack_from(bufor, POZYCJA_SEKWENCJI)[0] == przed:
+                    self.sekwencja = przed
+                    nz = self.liczba_zbiornikow
+                    return Migawka(wartosci[0], wartosci[1], wartosci[2:2 + nz],
+                                   tuple(bool(p) for p in wartosci[2 + 2 * nz:]),
+                                   tuple(None if n != n else n for n in wartosci[2 + nz:2 + 2 * nz]))
+            if koniec is None:
+                koniec = time.monotonic() + limit_czasu
+            elif time.monotonic() > koniec:
+                raise TimeoutError("Pisarz telemetrii nie kończy zapisu")
+            time.sleep(0)
+
+    def zamknij(self):
+        self.pamiec.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Podgląd telemetrii instalacji z pamięci współdzielonej.")
+    parser.add_argument("nazwa", help="nazwa segmentu (Telemetria.nazwa)")
+    parser.add_argument("--okres", type=float, default=0.5, help="sekundy między odczytami")
+    parser.add_argument("--liczba", type=int, default=0, help="liczba odczytów, 0 = bez końca")
+    args = parser.parse_args(argv)
+
+    czytnik = CzytnikTelemetrii(args.nazwa)
+    try:
+        i = 0
+        while args.liczba == 0 or i < args.liczba:
+            m = czytnik.czytaj()
+            poziomy = " ".join(f"{p * 100:6.2f}" for p in m.poziomy)
+            przeplywy = "".join("1" if p else "0" for p in m.przeplywy)
+            print(f"{m.czas:10.3f} s  krok {m.licznik_krokow}  poziomy % {poziomy}  rury {przeplywy}")
+            sys.stdout.flush()
+            i += 1
+            time.sleep(args.okres)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        czytnik.zamknij()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# moduły programu leżą płasko w katalogu oython
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,70 @@
+from alarmy import HH, Alarmy
+from silnik import Instalacja
+from zbiornik import Zbiornik
+
+
+def _instalacja():
+    # zbiornik z alarmem HH na dopływie; blokada zamyka dopływ
+    s = Instalacja()
+    zrodlo = s.dodaj_zbiornik(Zbiornik(0, 0, 60, 100, nazwa="Z1"))
+    zbiornik = s.dodaj_zbiornik(Zbiornik(100, 0, 60, 100, nazwa="Z2"))
+    rura = s.polacz(zrodlo, zbiornik)
+    alarmy = Alarmy(s, okres=0.1)
+    punkt = alarmy.dodaj(zbiornik, HH, 80.0, histereza=5.0, opoznienie=0.5)
+    alarmy.dodaj_blokade(rura, punkt)
+    alarmy.podlacz()
+    return s, zbiornik, rura, alarmy
+
+
+def _ustaw(zbiornik, poziom):
+    zbiornik.aktualna_ilosc = zbiornik.pojemnosc * poziom / 100.0
+    zbiornik.aktualizuj_poziom()
+
+
+def test_opoznienie_zalaczenia():
+    s, z, rura, alarmy = _instalacja()
+    _ustaw(z, 85.0)
+    s.run(until=0.3)
+    # krótsze przekroczenie niż opóźnienie nie daje alarmu i zeruje odliczanie
+    _ustaw(z, 79.0)
+    s.run(until=0.5)
+    _ustaw(z, 85.0)
+    s.run(until=0.9)
+    assert alarmy.liczba_zdarzen == 0
+    s.run(until=1.2)
+    assert alarmy.aktywne_punkty() == ["Z2 HH"]
+    zdarzenie, = alarmy.ostatnie()
+    # oceny co 0.1 s od pierwszego kroku (0.02, 0.12, ...): warunek od
+    # oceny w 0.52 s, wejście przy ocenie 0.5 s później
+    assert abs(zdarzenie.czas - 1.02) < 1e-9
+    assert zdarzenie.aktywny and zdarzenie.wartosc == 85.0
+
+
+def test_histereza_i_blokada():
+    s, z, rura, alarmy = _instalacja()
+    zrodlo = rura.zrodlo
+    _ustaw(z, 90.0)
+    s.run(until=1.0)
+    assert alarmy.aktywne_punkty() == ["Z2 HH"]
+    assert rura.blokada
+
+    # zablokowana rura nie płynie mimo pełnego źródła
+    s.napelnij(zrodlo)
+    s.run(until=1.5)
+    assert not rura.czy_plynie
+    assert zrodlo.aktualna_ilosc == zrodlo.pojemnosc
+
+    # w strefie martwej (powyżej 80 - 5) alarm trwa
+    _ustaw(z, 76.0)
+    s.run(until=2.0)
+    assert alarmy.aktywne_punkty() == ["Z2 HH"]
+    assert rura.blokada
+
+    # powrót bez opóźnienia zdejmuje blokadę i rura znów płynie
+    _ustaw(z, 74.0)
+    s.run(until=2.2)
+    assert alarmy.aktywne_punkty() == []
+    assert not rura.blokada
+    assert [e.aktywny for e in alarmy.ostatnie()] == [True, False]
+    s.run(until=2.3)
+    assert rura.czy_plynie
@@ -0,0 +1,39 @@
+import numpy as np
+
+from decymacja import PiramidaMinMax
+
+
+def _dane(n, serie=3, ziarno=1):
+    wartosci = np.random.default_rng(ziarno).normal(size=(n, serie)).astype(np.float32)
+    return np.arange(n, dtype=np.float64), wartosci
+
+
+def test_obwiednia_kolumn_dokladna():
+    # 32768 próbek na 64 kolumny: bloki piramidy mieszczą się w kolumnach
+    czas, wartosci = _dane(8 ** 5)
+    piramida = PiramidaMinMax(3)
+    # dopisywanie kawałkami jak z wątku historii
+    for i in range(0, len(czas), 1000):
+        piramida.dodaj(czas[i:i + 1000], wartosci[i:i + 1000])
+
+    wynik_min, wynik_max = piramida.zapytanie(0.0, float(len(czas)), 64)
+    kolumny = wartosci.reshape(64, -1, 3)
+    assert np.array_equal(wynik_min, kolumny.min(axis=1))
+    assert np.array_equal(wynik_max, kolumny.max(axis=1))
+
+    # przybliżenie do pojedynczych próbek
+    wynik_min, wynik_max = piramida.zapytanie(100.0, 164.0, 64)
+    assert np.array_equal(wynik_min, wartosci[100:164])
+    assert np.array_equal(wynik_max, wartosci[100:164])
+
+
+def test_obwiednia_po_usunieciu_starych_probek():
+    czas, wartosci = _dane(50000, ziarno=2)
+    piramida = PiramidaMinMax(3, pojemnosc_poziomu=256)
+    piramida.dodaj(czas, wartosci)
+    assert len(piramida) == len(czas)
+
+    # pełne próbki zostają tylko dla końca, ale skrajne wartości całości nie giną
+    wynik_min, wynik_max = piramida.zapytanie(0.0, float(len(czas)), 10)
+    assert np.array_equal(np.nanmin(wynik_min, axis=0), wartosci.min(axis=0))
+    assert np.array_equal(np.nanmax(wynik_max, axis=0), wartosci.max(axis=0))
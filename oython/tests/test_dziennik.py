@@ -0,0 +1,59 @@
+from dziennik import DziennikOperatora, OdtwarzanieDziennika
+from silnik import SilnikKaskady
+from stan import wczytaj_stan, zapisz_stan
+
+DT = 0.001
+
+
+def _stan(instalacja):
+    return (instalacja.czas, instalacja.licznik_krokow,
+            [z.aktualna_ilosc for z in instalacja.zbiorniki],
+            [z.nastawa_poziomu for z in instalacja.zbiorniki],
+            [r.otwarcie for r in instalacja.rury],
+            [r.czy_plynie for r in instalacja.rury])
+
+
+def _wykonaj(s, dziennik, polecenie, *argumenty):
+    # jak WatekSymulacji._wykonaj: najpierw wpis, potem polecenie
+    dziennik.zapisz(polecenie, argumenty)
+    if polecenie == "napelnij":
+        s.napelnij(s.zbiorniki[argumenty[0]])
+    elif polecenie == "oproznij":
+        s.oproznij(s.zbiorniki[argumenty[0]])
+    elif polecenie == "nastawa":
+        s.ustaw_nastawe(s.zbiorniki[argumenty[0]], argumenty[1])
+    elif polecenie == "wczytaj_stan":
+        wczytaj_stan(s, argumenty[0])
+
+
+def test_odtworzenie_dziennika_bit_w_bit(tmp_path):
+    plik = tmp_path / "dziennik.bin"
+    s = SilnikKaskady(regulator_pid=True)
+    dziennik = DziennikOperatora(s, DT, str(plik), co_ile_krokow=5000)
+    dziennik.podlacz()
+
+    stany = {}
+    s.run(max_steps=3000, dt=DT)
+    _wykonaj(s, dziennik, "napelnij", 0)
+    s.run(max_steps=4000, dt=DT)
+    _wykonaj(s, dziennik, "nastawa", 3, 40.0)
+    s.run(max_steps=2500, dt=DT)
+    stany[s.licznik_krokow] = _stan(s)
+    _wykonaj(s, dziennik, "nastawa", 3, None)
+    s.run(max_steps=6000, dt=DT)
+    stany[s.licznik_krokow] = _stan(s)
+    migawka = zapisz_stan(s)
+    _wykonaj(s, dziennik, "oproznij", 1)
+    s.run(max_steps=3000, dt=DT)
+    # powrót do migawki cofa licznik kroków; dalej nowy odcinek dziennika
+    _wykonaj(s, dziennik, "wczytaj_stan", migawka)
+    _wykonaj(s, dziennik, "nastawa", 3, 70.0)
+    s.run(max_steps=8000, dt=DT)
+    koniec = _stan(s)
+    dziennik.zamknij()
+
+    odtwarzanie = OdtwarzanieDziennika(str(plik))
+    assert odtwarzanie.ze_sterowaniem()
+    for krok, stan in stany.items():
+        assert _stan(odtwarzanie.odtworz(SilnikKaskady(regulator_pid=True), krok)) == stan
+    assert _stan(odtwarzanie.odtworz(SilnikKaskady(regulator_pid=True))) == koniec
@@ -0,0 +1,39 @@
+import math
+
+from fizyka import ModelFizyczny
+from silnik import Instalacja, SilnikKaskady
+from zbiornik import Zbiornik
+
+
+def _suma(instalacja):
+    return math.fsum(z.aktualna_ilosc for z in instalacja.zbiorniki)
+
+
+def test_kaskada_zachowuje_mase():
+    s = SilnikKaskady()
+    s.z4.nastawa_poziomu = 70.0
+    s.fizyka = ModelFizyczny()
+    przed = _suma(s)
+    for _ in range(24):
+        s.step(600.0)
+        assert all(0.0 <= z.aktualna_ilosc <= z.pojemnosc for z in s.zbiorniki)
+    assert math.isclose(_suma(s), przed, rel_tol=1e-12)
+    # ciecz naprawdę przeszła przez kaskadę
+    assert s.z4.aktualna_ilosc > 0.0
+    assert s.fizyka.kroki > 0
+
+
+def test_obieg_z_pompa_zachowuje_mase():
+    # Z0 -> Z1 -> Z2 grawitacyjnie, pompa zawraca ciecz z Z2 do Z0
+    s = Instalacja()
+    z0, z1, z2 = (s.dodaj_zbiornik(Zbiornik(100 * i, 0, 60, 100, nazwa=f"Z{i}")) for i in range(3))
+    s.polacz(z0, z1)
+    s.polacz(z1, z2)
+    s.polacz(z2, z0, krzywa_pompy=(5.0, 1.5))
+    s.napelnij(z0)
+    s.fizyka = ModelFizyczny()
+    przed = _suma(s)
+    s.step(600.0)
+    assert all(0.0 <= z.aktualna_ilosc <= z.pojemnosc for z in s.zbiorniki)
+    assert math.isclose(_suma(s), przed, rel_tol=1e-12)
+    assert s.rury[2].czy_plynie
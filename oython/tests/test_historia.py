@@ -0,0 +1,66 @@
+import numpy as np
+
+from historia import ArchiwumHistorii, Historian
+from silnik import SilnikKaskady
+from stan import wczytaj_stan, zapisz_stan
+
+
+def _z_historia(pojemnosc_bufora=100, plik=None, okres=None):
+    s = SilnikKaskady()
+    h = Historian(s, pojemnosc_bufora=pojemnosc_bufora, plik=plik, okres=okres)
+    h.podlacz()
+    return s, h
+
+
+def test_pierscien_po_zawinieciu():
+    s, h = _z_historia(pojemnosc_bufora=100)
+    s.run(max_steps=250)
+    assert h.licznik == 250
+    ostatnie = h.ostatnie()
+    assert list(ostatnie["licznik_krokow"]) == list(range(151, 251))
+    assert ostatnie["ilosci"][-1].tolist() == [z.aktualna_ilosc for z in s.zbiorniki]
+    # nadpisane próbki nie wracają
+    assert list(h.probki(0, 160)["licznik_krokow"]) == list(range(151, 161))
+    assert list(h.ostatnie(3)["licznik_krokow"]) == [248, 249, 250]
+
+
+def test_okres_probkowania():
+    s, h = _z_historia(okres=0.02)
+    s.run(max_steps=200, dt=0.001)
+    # próbka w pierwszym kroku i co 20 kroków po 1 ms
+    assert list(h.ostatnie()["licznik_krokow"]) == list(range(1, 201, 20))
+
+
+def test_odczyt_archiwum(tmp_path):
+    plik = str(tmp_path / "historia.bin")
+    s, h = _z_historia(pojemnosc_bufora=64, plik=plik)
+    wszystkie = []
+    for _ in range(300):
+        s.step()
+        wszystkie.append((s.licznik_krokow, s.czas, [z.aktualna_ilosc for z in s.zbiorniki]))
+    h.zamknij()
+
+    archiwum = ArchiwumHistorii(plik)
+    assert len(archiwum) == 300
+    assert archiwum.rekordy["licznik_krokow"].tolist() == [w[0] for w in wszystkie]
+    assert archiwum.rekordy["czas"].tolist() == [w[1] for w in wszystkie]
+    assert archiwum.rekordy["ilosci"].tolist() == [w[2] for w in wszystkie]
+    assert np.isnan(archiwum.rekordy["nastawy"][:, 0]).all()
+    zakres = archiwum.zakres(1.0, 2.0)
+    assert zakres["czas"][0] >= 1.0 - 1e-9 and zakres["czas"][-1] < 2.0
+    assert len(zakres) == 50
+
+
+def test_archiwum_kolejnych_sesji_ma_rosnacy_czas(tmp_path):
+    plik = str(tmp_path / "historia.bin")
+    for _ in range(2):
+        s, h = _z_historia(pojemnosc_bufora=64, plik=plik)
+        s.run(max_steps=100)
+        migawka = zapisz_stan(s)
+        s.run(max_steps=50)
+        wczytaj_stan(s, migawka)
+        s.run(max_steps=30)
+        h.zamknij()
+    czas = ArchiwumHistorii(plik).rekordy["czas"]
+    assert len(czas) == 2 * 180
+    assert (np.diff(czas) >= 0).all()
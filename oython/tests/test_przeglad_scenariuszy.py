@@ -0,0 +1,26 @@
+import math
+
+from przeglad_scenariuszy import licz_scenariusz
+from silnik import KROK_CZASU, SilnikKaskady
+
+
+def _czas_napelnienia(wynik):
+    # nr, flow_speed, nastawa, prog, 4 ilości startowe, czas napełnienia
+    return wynik[8]
+
+
+def test_czas_napelnienia_jak_krok_po_kroku():
+    s = SilnikKaskady(0.8)
+    s.z4.nastawa_poziomu = 60.0
+    limit = s.z4.pojemnosc * 0.6
+    while s.z4.aktualna_ilosc < limit:
+        s.step()
+    wynik = licz_scenariusz(0, 0.8, 60.0, 5.0, [z.aktualna_ilosc for z in SilnikKaskady(0.8).zbiorniki], 30.0)
+    assert _czas_napelnienia(wynik) == s.licznik_krokow * KROK_CZASU
+
+
+def test_z4_pelna_na_starcie():
+    wynik = licz_scenariusz(0, 0.8, 60.0, 5.0, (0.0, 0.0, 0.0, 80.0), 5.0)
+    assert _czas_napelnienia(wynik) == 0.0
+    wynik = licz_scenariusz(0, 0.8, 60.0, 5.0, (0.0, 0.0, 0.0, 10.0), 5.0)
+    assert math.isnan(_czas_napelnienia(wynik))
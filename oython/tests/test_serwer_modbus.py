@@ -0,0 +1,86 @@
+import asyncio
+import time
+
+import pytest
+
+from serwer_modbus import BRAK_NASTAWY, KlientModbus, SerwerModbus
+from silnik import SilnikKaskady
+from watek_symulacji import WatekSymulacji
+
+
+@pytest.fixture
+def serwer():
+    # kaskada bez regulatora: rura Z3->Z4 odcina na nastawie Z4
+    watek = WatekSymulacji(SilnikKaskady(), okres=0.001)
+    watek.start()
+    watek.wznow()
+    serwer = SerwerModbus(watek, port=0)
+    serwer.start_w_tle()
+    yield serwer
+    serwer.zatrzymaj()
+    watek.zakoncz()
+
+
+def _czekaj_na_krok(watek, krok):
+    koniec = time.monotonic() + 5.0
+    while watek.migawka.licznik_krokow <= krok:
+        assert time.monotonic() < koniec, "wątek symulacji stoi"
+        time.sleep(0.01)
+
+
+def test_zapis_braku_nastawy(serwer):
+    watek = serwer.watek
+
+    async def zapisz():
+        klient = await KlientModbus(port=serwer.port).polacz()
+        try:
+            await klient.zapisz_rejestr(2 * 3 + 1, BRAK_NASTAWY)
+        finally:
+            await klient.zamknij()
+
+    asyncio.run(zapisz())
+    _czekaj_na_krok(watek, watek.migawka.licznik_krokow + 50)
+
+    async def czytaj():
+        klient = await KlientModbus(port=serwer.port).polacz()
+        try:
+            return await klient.poziomy(4)
+        finally:
+            await klient.zamknij()
+
+    assert watek.is_alive()
+    assert watek.blad is None
+    assert asyncio.run(czytaj())[3][1] is None
+    assert not watek.migawka.przeplywy[2]
+
+
+def test_blad_modelu_zglaszany_klientom(serwer):
+    watek = serwer.watek
+
+    def awaria():
+        raise RuntimeError("awaria modelu")
+
+    watek.silnik.po_kroku.append(awaria)
+    koniec = time.monotonic() + 5.0
+    while watek.blad is None:
+        assert time.monotonic() < koniec
+        time.sleep(0.01)
+    assert watek.is_alive()
+
+    async def czytaj():
+        klient = await KlientModbus(port=serwer.port).polacz()
+        try:
+            return await klient.poziomy(4)
+        finally:
+            await klient.zamknij()
+
+    with pytest.raises(IOError, match="Wyjątek Modbus 4"):
+        asyncio.run(czytaj())
+
+    # po usunięciu przyczyny wznow() kasuje błąd i symulacja idzie dalej
+    watek.silnik.po_kroku.remove(awaria)
+    krok = watek.migawka.licznik_krokow
+    watek.wznow()
+    _czekaj_na_krok(watek, krok)
+    assert watek.blad is None
+    asyncio.run(czytaj())
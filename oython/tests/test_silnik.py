@@ -0,0 +1,50 @@
+from silnik import SilnikKaskady, instalacja_testowa
+
+
+def _stan(instalacja):
+    return (instalacja.czas, instalacja.licznik_krokow,
+            [z.aktualna_ilosc for z in instalacja.zbiorniki],
+            [r.czy_plynie for r in instalacja.rury])
+
+
+def _porownaj(zbuduj, odcinki, dt=0.001):
+    # te same odcinki pracy krok po kroku i zdarzeniowo, z akcjami operatora
+    # między odcinkami
+    krokowo = zbuduj()
+    zdarzeniowo = zbuduj()
+    for liczba_krokow, akcja in odcinki:
+        krokowo.run(max_steps=liczba_krokow, dt=dt)
+        zdarzeniowo.run_zdarzeniowo(max_steps=liczba_krokow, dt=dt)
+        assert _stan(zdarzeniowo) == _stan(krokowo)
+        if akcja is not None:
+            akcja(krokowo)
+            akcja(zdarzeniowo)
+
+
+def test_kaskada_zdarzeniowo_jak_krokowo():
+    def nastawa(s):
+        s.ustaw_nastawe(s.z4, 35.0)
+
+    _porownaj(SilnikKaskady, [(20000, lambda s: s.napelnij(s.z1)), (50000, nastawa), (130000, None)])
+
+
+def test_kaskada_z_regulatorem_pid_zdarzeniowo_jak_krokowo():
+    def zmiana(s):
+        s.napelnij(s.z1)
+        s.ustaw_nastawe(s.z4, 40.0)
+
+    _porownaj(lambda: SilnikKaskady(regulator_pid=True), [(7000, zmiana), (20000, None)])
+
+
+def test_instalacja_testowa_zdarzeniowo_jak_krokowo():
+    def oproznij(s):
+        s.oproznij(s.zbiorniki[3])
+
+    _porownaj(lambda: instalacja_testowa(64, 8), [(30000, oproznij), (40000, None)], dt=0.02)
+
+
+def test_brak_nastawy_zamyka_regule():
+    def brak(s):
+        s.ustaw_nastawe(s.z4, None)
+
+    _porownaj(SilnikKaskady, [(5000, brak), (40000, None)])
@@ -0,0 +1,82 @@
+from alarmy import HH, Alarmy
+from historia import Historian
+from silnik import SilnikKaskady, instalacja_testowa
+from silnik_rownolegly import SilnikRownolegly
+
+
+def _stan(instalacja):
+    return (instalacja.czas, instalacja.licznik_krokow,
+            [z.aktualna_ilosc for z in instalacja.zbiorniki],
+            [r.czy_plynie for r in instalacja.rury],
+            [r.otwarcie for r in instalacja.rury])
+
+
+def _porownaj(zbuduj, odcinki, liczba_procesow, czesci=None):
+    jeden = zbuduj()
+    wiele = zbuduj()
+    silnik = SilnikRownolegly(wiele, liczba_procesow, czesci).podlacz()
+    try:
+        for liczba_krokow, akcja in odcinki:
+            jeden.run(max_steps=liczba_krokow)
+            wiele.run(max_steps=liczba_krokow)
+            assert _stan(wiele) == _stan(jeden)
+            if akcja is not None:
+                akcja(jeden)
+                akcja(wiele)
+        # części naprawdę wymieniały stan przez pamięć współdzieloną
+        assert silnik.liczba_przekazan > 0
+    finally:
+        silnik.zamknij()
+    assert silnik.pamiec is None
+    return jeden, wiele, silnik
+
+
+def test_podzial_instalacji_bit_w_bit():
+    def zmiana(s):
+        s.napelnij(s.zbiorniki[0])
+        s.oproznij(s.zbiorniki[40])
+        s.rury[10].blokada = True
+        s.rury[25].otwarcie = 0.4
+
+    _porownaj(lambda: instalacja_testowa(120, 12), [(300, zmiana), (700, None)], 3)
+
+
+def test_kaskada_z_regulatorem_w_czesciach_bit_w_bit():
+    def nastawa(s):
+        s.ustaw_nastawe(s.z4, 35.0)
+
+    _, _, silnik = _porownaj(lambda: SilnikKaskady(regulator_pid=True), [(1500, nastawa), (1500, None)], 2,
+                             czesci=[0, 0, 1, 1])
+    # regulator podaje termin następnej pętli, więc kroki idą paczkami
+    assert silnik.liczba_paczek < 3000 / 2
+
+
+def test_paczki_do_terminow_funkcji_po_kroku():
+    def zbuduj():
+        s = SilnikKaskady(regulator_pid=True)
+        s.historian = Historian(s, okres=0.1)
+        s.historian.podlacz()
+        # blokada rury Z2->Z3 zmienia przepływ między paczkami
+        s.alarmy = Alarmy(s, okres=0.25)
+        s.alarmy.dodaj_blokade(s.rura2, s.alarmy.dodaj(s.z3, HH, 30.0, opoznienie=0.5))
+        s.alarmy.podlacz()
+        return s
+
+    def nastawa(s):
+        s.ustaw_nastawe(s.z4, 60.0)
+
+    jeden, wiele, silnik = _porownaj(zbuduj, [(400, nastawa), (600, None)], 2, czesci=[0, 0, 1, 1])
+    assert silnik.liczba_paczek < 1000 / 2
+    assert wiele.alarmy.ostatnie() == jeden.alarmy.ostatnie()
+    assert wiele.alarmy.liczba_zdarzen > 0
+    # próbki z nastawą NaN: porównanie bajtów
+    assert wiele.historian.probki(0, 1000).tobytes() == jeden.historian.probki(0, 1000).tobytes()
+
+    # funkcja bez terminu może zmienić stan po każdym kroku
+    wiele.po_kroku.append(lambda: None)
+    silnik = SilnikRownolegly(wiele, 2, czesci=[0, 0, 1, 1]).podlacz()
+    try:
+        wiele.run(max_steps=50)
+    finally:
+        silnik.zamknij()
+    assert silnik.liczba_paczek == 50
@@ -0,0 +1,40 @@
+import numpy as np
+
+from silnik import SilnikKaskady, instalacja_testowa
+from silnik_wsadowy import SilnikWsadowy
+
+
+def _ilosci(instalacja):
+    return np.array([z.aktualna_ilosc for z in instalacja.zbiorniki])
+
+
+def test_instancje_jak_silnik_kaskady():
+    # każda instancja z inną nastawą Z4 i ilością w Z1
+    nastawy = [20.0, 60.0, 95.0]
+    ilosci_z1 = [100.0, 37.5, 80.0]
+    wsad = SilnikWsadowy(len(nastawy))
+    wsad.nastawa_poziomu[:, 3] = nastawy
+    wsad.aktualna_ilosc[:, 0] = ilosci_z1
+
+    for i, (nastawa, ilosc) in enumerate(zip(nastawy, ilosci_z1)):
+        s = SilnikKaskady()
+        s.z4.nastawa_poziomu = nastawa
+        s.z1.aktualna_ilosc = ilosc
+        s.run(max_steps=4000)
+        if i == 0:
+            wsad.run(max_steps=4000)
+        assert np.array_equal(wsad.aktualna_ilosc[i], _ilosci(s))
+        assert np.array_equal(wsad.czy_plynie[i], [r.czy_plynie for r in s.rury])
+
+
+def test_dowolna_instalacja_jako_wzor():
+    s = instalacja_testowa(64, 8)
+    s.rury[5].otwarcie = 0.3
+    s.rury[9].blokada = True
+    wsad = SilnikWsadowy(2, wzor=s)
+
+    s.run(max_steps=3000)
+    wsad.run(max_steps=3000)
+    for i in range(2):
+        assert np.array_equal(wsad.aktualna_ilosc[i], _ilosci(s))
+        assert np.array_equal(wsad.czy_plynie[i], [r.czy_plynie for r in s.rury])
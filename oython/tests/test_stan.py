@@ -0,0 +1,59 @@
+import numpy as np
+
+from silnik import SilnikKaskady
+from stan import kopia, rozgalez, zapisz_stan
+
+
+def _ilosci(instalacja):
+    return np.array([z.aktualna_ilosc for z in instalacja.zbiorniki])
+
+
+def test_rozgalez_z_regulatorem_pid_jak_praca_na_zywo():
+    # jak w oknie: PID na rurze Z3->Z4 zamiast odcięcia na nastawie
+    s = SilnikKaskady(regulator_pid=True)
+    s.z4.nastawa_poziomu = 60.0
+    s.run(max_steps=700)
+    wsad = rozgalez(s, zapisz_stan(s), 3)
+
+    s.run(max_steps=5000)
+    wsad.run(max_steps=5000)
+    for i in range(3):
+        assert np.array_equal(wsad.aktualna_ilosc[i], _ilosci(s))
+        assert np.array_equal(wsad.otwarcie[i], [r.otwarcie for r in s.rury])
+        assert np.array_equal(wsad.czy_plynie[i], [r.czy_plynie for r in s.rury])
+
+
+def test_rozgalez_z_otwarciem_i_blokada():
+    s = SilnikKaskady()
+    s.run(max_steps=300)
+    s.rury[0].otwarcie = 0.37
+    s.rury[1].blokada = True
+    wsad = rozgalez(s, zapisz_stan(s), 2)
+
+    s.run(max_steps=3000)
+    wsad.run(max_steps=3000)
+    assert np.array_equal(wsad.aktualna_ilosc[1], _ilosci(s))
+
+
+def test_kopia_instalacji_z_regulatorem_pid():
+    s = SilnikKaskady(regulator_pid=True)
+    s.z4.nastawa_poziomu = 60.0
+    s.run(max_steps=40)
+    klon = kopia(s)
+    assert klon.regulator is not s.regulator
+    assert klon.sterowanie is klon.regulator
+
+    s.run(max_steps=6000)
+    klon.run(max_steps=6000)
+    assert np.array_equal(_ilosci(klon), _ilosci(s))
+    assert [r.otwarcie for r in klon.rury] == [r.otwarcie for r in s.rury]
+
+    assert abs(s.z4.poziom * 100 - 60.0) < 2.0
+
+    # pętle kopii działają na jej rurach, nie na oryginale
+    przed = (_ilosci(s), [r.otwarcie for r in s.rury])
+    klon.ustaw_nastawe(klon.z4, 20.0)
+    klon.run(max_steps=2000)
+    assert klon.rura3.otwarcie == 0.0
+    assert np.array_equal(_ilosci(s), przed[0])
+    assert [r.otwarcie for r in s.rury] == przed[1]
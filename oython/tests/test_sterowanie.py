@@ -0,0 +1,17 @@
+import math
+
+from silnik import SilnikKaskady
+
+
+def test_pid_wraca_po_usunieciu_nastawy():
+    s = SilnikKaskady(regulator_pid=True)
+    s.run(max_steps=3000, dt=0.001)
+    s.ustaw_nastawe(s.z4, None)
+    s.run(max_steps=2000, dt=0.001)
+    assert s.rura3.otwarcie == 0.0
+
+    s.napelnij(s.z1)
+    s.ustaw_nastawe(s.z4, 70.0)
+    s.run(max_steps=20000, dt=0.001)
+    assert not math.isnan(s.rura3.otwarcie)
+    assert abs(s.z4.poziom * 100 - 70.0) < 2.0
@@ -0,0 +1,51 @@
+import pytest
+
+from silnik import SilnikKaskady
+from telemetria import POZYCJA_SEKWENCJI, CzytnikTelemetrii, Telemetria, _sekwencja
+
+
+@pytest.fixture
+def telemetria():
+    s = SilnikKaskady()
+    t = Telemetria(s, co_ile_krokow=5)
+    t.podlacz()
+    yield s, t
+    t.zamknij()
+
+
+def test_odczyt_jak_stan_instalacji(telemetria):
+    s, t = telemetria
+    s.z4.nastawa_poziomu = None
+    s.z2.nastawa_poziomu = 42.5
+    s.run(max_steps=10)
+    czytnik = CzytnikTelemetrii(t.nazwa)
+    try:
+        m = czytnik.czytaj()
+        assert (m.czas, m.licznik_krokow) == (s.czas, 10)
+        assert m.poziomy == tuple(z.poziom for z in s.zbiorniki)
+        # brak nastawy przechodzi jako NaN i wraca jako None
+        assert m.nastawy == (None, 42.5, None, None)
+        assert m.przeplywy == tuple(r.czy_plynie for r in s.rury)
+
+        # co_ile_krokow=5: kroki 11 i 12 nie publikują
+        sekwencja = czytnik.sekwencja
+        s.run(max_steps=2)
+        assert czytnik.czytaj().licznik_krokow == 10
+        assert czytnik.sekwencja == sekwencja
+    finally:
+        czytnik.zamknij()
+
+
+def test_odczyt_czeka_na_koniec_zapisu(telemetria):
+    s, t = telemetria
+    s.run(max_steps=5)
+    czytnik = CzytnikTelemetrii(t.nazwa)
+    try:
+        # pisarz w trakcie zapisu: nieparzysta sekwencja
+        _sekwencja.pack_into(t.pamiec.buf, POZYCJA_SEKWENCJI, t.sekwencja + 1)
+        with pytest.raises(TimeoutError):
+            czytnik.czytaj(limit_czasu=0.01)
+        _sekwencja.pack_into(t.pamiec.buf, POZYCJA_SEKWENCJI, t.sekwencja)
+        assert czytnik.czytaj().licznik_krokow == 5
+    finally:
+        czytnik.zamknij()
@@ -0,0 +1,46 @@
+from silnik import instalacja_testowa
+from trasowanie import Trasowanie, _przecina
+
+
+def _sprawdz_trasy(instalacja):
+    for rura in instalacja.rury:
+        punkty = rura.punkty
+        assert punkty[0] == rura.zrodlo.punkt_wyjscia()
+        assert punkty[-1] == rura.cel.punkt_wejscia()
+        # same odcinki poziome i pionowe
+        for (xa, ya), (xb, yb) in zip(punkty, punkty[1:]):
+            assert xa == xb or ya == yb
+        # żaden odcinek nie wchodzi do wnętrza zbiornika, także własnych
+        for z in instalacja.zbiorniki:
+            assert not _przecina(punkty, (z.x, z.y, z.x + z.width, z.y + z.height))
+
+
+def test_trasy_ortogonalne_omijaja_zbiorniki():
+    s = instalacja_testowa(32, 8)
+    Trasowanie().trasuj(s)
+    _sprawdz_trasy(s)
+
+
+def test_przesun_trasuje_tylko_dotkniete_rury():
+    s = instalacja_testowa(32, 8)
+    trasowanie = Trasowanie()
+    trasowanie.trasuj(s)
+    # Z10 w lewo i w dół, na trasę rury niepołączonej z nim
+    zbiornik = s.zbiorniki[9]
+    x, y = zbiornik.x - 20, zbiornik.y + 20
+    prostokat = (x, y, x + zbiornik.width, y + zbiornik.height)
+    przed = [r.punkty for r in s.rury]
+    dotkniete = [r.zrodlo is zbiornik or r.cel is zbiornik or _przecina(r.punkty, prostokat) for r in s.rury]
+    assert any(_przecina(r.punkty, prostokat) and zbiornik not in (r.zrodlo, r.cel) for r in s.rury)
+
+    trasowanie.liczba_tras = 0
+    assert trasowanie.przesun(s, zbiornik, x, y) == sum(dotkniete)
+    assert trasowanie.liczba_tras == sum(dotkniete)
+    for rura, punkty, dotknieta in zip(s.rury, przed, dotkniete):
+        if not dotknieta:
+            assert rura.punkty is punkty
+    _sprawdz_trasy(s)
+
+    # powrót do poprzedniego układu to trasy z pamięci
+    assert trasowanie.przesun(s, zbiornik, x + 20, y - 20) == 0
+    assert [[tuple(p) for p in r.punkty] for r in s.rury] == [[tuple(p) for p in t] for t in przed]
@@ -0,0 +1,255 @@
+import hashlib
+import heapq
+import json
+import os
+from collections import OrderedDict
+
+import numpy as np
+
+# Trasowanie rur po siatce: A* po komórkach (krok siatka px) ze stanem
+# (komórka, kierunek), koszt 1 za komórkę plus kara_zakretu za każdą zmianę
+# kierunku. Zbiorniki są przeszkodami, a pas margines wokół nich kosztuje
+# kara_marginesu za komórkę, więc rury omijają zbiorniki z odstępem, ale
+# w ciasnym układzie mogą przejść tuż przy ścianie. Rura wychodzi
+# pionowo w dół z punktu wyjścia źródła i wchodzi pionowo z góry do punktu
+# wejścia celu, jak w ręcznie ułożonej kaskadzie.
+
+PRAWO, DOL, LEWO, GORA = range(4)
+_RUCHY = ((1, 0), (0, 1), (-1, 0), (0, -1))
+
+
+def klucz_ukladu(instalacja, parametry):
+    # skrót geometrii zbiorników, połączeń i parametrów trasowania
+    indeks = {id(z): i for i, z in enumerate(instalacja.zbiorniki)}
+    opis = {
+        "parametry": parametry,
+        "zbiorniki": [(z.x, z.y, z.width, z.height) for z in instalacja.zbiorniki],
+        "rury": [(indeks[id(r.zrodlo)], indeks[id(r.cel)]) for r in instalacja.rury],
+    }
+    return hashlib.sha1(json.dumps(opis).encode()).hexdigest()
+
+
+def _uprosc(punkty):
+    # bez powtórzeń i punktów w środku prostych odcinków
+    wynik = []
+    for p in punkty:
+        if wynik and p == wynik[-1]:
+            continue
+        if len(wynik) >= 2:
+            a, b = wynik[-2], wynik[-1]
+            if (a[0] == b[0] == p[0]) or (a[1] == b[1] == p[1]):
+                wynik[-1] = p
+                continue
+        wynik.append(p)
+    return wynik
+
+
+class Trasowanie:
+    def __init__(self, siatka=10, margines=8, kara_zakretu=4.0, kara_marginesu=5.0, zapas=4, plik_pamieci=None,
+                 pojemnosc_pamieci=64):
+        self.siatka = siatka
+        self.margines = margines
+        self.kara_zakretu = kara_zakretu
+        self.kara_marginesu = kara_marginesu
+        # komórki siatki poza obrysem wszystkich zbiorników, na objazdy
+        self.zapas = zapas
+        self.plik_pamieci = plik_pamieci
+        # klucz_ukladu -> lista tras w kolejności instalacja.rury; najwyżej
+        # pojemnosc_pamieci układów, najdawniej używany wypada pierwszy
+        self.pojemnosc_pamieci = pojemnosc_pamieci
+        self.pamiec = OrderedDict()
+        if plik_pamieci is not None and os.path.exists(plik_pamieci):
+            with open(plik_pamieci) as f:
+                self.pamiec.update(json.load(f))
+            self._przytnij()
+        # pamięć zmieniona od ostatniego zapisu do pliku
+        self.zmieniona = False
+        self.liczba_tras = 0
+
+    def parametry(self):
+        return [self.siatka, self.margines, self.kara_zakretu, self.kara_marginesu, self.zapas]
+
+    def trasuj(self, instalacja):
+        # trasy wszystkich rur; z pamięci, jeśli układ był już trasowany
+        klucz = klucz_ukladu(instalacja, self.parametry())
+        trasy = self._z_pamieci(klucz)
+        if trasy is None:
+            self._zbuduj_siatke(instalacja)
+            trasy = [self.trasa(r.zrodlo, r.cel) for r in instalacja.rury]
+            self._zapamietaj(klucz, trasy)
+            # pełne trasowanie jest drogie, więc trafia do pliku od razu
+            self.zapisz()
+        for rura, trasa in zip(instalacja.rury, trasy):
+            rura.ustaw_punkty(trasa)
+        return trasy
+
+    def przesun(self, instalacja, zbiornik, x, y):
+        # przesuwa zbiornik i trasuje ponownie tylko rury z nim połączone
+        # albo przechodzące przez jego nowe położenie; zwraca ich liczbę.
+        # Nowy układ trafia tylko do pamięci, do pliku dopiero przez zapisz().
+        zbiornik.x = x
+        zbiornik.y = y
+        klucz = klucz_ukladu(instalacja, self.parametry())
+        trasy = self._z_pamieci(klucz)
+        if trasy is not None:
+            for rura, trasa in zip(instalacja.rury, trasy):
+                rura.ustaw_punkty(trasa)
+            return 0
+
+        self._zbuduj_siatke(instalacja)
+        prostokat = (x, y, x + zbiornik.width, y + zbiornik.height)
+        ponownie = 0
+        for rura in instalacja.rury:
+            if rura.zrodlo is zbiornik or rura.cel is zbiornik or _przecina(rura.punkty, prostokat):
+                rura.ustaw_punkty(self.trasa(rura.zrodlo, rura.cel))
+                ponownie += 1
+        self._zapamietaj(klucz, [r.punkty for r in instalacja.rury])
+        return ponownie
+
+    def _z_pamieci(self, klucz):
+        trasy = self.pamiec.get(klucz)
+        if trasy is not None:
+            self.pamiec.move_to_end(klucz)
+        return trasy
+
+    def _zapamietaj(self, klucz, trasy):
+        self.pamiec[klucz] = [[list(p) for p in t] for t in trasy]
+        self.pamiec.move_to_end(klucz)
+        self._przytnij()
+        self.zmieniona = True
+
+    def _przytnij(self):
+        while len(self.pamiec) > self.pojemnosc_pamieci:
+            self.pamiec.popitem(last=False)
+
+    def zapisz(self):
+        # cała pamięć do pliku tymczasowego i podmiana, więc przerwany zapis
+        # nie psuje poprzedniego pliku; kolejność w pliku to kolejność użycia
+        if self.plik_pamieci is None or not self.zmieniona:
+            return
+        tymczasowy = self.plik_pamieci + ".tmp"
+        with open(tymczasowy, "w") as f:
+            json.dump(self.pamiec, f)
+        os.replace(tymczasowy, self.plik_pamieci)
+        self.zmieniona = False
+
+    def _zbuduj_siatke(self, instalacja):
+        zbiorniki = instalacja.zbiorniki
+        s = self.siatka
+        m = self.margines
+        x0 = min(z.x for z in zbiorniki) - m - self.zapas * s
+        y0 = min(z.y for z in zbiorniki) - m - self.zapas * s
+        x1 = max(z.x + z.width for z in zbiorniki) + m + self.zapas * s
+        y1 = max(z.y + z.height for z in zbiorniki) + m + self.zapas * s
+        self._x0 = x0
+        self._y0 = y0
+        self._szer = int((x1 - x0) // s) + 1
+        self._wys = int((y1 - y0) // s) + 1
+        # 2: środek komórki w zbiorniku albo na jego ścianie, 1: w marginesie
+        zajete = np.zeros((self._wys, self._szer), dtype=np.uint8)
+        for poziom, d in ((1, m), (2, 0)):
+            for z in zbiorniki:
+                i0 = max(0, int(np.ceil((z.x - d - x0) / s)))
+                i1 = min(self._szer - 1, int(np.floor((z.x + z.width + d - x0) / s)))
+                j0 = max(0, int(np.ceil((z.y - d - y0) / s)))
+                j1 = min(self._wys - 1, int(np.floor((z.y + z.height + d - y0) / s)))
+                zajete[j0:j1 + 1, i0:i1 + 1] = np.maximum(zajete[j0:j1 + 1, i0:i1 + 1], poziom)
+        self._zajete = zajete.tobytes()
+
+    def _komorka(self, x, y):
+        return int(round((x - self._x0) / self.siatka)), int(round((y - self._y0) / self.siatka))
+
+    def _punkt(self, i, j):
+        return (self._x0 + i * self.siatka, self._y0 + j * self.siatka)
+
+    def trasa(self, zrodlo, cel):
+        # punkty trasy od wyjścia źródła do wejścia celu; bez drogi po siatce
+        # trasa z trzech odcinków przez środek między zbiornikami
+        start = zrodlo.punkt_wyjscia()
+        koniec = cel.punkt_wejscia()
+        s = self.siatka
+        # pierwszy wiersz pod dnem źródła i ostatni nad dachem celu
+        i_s, _ = self._komorka(*start)
+        j_s = int(np.floor((start[1] - self._y0) / s)) + 1
+        i_k, _ = self._komorka(*koniec)
+        j_k = int(np.ceil((koniec[1] - self._y0) / s)) - 1
+        sciezka = self._szukaj(i_s, j_s, i_k, j_k)
+        self.liczba_tras += 1
+        if sciezka is None:
+            y_srodek = (start[1] + koniec[1]) / 2
+            return _uprosc([start, (start[0], y_srodek), (koniec[0], y_srodek), koniec])
+
+        punkty = [list(self._punkt(i, j)) for i, j in sciezka]
+        # pierwszy i ostatni odcinek przesunięte w pionie na oś portów
+        punkty[0][0] = start[0]
+        if len(punkty) > 1 and sciezka[1][0] == sciezka[0][0]:
+            k = 1
+            while k < len(sciezka) and sciezka[k][0] == sciezka[0][0]:
+                punkty[k][0] = start[0]
+                k += 1
+        punkty[-1][0] = koniec[0]
+        if len(punkty) > 1 and sciezka[-2][0] == sciezka[-1][0]:
+            k = len(sciezka) - 2
+            while k >= 0 and sciezka[k][0] == sciezka[-1][0]:
+                punkty[k][0] = koniec[0]
+                k -= 1
+        return _uprosc([start] + [tuple(p) for p in punkty] + [koniec])
+
+    def _szukaj(self, i_s, j_s, i_k, j_k):
+        szer, wys = self._szer, self._wys
+        zajete = self._zajete
+        if not (0 <= i_s < szer and 0 <= j_s < wys and 0 <= i_k < szer and 0 <= j_k < wys):
+            return None
+        if zajete[j_s * szer + i_s] == 2 or zajete[j_k * szer + i_k] == 2:
+            return None
+        kara = self.kara_zakretu
+        kary = (0.0, self.kara_marginesu)
+        cel = j_k * szer + i_k
+        # stan = komórka * 4 + kierunek; start w dół z wyjścia źródła
+        poczatek = (j_s * szer + i_s) * 4 + DOL
+        koszty = {poczatek: 0.0}
+        skad = {poczatek: None}
+        kolejka = [(abs(i_k - i_s) + abs(j_k - j_s), 0.0, poczatek)]
+        while kolejka:
+            _, g, stan = heapq.heappop(kolejka)
+            if g > koszty[stan]:
+                continue
+            komorka, kierunek = divmod(stan, 4)
+            if komorka == cel:
+                sciezka = []
+                while stan is not None:
+                    k = stan // 4
+                    sciezka.append((k % szer, k // szer))
+                    stan = skad[stan]
+                sciezka.reverse()
+                return sciezka
+            j, i = divmod(komorka, szer)
+            for nowy, (di, dj) in enumerate(_RUCHY):
+                if nowy == (kierunek + 2) % 4:
+                    continue
+                ni, nj = i + di, j + dj
+                if not (0 <= ni < szer and 0 <= nj < wys):
+                    continue
+                sasiad = nj * szer + ni
+                zajetosc = zajete[sasiad]
+                if zajetosc == 2:
+                    continue
+                koszt = g + 1.0 + kary[zajetosc] + (kara if nowy != kierunek else 0.0)
+                # wejście do celu pionowo w dół
+                if sasiad == cel and nowy != DOL:
+                    koszt += kara
+                nastepny = sasiad * 4 + nowy
+                if koszt < koszty.get(nastepny, float("inf")):
+                    koszty[nastepny] = koszt
+                    skad[nastepny] = stan
+                    heapq.heappush(kolejka, (koszt + abs(i_k - ni) + abs(j_k - nj), koszt, nastepny))
+        return None
+
+
+def _przecina(punkty, prostokat):
+    # czy któryś odcinek łamanej przecina prostokąt (x0, y0, x1, y1)
+    x0, y0, x1, y1 = prostokat
+    for (xa, ya), (xb, yb) in zip(punkty, punkty[1:]):
+        if max(xa, xb) > x0 and min(xa, xb) < x1 and max(ya, yb) > y0 and min(ya, yb) < y1:
+            return True
+    return False
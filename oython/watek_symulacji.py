@@ -0,0 +1,144 @@
+import queue
+import threading
+import time
+import traceback
+from collections import namedtuple
+
+from harmonogram import Harmonogram
+from stan import wczytaj_stan, zapisz_stan
+
+Migawka = namedtuple("Migawka", "czas licznik_krokow poziomy przeplywy nastawy")
+
+
+class WatekSymulacji(threading.Thread):
+    def __init__(self, silnik, harmonogram=None, okres=0.005, dziennik=None):
+        super().__init__(daemon=True)
+        self.silnik = silnik
+        # opcjonalny DziennikOperatora, do którego trafia każde polecenie
+        self.dziennik = dziennik
+        # Profiler z profil.py albo None (pomiary wyłączone)
+        self.profil = None
+        self.harmonogram = harmonogram if harmonogram is not None else Harmonogram(silnik)
+        self.okres = okres
+        self.pracuje = False
+        # ostatni wyjątek modelu albo polecenia; wątek wtedy wstrzymuje
+        # symulację, ale dalej przyjmuje polecenia (wznow i wczytaj_stan go
+        # kasują), a okno i serwer Modbus pokazują błąd zamiast starej migawki
+        self.blad = None
+
+        # polecenia operatora wykonywane na granicy kroków
+        self._polecenia = queue.SimpleQueue()
+        # dwa bufory migawek: wątek pisze do nieaktywnego i przełącza indeks,
+        # czytelnik zawsze dostaje kompletną, niezmienną migawkę
+        self._bufory = [self._migawka_silnika(), None]
+        self._aktywny = 0
+
+    @property
+    def migawka(self):
+        return self._bufory[self._aktywny]
+
+    def wyslij(self, polecenie, *argumenty):
+        self._polecenia.put((polecenie, argumenty))
+
+    def wznow(self):
+        self.wyslij("wznow")
+
+    def wstrzymaj(self):
+        self.wyslij("wstrzymaj")
+
+    def zakoncz(self, czekaj=True):
+        self.wyslij("zakoncz")
+        if czekaj and self.is_alive():
+            self.join()
+
+    def run(self):
+        while True:
+            try:
+                if not self._obieg():
+                    return
+            except Exception as e:
+                self.blad = e
+                self.pracuje = False
+                traceback.print_exc()
+                self._publikuj()
+
+    def _obieg(self):
+        if self.pracuje:
+            if not self._wykonaj_oczekujace():
+                return False
+            profil = self.profil
+            if profil is None:
+                self.harmonogram.postep()
+            else:
+                poczatek = time.perf_counter()
+                self.harmonogram.postep()
+                profil.krok(poczatek, time.perf_counter())
+            self._publikuj()
+            time.sleep(self.okres)
+        else:
+            # wstrzymany wątek czeka na polecenie, nie zużywając procesora
+            if self.profil is not None:
+                self.profil.przerwa()
+            polecenie = self._polecenia.get()
+            if not self._wykonaj(*polecenie) or not self._wykonaj_oczekujace():
+                return False
+            self._publikuj()
+        return True
+
+    def _wykonaj_oczekujace(self):
+        while True:
+            try:
+                polecenie = self._polecenia.get_nowait()
+            except queue.Empty:
+                return True
+            if not self._wykonaj(*polecenie):
+                return False
+
+    def _wykonaj(self, polecenie, argumenty):
+        s = self.silnik
+        if self.dziennik is not None:
+            self.dziennik.zapisz(polecenie, argumenty)
+        if polecenie == "napelnij":
+            s.napelnij(s.zbiorniki[argumenty[0]])
+        elif polecenie == "oproznij":
+            s.oproznij(s.zbiorniki[argumenty[0]])
+        elif polecenie == "nastawa":
+            s.ustaw_nastawe(s.zbiorniki[argumenty[0]], argumenty[1])
+        elif polecenie == "zapisz_stan":
+            # argumentem jest funkcja odbierająca migawkę, np. queue.put
+            argumenty[0](zapisz_stan(s, self.pracuje))
+        elif polecenie == "wczytaj_stan":
+            pracuje = wczytaj_stan(s, argumenty[0])
+            self.blad = None
+            if pracuje and not self.pracuje:
+                self.harmonogram.restart()
+            self.pracuje = pracuje
+        elif polecenie == "predkosc":
+            self.harmonogram.predkosc = argumenty[0]
+        elif polecenie == "wznow":
+            self.blad = None
+            if not self.pracuje:
+                self.harmonogram.restart()
+            self.pracuje = True
+        elif polecenie == "wstrzymaj":
+            self.pracuje = False
+        elif polecenie == "zakoncz":
+            return False
+        else:
+            raise ValueError(f"Nieznane polecenie: {polecenie}")
+        return True
+
+    def _migawka_silnika(self):
+        s = self.silnik
+        return Migawka(
+            s.czas,
+            s.licznik_krokow,
+            tuple(z.poziom for z in s.zbiorniki),
+            tuple(r.czy_plynie for r in s.rury),
+            tuple(z.nastawa_poziomu for z in s.zbiorniki),
+        )
+
+    def _publikuj(self):
+        wolny = 1 - self._aktywny
+        self._bufory[wolny] = self._migawka_silnika()
+        self._aktywny = wolny
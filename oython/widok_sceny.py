@@ -0,0 +1,215 @@
+import argparse
+import sys
+
+from PyQt5.QtWidgets import QApplication, QGraphicsItem, QGraphicsScene, QGraphicsView, QStyleOptionGraphicsItem
+from PyQt5.QtCore import Qt, QRectF, QTimer
+from PyQt5.QtGui import QColor, QPainter, QPen
+
+from rysowanie import RysownikRury, RysownikZbiornika
+
+# Widok przeglądowy dużych instalacji: każdy zbiornik i rura to element
+# QGraphicsScene z indeksem BSP, więc rysowane są tylko elementy w widocznym
+# obszarze, a po zmianie migawki odświeżane tylko te, których stan się zmienił.
+# Przy oddaleniu (szczegolowosc < PROG_SZCZEGOLOW) zbiornik to prostokąt
+# z paskiem poziomu, bez zaokrągleń, tekstu i nastawy, a rura cienką linią.
+
+PROG_SZCZEGOLOW = 0.6
+
+
+def _szczegolowosc(painter):
+    return QStyleOptionGraphicsItem.levelOfDetailFromTransform(painter.worldTransform())
+
+
+class ElementZbiornika(QGraphicsItem):
+    _tlo = QColor(60, 60, 60)
+    _ciecz = QColor(0, 140, 255)
+
+    def __init__(self, zbiornik):
+        super().__init__()
+        self.zbiornik = zbiornik
+        self.rysownik = RysownikZbiornika(zbiornik)
+        self.poziom = zbiornik.poziom
+        self.nastawa = zbiornik.nastawa_poziomu
+        self.setZValue(1)
+        self._granice = self._licz_granice()
+
+    def _licz_granice(self):
+        # nazwa nad zbiornikiem, napis SP z prawej, grube obrysy
+        z = self.zbiornik
+        return QRectF(z.x - 4, z.y - 30, z.width + 36, z.height + 8)
+
+    def boundingRect(self):
+        return self._granice
+
+    def odswiez_geometrie(self):
+        # po przesunięciu zbiornika; indeks BSP sceny musi poznać nowe granice
+        granice = self._licz_granice()
+        if granice != self._granice:
+            self.prepareGeometryChange()
+            self._granice = granice
+
+    def ustaw(self, poziom, nastawa):
+        if poziom != self.poziom or nastawa != self.nastawa:
+            self.poziom = poziom
+            self.nastawa = nastawa
+            self.update()
+
+    def paint(self, painter, option, widget=None):
+        if _szczegolowosc(painter) >= PROG_SZCZEGOLOW:
+            self.rysownik.draw_tlo(painter)
+            self.rysownik.draw_ciecz(painter, self.poziom)
+            self.rysownik.draw_obrys(painter, self.nastawa)
+            return
+        z = self.zbiornik
+        painter.setRenderHint(QPainter.Antialiasing, False)
+        painter.fillRect(QRectF(z.x, z.y, z.width, z.height), self._tlo)
+        if self.poziom > 0:
+            h = z.height * self.poziom
+            painter.fillRect(QRectF(z.x, z.y + z.height - h, z.width, h), self._ciecz)
+
+
+class ElementRury(QGraphicsItem):
+    _pen_pusta = QPen(QColor(110, 110, 110), 0)
+    _pen_plynie = QPen(QColor(0, 180, 255), 0)
+
+    def __init__(self, rura):
+        super().__init__()
+        self.rura = rura
+        self.rysownik = RysownikRury(rura)
+        self.plynie = rura.czy_plynie
+        self._granice = self._licz_granice()
+
+    def _licz_granice(self):
+        x0, y0, x1, y1 = self.rura.granice()
+        return QRectF(x0, y0, x1 - x0, y1 - y0)
+
+    def boundingRect(self):
+        return self._granice
+
+    def odswiez_geometrie(self):
+        # po Rura.ustaw_punkty() (trasowanie, przesunięcie zbiornika); ścieżkę
+        # rysownik przebudowuje sam, element przerysowuje się w całości
+        granice = self._licz_granice()
+        if granice != self._granice:
+            self.prepareGeometryChange()
+            self._granice = granice
+        self.update()
+
+    def ustaw(self, plynie):
+        if plynie != self.plynie:
+            self.plynie = plynie
+            self.update()
+
+    def paint(self, painter, option, widget=None):
+        if _szczegolowosc(painter) >= PROG_SZCZEGOLOW:
+            self.rysownik.draw_obudowa(painter)
+            self.rysownik.draw_przeplyw(painter, self.plynie)
+            return
+        painter.setRenderHint(QPainter.Antialiasing, False)
+        # pióro kosmetyczne (szerokość 0): zawsze jeden piksel
+        painter.setPen(self._pen_plynie if self.plynie else self._pen_pusta)
+        punkty = self.rura.punkty
+        for (xa, ya), (xb, yb) in zip(punkty, punkty[1:]):
+            painter.drawLine(int(xa), int(ya), int(xb), int(yb))
+
+
+class ScenaInstalacji(QGraphicsScene):
+    def __init__(self, instalacja):
+        super().__init__()
+        self.setItemIndexMethod(QGraphicsScene.BspTreeIndex)
+        self.setBackgroundBrush(QColor("#2b2b2b"))
+        self.elementy_rur = [ElementRury(r) for r in instalacja.rury]
+        self.elementy_zbiornikow = [ElementZbiornika(z) for z in instalacja.zbiorniki]
+        for element in self.elementy_rur + self.elementy_zbiornikow:
+            self.addItem(element)
+
+    def odswiez_geometrie(self):
+        # po zmianie położeń zbiorników albo tras rur w instalacji, np. po
+        # Trasowanie.przesun()
+        for element in self.elementy_rur + self.elementy_zbiornikow:
+            element.odswiez_geometrie()
+
+    def ustaw_migawke(self, migawka):
+        # update() tylko dla zmienionych elementów; scena zbiera je w jeden
+        # obszar do przerysowania
+        for element, poziom, nastawa in zip(self.elementy_zbiornikow, migawka.poziomy, migawka.nastawy):
+            element.ustaw(poziom, nastawa)
+        for element, plynie in zip(self.elementy_rur, migawka.przeplywy):
+            element.ustaw(plynie)
+
+
+class WidokInstalacji(QGraphicsView):
+    # zrodlo: obiekt z atrybutem migawka (WatekSymulacji, CzytnikTelemetrii
+    # przez lambda itp.); kółko myszy przybliża, przeciąganie przesuwa
+    def __init__(self, instalacja, zrodlo=None, klatki_na_sekunde=50):
+        self.scena = ScenaInstalacji(instalacja)
+        super().__init__(self.scena)
+        self.zrodlo = zrodlo
+        self.setRenderHint(QPainter.Antialiasing)
+        self.setDragMode(QGraphicsView.ScrollHandDrag)
+        self.setTransformationAnchor(QGraphicsView.AnchorUnderMouse)
+        # obszar do przerysowania to suma granic zmienionych elementów, a przy
+        # bardzo wielu zmianach ich wspólny prostokąt
+        self.setViewportUpdateMode(QGraphicsView.SmartViewportUpdate)
+        # elementy same ustawiają pióra, pędzle i wygładzanie przed rysowaniem
+        self.setOptimizationFlag(QGraphicsView.DontSavePainterState, True)
+        self.setStyleSheet("background-color: #2b2b2b; border: none;")
+
+        self.timer = QTimer()
+        self.timer.timeout.connect(self.odswiez)
+        if zrodlo is not None:
+            # elementy startują z wartościami modelu, które wątek symulacji
+            # może właśnie zmieniać; od razu podstawiamy migawkę
+            self.odswiez()
+            self.timer.start(int(1000 / klatki_na_sekunde))
+
+    def odswiez(self):
+        self.scena.ustaw_migawke(self.zrodlo.migawka)
+
+    def wheelEvent(self, event):
+        skala = 1.25 if event.angleDelta().y() > 0 else 0.8
+        self.scale(skala, skala)
+
+    def dopasuj(self):
+        self.fitInView(self.scena.itemsBoundingRect(), Qt.KeepAspectRatio)
+
+    def keyPressEvent(self, event):
+        if event.key() == Qt.Key_Home:
+            self.dopasuj()
+        else:
+            super().keyPressEvent(event)
+
+
+def main(argv=None):
+    from silnik import instalacja_testowa
+    from trasowanie import Trasowanie
+    from watek_symulacji import WatekSymulacji
+
+    parser = argparse.ArgumentParser(description="Przegląd dużej instalacji w widoku sceny.")
+    parser.add_argument("--zbiorniki", type=int, default=500)
+    parser.add_argument("--w-wierszu", type=int, default=25)
+    parser.add_argument("--pamiec-tras", help="plik JSON z trasami rur z poprzednich uruchomień")
+    args = parser.parse_args(argv)
+
+    app = QApplication.instance()
+    if app is None:
+        app = QApplication(sys.argv[:1])
+
+    s = instalacja_testowa(args.zbiorniki, args.w_wierszu)
+    Trasowanie(plik_pamieci=args.pamiec_tras).trasuj(s)
+    watek = WatekSymulacji(s)
+    watek.start()
+    watek.wznow()
+    widok = WidokInstalacji(s, watek)
+    widok.setWindowTitle(f"SCADA - przegląd ({args.zbiorniki} zbiorników, Home = całość)")
+    widok.resize(1400, 900)
+    widok.show()
+    widok.dopasuj()
+    try:
+        app.exec_()
+    finally:
+        watek.zakoncz()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+import numpy as np
+from PyQt5.QtWidgets import QWidget
+from PyQt5.QtCore import Qt, QPointF, QRectF
+from PyQt5.QtGui import QPainter, QColor, QPen, QPolygonF
+
+from decymacja import PiramidaMinMax
+
+KOLORY_SERII = ["#00b4ff", "#4CAF50", "#FFC107", "#E040FB", "#FF7043", "#26C6DA"]
+
+
+class WykresTrendu(QWidget):
+    def __init__(self, historian, parent=None, okno_czasu=60.0):
+        super().__init__(parent)
+        self.historian = historian
+        instalacja = historian.instalacja
+
+        # serie: poziom [%] każdego zbiornika i nastawa tych, które ją mają
+        self.nazwy = [z.nazwa.split(" ")[0] for z in instalacja.zbiorniki]
+        self._pojemnosci = np.array([z.pojemnosc for z in instalacja.zbiorniki], dtype=np.float64)
+        self._z_nastawa = [i for i, z in enumerate(instalacja.zbiorniki) if z.nastawa_poziomu is not None]
+        self.nazwy += [f"SP {self.nazwy[i]}" for i in self._z_nastawa]
+        self.piramida = PiramidaMinMax(len(self.nazwy))
+        self._przeczytane = 0
+
+        # widoczny przedział czasu; koniec=None oznacza podążanie za bieżącą chwilą
+        self.okno_czasu = okno_czasu
+        self.koniec = None
+        self._przeciaganie = None
+
+        self._piora = []
+        for i in range(len(self.nazwy)):
+            if i < len(self._pojemnosci):
+                self._piora.append(QPen(QColor(KOLORY_SERII[i % len(KOLORY_SERII)]), 1.5))
+            else:
+                self._piora.append(QPen(QColor("red"), 1, Qt.DashLine))
+        self._pen_siatka = QPen(QColor(70, 70, 70), 1)
+        self._pen_tekst = QPen(QColor(200, 200, 200))
+
+    def odswiez(self):
+        licznik = self.historian.licznik
+        if licznik == self._przeczytane:
+            return
+        # najstarsze z nowych próbek mogą być właśnie nadpisywane przez wątek
+        # symulacji, więc pomijamy jedną pełną próbkę zapasu
+        od = max(self._przeczytane, licznik - self.historian.pojemnosc_bufora + 1)
+        rekordy = self.historian.probki(od, licznik)
+        self._przeczytane = licznik
+        if len(rekordy) == 0:
+            return
+
+        wartosci = np.empty((len(rekordy), len(self.nazwy)), dtype=np.float32)
+        liczba_zb = len(self._pojemnosci)
+        wartosci[:, :liczba_zb] = rekordy["ilosci"] / self._pojemnosci * 100.0
+        for k, i in enumerate(self._z_nastawa):
+            wartosci[:, liczba_zb + k] = rekordy["nastawy"][:, i]
+        self.piramida.dodaj(rekordy["czas"], wartosci)
+        self.update()
+
+    def _przedzial(self):
+        zakres = self.piramida.zakres_czasu()
+        koniec = self.koniec
+        if koniec is None:
+            koniec = zakres[1] if zakres is not None else self.okno_czasu
+        return koniec - self.okno_czasu, koniec
+
+    def _obszar_wykresu(self):
+        return QRectF(54, 30, self.width() - 64, self.height() - 60)
+
+    def wheelEvent(self, event):
+        obszar = self._obszar_wykresu()
+        t0, t1 = self._przedzial()
+        # zoom wokół chwili pod kursorem
+        u = min(max((event.pos().x() - obszar.left()) / obszar.width(), 0.0), 1.0)
+        t_kursor = t0 + u * (t1 - t0)
+        skala = 0.8 if event.angleDelta().y() > 0 else 1.25
+        self.okno_czasu = min(max(self.okno_czasu * skala, 0.05), 365 * 86400.0)
+        self.koniec = t_kursor + (1.0 - u) * self.okno_czasu
+        self.update()
+
+    def mousePressEvent(self, event):
+        if event.button() == Qt.LeftButton:
+            self._przeciaganie = (event.pos().x(), self._przedzial()[1])
+
+    def mouseMoveEvent(self, event):
+        if self._przeciaganie is None:
+            return
+        x0, koniec0 = self._przeciaganie
+        dx = event.pos().x() - x0
+        self.koniec = koniec0 - dx * self.okno_czasu / self._obszar_wykresu().width()
+        self.update()
+
+    def mouseReleaseEvent(self, event):
+        self._przeciaganie = None
+
+    def mouseDoubleClickEvent(self, event):
+        # powrót do podążania za bieżącą chwilą
+        self.koniec = None
+        self.update()
+
+    def paintEvent(self, event):
+        p = QPainter(self)
+        p.fillRect(self.rect(), QColor("#1e1e1e"))
+        obszar = self._obszar_wykresu()
+        t0, t1 = self._przedzial()
+
+        p.setPen(self._pen_siatka)
+        for proc in (0, 25, 50, 75, 100):
+            y = obszar.bottom() - obszar.height() * proc / 100.0
+            p.drawLine(QPointF(obszar.left(), y), QPointF(obszar.right(), y))
+        p.drawRect(obszar)
+
+        p.setPen(self._pen_tekst)
+        for proc in (0, 50, 100):
+            y = obszar.bottom() - obszar.height() * proc / 100.0
+            p.drawText(QRectF(0, y - 8, 50, 16), Qt.AlignRight | Qt.AlignVCenter, f"{proc}%")
+        p.drawText(QRectF(obszar.left(), obszar.bottom() + 4, 120, 16), Qt.AlignLeft, f"{t0:.1f} s")
+        p.drawText(QRectF(obszar.right() - 120, obszar.bottom() + 4, 120, 16), Qt.AlignRight, f"{t1:.1f} s")
+
+        x_legendy = obszar.left()
+        for nazwa, pen in zip(self.nazwy, self._piora):
+            p.setPen(pen)
+            p.drawLine(QPointF(x_legendy, 14), QPointF(x_legendy + 14, 14))
+            p.setPen(self._pen_tekst)
+            p.drawText(QPointF(x_legendy + 18, 18), nazwa)
+            x_legendy += 18 + p.fontMetrics().horizontalAdvance(nazwa) + 12
+
+        kolumny = max(int(obszar.width()), 1)
+        minima, maksima = self.piramida.zapytanie(t0, t1, kolumny)
+        p.setRenderHint(QPainter.Antialiasing)
+        p.setClipRect(obszar)
+        for s, pen in enumerate(self._piora):
+            # obwiednia min/max: w każdej kolumnie pionowy odcinek od minimum do maksimum
+            zajete = np.flatnonzero(~np.isnan(minima[:, s]))
+            if len(zajete) == 0:
+                continue
+            x = obszar.left() + zajete + 0.5
+            y_min = obszar.bottom() - obszar.height() * minima[zajete, s] / 100.0
+            y_max = obszar.bottom() - obszar.height() * maksima[zajete, s] / 100.0
+            punkty = QPolygonF([QPointF(xi, yi) for xi, ya, yb in zip(x, y_min, y_max) for yi in (ya, yb)])
+            p.setPen(pen)
+            p.drawPolyline(punkty)